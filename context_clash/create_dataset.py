@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 from langsmith import Client
 
+from context_common.datasets import sync_dataset
+
 load_dotenv()
 
 GROUND_TRUTH = {
@@ -20,24 +22,22 @@ DATASET_NAME = "context-clash-materialize"
 def create_dataset() -> None:
     client = Client()
 
-    if client.has_dataset(dataset_name=DATASET_NAME):
-        print(f"Dataset already exists: {DATASET_NAME}")
-        return
-
-    dataset = client.create_dataset(
-        dataset_name=DATASET_NAME,
+    sync_dataset(
+        client,
+        DATASET_NAME,
+        [
+            {
+                "inputs": {
+                    "messages": [
+                        {"role": "user", "content": "Research the company Materialize."}
+                    ]
+                },
+                "outputs": {k: v for k, v in GROUND_TRUTH.items() if k != "company_homepage" and v is not None},
+            }
+        ],
         description="Single-company context clash evaluation (Materialize)",
     )
-    client.create_example(
-        inputs={
-            "messages": [
-                {"role": "user", "content": "Research the company Materialize."}
-            ]
-        },
-        outputs={k: v for k, v in GROUND_TRUTH.items() if k != "company_homepage" and v is not None},
-        dataset_id=dataset.id,
-    )
-    print(f"Created dataset: {DATASET_NAME}")
+    print(f"Dataset ready: {DATASET_NAME}")
 
 
 if __name__ == "__main__":
@@ -2,6 +2,8 @@ from typing import Any
 
 from langsmith import Client
 
+from context_common.results_store import ResultsStore, get_results_store
+
 client = Client()
 
 
@@ -22,28 +24,24 @@ def result_match_ratio(outputs: dict[str, Any], reference_outputs: dict[str, Any
     return float(score) / len(compare_keys)
 
 
-def get_metrics_from_experiment(experiment) -> dict[str, float]:
-    """Extract average metrics from a LangSmith experiment."""
-    results = list(experiment)
-
-    scores = []
-    for result in results:
-        for eval_result in result["evaluation_results"]["results"]:
-            if eval_result.key == "result_match_ratio" and eval_result.score is not None:
-                scores.append(eval_result.score)
-
-    avg_metrics = {}
-    avg_metrics["result_match_ratio"] = sum(scores) / len(scores) if scores else 0.0
+def get_metrics_from_experiment(experiment, store: ResultsStore | None = None) -> dict[str, float]:
+    """
+    Extract average metrics from a LangSmith experiment.
 
-    # Get aggregated stats from the LangSmith session
-    session = client.read_project(
-        project_name=experiment.experiment_name, include_stats=True
-    )
-    avg_metrics["latency_p99"] = session.latency_p99.total_seconds()
-    avg_metrics["avg_tokens"] = session.total_tokens / len(results) if results else 0
-    avg_metrics["avg_cost"] = float(session.total_cost / len(results)) if results else 0.0
+    The experiment is ingested into the local results store on first use; later calls
+    (re-rendered cells, plots, comparisons) are answered from the store without network
+    calls.
+    """
+    store = store if store is not None else get_results_store()
+    name = store.ingest_experiment(experiment, client=client)
+    metrics = store.metrics(name)
 
-    return avg_metrics
+    return {
+        "result_match_ratio": metrics.get("result_match_ratio", 0.0),
+        "latency_p99": metrics["latency_p99"],
+        "avg_tokens": metrics["avg_tokens"],
+        "avg_cost": metrics["avg_cost"],
+    }
 
 
 def display_metrics(metrics: dict[str, float], title: str) -> None:
@@ -0,0 +1,282 @@
+"""
+Incremental LangSmith dataset sync.
+
+Deleting and recreating a dataset on every run, or listing every example to dedupe,
+makes dataset setup slow and churns example IDs. sync_dataset keeps a local manifest of
+example content hashes per dataset, diffs it against the desired examples, and pushes
+only the changes through bulk create/update/delete calls. When nothing changed, setup
+costs a single read_dataset call.
+
+LocalDatasetClient is an in-memory stand-in for langsmith.Client that supports the
+calls used here, for running dataset setup without a LangSmith account.
+"""
+
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_MANIFEST_DIR = Path(
+    os.environ.get("CONTEXT_EVALS_DATASET_CACHE", "~/.cache/context-failure-evals/datasets")
+).expanduser()
+
+
+def _canonical(value: Any, volatile_keys: frozenset) -> Any:
+    """Drop volatile keys (e.g. timestamps) recursively so they don't affect hashes."""
+    if isinstance(value, dict):
+        return {k: _canonical(v, volatile_keys) for k, v in value.items() if k not in volatile_keys}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v, volatile_keys) for v in value]
+    return value
+
+
+def _hash(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def example_key(example: Dict[str, Any]) -> str:
+    """Default example identity: a hash of the example's inputs."""
+    return _hash(example.get("inputs", {}))
+
+
+def content_hash(example: Dict[str, Any], volatile_keys: Iterable[str] = ()) -> str:
+    """Hash of an example's inputs, outputs and metadata, ignoring volatile keys."""
+    content = {
+        "inputs": example.get("inputs") or {},
+        "outputs": example.get("outputs") or {},
+        "metadata": example.get("metadata") or {},
+    }
+    return _hash(_canonical(content, frozenset(volatile_keys)))
+
+
+def _manifest_path(manifest_dir: Path, dataset_name: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", dataset_name)
+    return manifest_dir / f"{slug}.json"
+
+
+def _load_manifest(path: Optional[Path]) -> Optional[Dict[str, Any]]:
+    if path is None or not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_manifest(path: Optional[Path], manifest: Dict[str, Any]) -> None:
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def _read_dataset(client: Any, dataset_name: str) -> Optional[Any]:
+    try:
+        return client.read_dataset(dataset_name=dataset_name)
+    except Exception:
+        return None
+
+
+def _remote_entries(
+    client: Any,
+    dataset_id: Any,
+    key_fn: Callable[[Dict[str, Any]], str],
+    volatile_keys: Iterable[str],
+) -> Tuple[Dict[str, Dict[str, str]], List[str]]:
+    """List remote examples once; return {key: {"id", "hash"}} and IDs of duplicates."""
+    entries: Dict[str, Dict[str, str]] = {}
+    duplicates: List[str] = []
+    for ex in client.list_examples(dataset_id=dataset_id):
+        example = {"inputs": ex.inputs or {}, "outputs": ex.outputs or {}, "metadata": ex.metadata or {}}
+        key = key_fn(example)
+        if key in entries:
+            duplicates.append(str(ex.id))
+            continue
+        entries[key] = {"id": str(ex.id), "hash": content_hash(example, volatile_keys)}
+    return entries, duplicates
+
+
+def sync_dataset(
+    client: Any,
+    dataset_name: str,
+    examples: Sequence[Dict[str, Any]],
+    description: Optional[str] = None,
+    key_fn: Callable[[Dict[str, Any]], str] = example_key,
+    volatile_keys: Iterable[str] = (),
+    prune: bool = True,
+    force: bool = False,
+    manifest_dir: Optional[Path] = DEFAULT_MANIFEST_DIR,
+) -> Any:
+    """
+    Make a LangSmith dataset contain exactly the given examples, pushing only changes.
+
+    Args:
+        client: LangSmith Client (or LocalDatasetClient)
+        dataset_name: Dataset to sync (created if missing)
+        examples: Desired examples as {"inputs", "outputs", "metadata"} dicts
+        description: Description used when the dataset is created
+        key_fn: Maps an example to its identity; examples with the same key are
+            updated in place (defaults to a hash of the inputs)
+        volatile_keys: Keys ignored when hashing content (e.g. "timestamp")
+        prune: Delete remote examples that are no longer in `examples`
+        force: Ignore the local manifest and diff against the remote examples
+        manifest_dir: Where manifests are kept (None disables the manifest)
+
+    Returns:
+        The dataset
+    """
+    volatile_keys = tuple(volatile_keys)
+    manifest_path = _manifest_path(Path(manifest_dir), dataset_name) if manifest_dir is not None else None
+
+    desired: Dict[str, Tuple[Dict[str, Any], str]] = {}
+    for example in examples:
+        desired[key_fn(example)] = (example, content_hash(example, volatile_keys))
+
+    dataset = _read_dataset(client, dataset_name)
+    manifest = None if force else _load_manifest(manifest_path)
+    if dataset is not None and manifest and manifest.get("dataset_id") == str(dataset.id):
+        entries = manifest["examples"]
+        duplicates: List[str] = []
+        # Fast path: nothing changed since the last sync
+        if {key: entry["hash"] for key, entry in entries.items()} == {key: h for key, (_, h) in desired.items()}:
+            return dataset
+    else:
+        if dataset is None:
+            dataset = client.create_dataset(dataset_name=dataset_name, description=description)
+            entries, duplicates = {}, []
+        else:
+            entries, duplicates = _remote_entries(client, dataset.id, key_fn, volatile_keys)
+
+    to_create = []
+    to_update = []
+    for key, (example, digest) in desired.items():
+        entry = entries.get(key)
+        if entry is None:
+            example_id = str(uuid.uuid4())
+            to_create.append({"id": example_id, **_example_payload(example)})
+            entries[key] = {"id": example_id, "hash": digest}
+        elif entry["hash"] != digest:
+            to_update.append({"id": entry["id"], **_example_payload(example)})
+            entry["hash"] = digest
+
+    to_delete = list(duplicates)
+    if prune:
+        for key in [key for key in entries if key not in desired]:
+            to_delete.append(entries.pop(key)["id"])
+
+    if to_create:
+        client.create_examples(dataset_id=dataset.id, examples=to_create)
+    if to_update:
+        client.update_examples(dataset_id=dataset.id, updates=to_update)
+    if to_delete:
+        client.delete_examples(example_ids=to_delete)
+
+    _save_manifest(manifest_path, {"dataset_id": str(dataset.id), "dataset_name": dataset_name, "examples": entries})
+    print(f"  Synced dataset {dataset_name}: {len(to_create)} created, {len(to_update)} updated, {len(to_delete)} deleted")
+    return dataset
+
+
+def _example_payload(example: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "inputs": example.get("inputs") or {},
+        "outputs": example.get("outputs") or {},
+        "metadata": example.get("metadata") or {},
+    }
+
+
+class LocalDatasetClient:
+    """
+    In-memory stand-in for langsmith.Client covering the dataset calls used by
+    sync_dataset and the setup modules. Call counts are kept in `calls`.
+    """
+
+    def __init__(self):
+        self.datasets: Dict[str, Any] = {}
+        self.examples: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _find(self, dataset_name: Optional[str], dataset_id: Any) -> Any:
+        for dataset in self.datasets.values():
+            if dataset.name == dataset_name or (dataset_id is not None and str(dataset.id) == str(dataset_id)):
+                return dataset
+        raise LookupError(f"Dataset not found: {dataset_name or dataset_id}")
+
+    def read_dataset(self, *, dataset_name: Optional[str] = None, dataset_id: Any = None) -> Any:
+        self._count("read_dataset")
+        return self._find(dataset_name, dataset_id)
+
+    def has_dataset(self, *, dataset_name: Optional[str] = None, dataset_id: Any = None) -> bool:
+        self._count("has_dataset")
+        try:
+            self._find(dataset_name, dataset_id)
+            return True
+        except LookupError:
+            return False
+
+    def create_dataset(self, dataset_name: str, *, description: Optional[str] = None, **kwargs: Any) -> Any:
+        self._count("create_dataset")
+        if any(d.name == dataset_name for d in self.datasets.values()):
+            raise ValueError(f"Conflict: dataset {dataset_name} already exists")
+        dataset = SimpleNamespace(
+            id=str(uuid.uuid4()), name=dataset_name, description=description,
+            created_at=datetime.now(timezone.utc),
+        )
+        self.datasets[dataset.id] = dataset
+        return dataset
+
+    def delete_dataset(self, *, dataset_id: Any = None, dataset_name: Optional[str] = None) -> None:
+        self._count("delete_dataset")
+        dataset = self._find(dataset_name, dataset_id)
+        del self.datasets[dataset.id]
+        self.examples = {k: v for k, v in self.examples.items() if v.dataset_id != dataset.id}
+
+    def list_examples(self, dataset_id: Any = None, dataset_name: Optional[str] = None, **kwargs: Any) -> Iterable[Any]:
+        self._count("list_examples")
+        dataset = self._find(dataset_name, dataset_id)
+        return [ex for ex in self.examples.values() if ex.dataset_id == dataset.id]
+
+    def _store(self, dataset_id: Any, example: Dict[str, Any]) -> str:
+        example_id = str(example.get("id") or uuid.uuid4())
+        self.examples[example_id] = SimpleNamespace(
+            id=example_id, dataset_id=str(dataset_id),
+            inputs=example.get("inputs") or {}, outputs=example.get("outputs") or {},
+            metadata=example.get("metadata") or {},
+        )
+        return example_id
+
+    def create_example(self, inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]] = None,
+                       dataset_id: Any = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        self._count("create_example")
+        example_id = self._store(dataset_id, {"inputs": inputs, "outputs": outputs, "metadata": metadata})
+        return self.examples[example_id]
+
+    def create_examples(self, *, dataset_id: Any = None, dataset_name: Optional[str] = None,
+                        examples: Sequence[Dict[str, Any]] = (), **kwargs: Any) -> Dict[str, Any]:
+        self._count("create_examples")
+        dataset = self._find(dataset_name, dataset_id)
+        ids = [self._store(dataset.id, example) for example in examples]
+        return {"count": len(ids), "example_ids": ids}
+
+    def update_examples(self, *, dataset_id: Any = None, dataset_name: Optional[str] = None,
+                        updates: Sequence[Dict[str, Any]] = (), **kwargs: Any) -> Dict[str, Any]:
+        self._count("update_examples")
+        dataset = self._find(dataset_name, dataset_id)
+        for update in updates:
+            self._store(dataset.id, update)
+        return {"count": len(updates)}
+
+    def delete_examples(self, example_ids: Sequence[Any], **kwargs: Any) -> None:
+        self._count("delete_examples")
+        for example_id in example_ids:
+            self.examples.pop(str(example_id), None)
@@ -0,0 +1,170 @@
+"""
+Shared LLM-as-judge execution.
+
+Building a judge client per evaluation and calling it one prompt at a time makes
+evaluation latency scale with the number of judge calls. A JudgeExecutor keeps
+one structured-output client per (model, schema), sends batches of prompts
+concurrently under a cap, retries transient failures with exponential backoff,
+and memoizes results by input hash in a bounded LRU.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_openai import ChatOpenAI
+
+_EXECUTORS: Dict[Any, "JudgeExecutor"] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+class JudgeExecutor:
+    """
+    Reusable judge with batching, a concurrency cap, retries and memoization.
+
+    Args:
+        model: OpenAI model name for the judge
+        schema: Optional structured output schema (TypedDict or Pydantic model)
+        method: Optional structured output method (e.g. "function_calling")
+        max_concurrency: Maximum number of judge requests in flight per batch
+        max_retries: Attempts per prompt before the error is returned
+        max_memo: Most judge results kept in the memo (least recently used are evicted)
+        llm: Optional pre-built chat model (used instead of creating ChatOpenAI)
+    """
+
+    def __init__(
+        self,
+        model: str,
+        schema: Any = None,
+        method: Optional[str] = None,
+        max_concurrency: int = 5,
+        max_retries: int = 3,
+        max_memo: int = 4096,
+        llm: Any = None,
+    ):
+        llm = llm if llm is not None else ChatOpenAI(model=model, temperature=0)
+        if schema is not None:
+            structured_kwargs = {"method": method} if method else {}
+            llm = llm.with_structured_output(schema, **structured_kwargs)
+        self._judge = llm.with_retry(stop_after_attempt=max_retries, wait_exponential_jitter=True)
+        self.max_concurrency = max_concurrency
+        self._key_prefix = f"{model}|{getattr(schema, '__name__', schema)}|{method}|"
+        self.max_memo = max_memo
+        self._memo: "OrderedDict[str, Any]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def _input_key(self, messages: Any) -> str:
+        payload = self._key_prefix + json.dumps(messages, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _plan(self, prompts: Sequence[Any]):
+        """Split prompts into memoized results and the unique prompts still to send."""
+        keys = [self._input_key(messages) for messages in prompts]
+        results: List[Any] = [None] * len(prompts)
+        pending: Dict[str, int] = {}
+        with self._memo_lock:
+            for i, key in enumerate(keys):
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    results[i] = self._memo[key]
+                elif key not in pending:
+                    pending[key] = i
+        return keys, results, pending
+
+    def _merge(self, prompts, keys, results, pending, outputs, return_exceptions: bool) -> List[Any]:
+        sent = dict(zip(pending, outputs))
+        with self._memo_lock:
+            for key, output in sent.items():
+                if not isinstance(output, Exception):
+                    self._memo[key] = output
+                    self._memo.move_to_end(key)
+            while len(self._memo) > self.max_memo:
+                self._memo.popitem(last=False)
+        for i, key in enumerate(keys):
+            if key in sent:
+                results[i] = sent[key]
+        if not return_exceptions:
+            for output in results:
+                if isinstance(output, Exception):
+                    raise output
+        return results
+
+    def batch(self, prompts: Sequence[Any], return_exceptions: bool = False) -> List[Any]:
+        """
+        Judge many prompts concurrently (thread pool, capped at max_concurrency).
+
+        Args:
+            prompts: Message lists, one per judge call
+            return_exceptions: Return per-prompt exceptions instead of raising the first
+
+        Returns:
+            Judge outputs in prompt order.
+        """
+        keys, results, pending = self._plan(prompts)
+        outputs = []
+        if pending:
+            outputs = self._judge.batch(
+                [prompts[i] for i in pending.values()],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+        return self._merge(prompts, keys, results, pending, outputs, return_exceptions)
+
+    async def abatch(self, prompts: Sequence[Any], return_exceptions: bool = False) -> List[Any]:
+        """Async version of batch(), sent through the model's abatch."""
+        keys, results, pending = self._plan(prompts)
+        outputs = []
+        if pending:
+            outputs = await self._judge.abatch(
+                [prompts[i] for i in pending.values()],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True,
+            )
+        return self._merge(prompts, keys, results, pending, outputs, return_exceptions)
+
+    def lookup(self, messages: Any) -> Optional[Any]:
+        """Memoized result for a prompt, or None if it hasn't been judged (no model call)."""
+        key = self._input_key(messages)
+        with self._memo_lock:
+            if key not in self._memo:
+                return None
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+    def clear(self) -> None:
+        """Drop all memoized results."""
+        with self._memo_lock:
+            self._memo.clear()
+
+    def invoke(self, messages: Any) -> Any:
+        """Judge a single prompt (memoized, retried)."""
+        return self.batch([messages])[0]
+
+    async def ainvoke(self, messages: Any) -> Any:
+        """Async version of invoke()."""
+        return (await self.abatch([messages]))[0]
+
+
+def get_judge(model: str, schema: Any = None, method: Optional[str] = None, **kwargs) -> JudgeExecutor:
+    """
+    Return the shared JudgeExecutor for (model, schema, method), creating it once.
+
+    Extra keyword arguments (max_concurrency, max_retries) only apply on creation.
+    """
+    key = (model, schema, method)
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(key)
+        if executor is None:
+            executor = JudgeExecutor(model, schema=schema, method=method, **kwargs)
+            _EXECUTORS[key] = executor
+    return executor
+
+
+def clear_judges() -> None:
+    """Drop the memoized results of every shared JudgeExecutor."""
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+    for executor in executors:
+        executor.clear()
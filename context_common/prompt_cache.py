@@ -0,0 +1,192 @@
+"""
+Prompt-cache-friendly prompt assembly and cache-hit accounting.
+
+Most of the input tokens in these scenarios are a static prefix: tool schemas, the
+system message and long shared instruction blocks that are identical across thousands
+of calls. Providers only reuse a cached prefix if it is byte-identical, so prompts are
+assembled with static content first and per-call content last:
+- assemble_prompt: plain string, static parts first (automatic prefix caching, e.g. OpenAI)
+- cached_system_message: SystemMessage with a cache breakpoint after the static parts
+  (explicit cache_control, e.g. Anthropic)
+- system_prompt_for: picks one of the two for a chat model
+
+CacheUsageTracker is a callback handler that records cached vs uncached input tokens
+for every model call (from usage_metadata.input_token_details), and
+CachingFakeChatModel is a stand-in model that simulates provider-side caching, so
+layouts and accounting can be checked without API calls.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatResult, LLMResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token), for the stand-in model."""
+    return (len(text) + 3) // 4
+
+
+def assemble_prompt(static_parts: Sequence[str], dynamic_parts: Sequence[str] = ()) -> str:
+    """Join prompt parts with every static part before any per-call part."""
+    return "\n\n".join(part.strip("\n") for part in [*static_parts, *dynamic_parts] if part)
+
+
+def cached_system_message(static_parts: Sequence[str], dynamic_parts: Sequence[str] = ()) -> SystemMessage:
+    """
+    System message with a cache breakpoint after the static parts.
+
+    The breakpoint caches everything before it, including the tool schemas (which
+    providers place ahead of the system message).
+    """
+    blocks: List[Dict[str, Any]] = [{
+        "type": "text",
+        "text": assemble_prompt(static_parts),
+        "cache_control": dict(CACHE_CONTROL),
+    }]
+    dynamic = assemble_prompt(dynamic_parts)
+    if dynamic:
+        blocks.append({"type": "text", "text": dynamic})
+    return SystemMessage(content=blocks)
+
+
+def supports_cache_breakpoints(model: Any) -> bool:
+    """Whether a chat model takes explicit cache_control breakpoints."""
+    name = type(model).__name__.lower()
+    return "anthropic" in name or bool(getattr(model, "cache_breakpoints", False))
+
+
+def system_prompt_for(model: Any, static_parts: Sequence[str], dynamic_parts: Sequence[str] = ()) -> Union[str, SystemMessage]:
+    """System prompt laid out for a model's caching: breakpoints if supported, else a static-first string."""
+    if supports_cache_breakpoints(model):
+        return cached_system_message(static_parts, dynamic_parts)
+    return assemble_prompt(static_parts, dynamic_parts)
+
+
+class CacheUsageTracker(BaseCallbackHandler):
+    """
+    Record cached vs uncached input tokens for every model call.
+
+    Pass it as a callback (config={"callbacks": [tracker]}); it reads the usage_metadata
+    of each response (input_token_details.cache_read / cache_creation).
+    """
+
+    def __init__(self):
+        self.calls: List[Dict[str, int]] = []
+        self._lock = threading.Lock()
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                input_tokens = usage.get("input_tokens", 0)
+                cached = details.get("cache_read", 0) or 0
+                record = {
+                    "input_tokens": input_tokens,
+                    "cached_tokens": cached,
+                    "cache_creation_tokens": details.get("cache_creation", 0) or 0,
+                    "uncached_tokens": input_tokens - cached,
+                    "output_tokens": usage.get("output_tokens", 0),
+                }
+                with self._lock:
+                    self.calls.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals over all recorded calls, with the cached share of input tokens."""
+        with self._lock:
+            calls = list(self.calls)
+        totals = {key: sum(call[key] for call in calls) for key in (
+            "input_tokens", "cached_tokens", "cache_creation_tokens", "uncached_tokens", "output_tokens"
+        )}
+        totals["calls"] = len(calls)
+        totals["cache_hit_rate"] = totals["cached_tokens"] / totals["input_tokens"] if totals["input_tokens"] else 0.0
+        return totals
+
+
+class CachingFakeChatModel(GenericFakeChatModel):
+    """
+    Fake chat model that simulates provider-side prompt caching.
+
+    The prompt is split into segments (bound tool schemas, then each message's content
+    blocks). With breakpoints (cache_breakpoints=True, Anthropic style) only prefixes
+    ending at a block marked with cache_control are cached, and writing one is reported
+    as cache_creation. Without them (OpenAI style) every segment boundary is a
+    candidate and caching is free. A call reads the longest previously cached prefix of
+    at least min_cacheable_tokens. Responses come from `messages` like
+    GenericFakeChatModel, with usage_metadata attached.
+    """
+
+    cache_breakpoints: bool = True
+    min_cacheable_tokens: int = 1024
+    bound_tools: List[Dict[str, Any]] = Field(default_factory=list)
+    # Prefix hashes seen so far; shared by copies made through bind_tools
+    prompt_cache: Dict[str, int] = Field(default_factory=dict)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "CachingFakeChatModel":
+        return self.model_copy(update={"bound_tools": [convert_to_openai_tool(tool) for tool in tools]})
+
+    def _segments(self, messages: List[BaseMessage]) -> List[tuple]:
+        """(text, is_breakpoint) segments in the order providers hash them."""
+        segments = []
+        if self.bound_tools:
+            segments.append((json.dumps(self.bound_tools, sort_keys=True), False))
+        for message in messages:
+            content = message.content
+            blocks = content if isinstance(content, list) else [content]
+            for block in blocks:
+                if isinstance(block, dict):
+                    text = block.get("text") or json.dumps(block, sort_keys=True)
+                    breakpoint = "cache_control" in block
+                else:
+                    text, breakpoint = str(block), False
+                segments.append((f"{message.type}:{text}", breakpoint))
+            if getattr(message, "tool_calls", None):
+                segments.append((json.dumps(message.tool_calls, sort_keys=True, default=str), False))
+        return segments
+
+    def _usage(self, messages: List[BaseMessage]) -> Dict[str, int]:
+        digest = hashlib.sha256()
+        tokens = 0
+        cached = 0
+        largest_candidate = 0
+        new_prefixes = []
+        for text, breakpoint in self._segments(messages):
+            digest.update(text.encode("utf-8"))
+            tokens += estimate_tokens(text)
+            if (breakpoint or not self.cache_breakpoints) and tokens >= self.min_cacheable_tokens:
+                key = digest.hexdigest()
+                if key in self.prompt_cache:
+                    cached = tokens
+                else:
+                    new_prefixes.append(key)
+                largest_candidate = tokens
+        for key in new_prefixes:
+            self.prompt_cache[key] = 1
+        creation = largest_candidate - cached if self.cache_breakpoints and new_prefixes else 0
+        return {"input_tokens": tokens, "cache_read": cached, "cache_creation": creation}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        usage = self._usage(messages)
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        message = result.generations[0].message
+        if isinstance(message, AIMessage):
+            output_tokens = estimate_tokens(str(message.content))
+            message.usage_metadata = {
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": output_tokens,
+                "total_tokens": usage["input_tokens"] + output_tokens,
+                "input_token_details": {"cache_read": usage["cache_read"], "cache_creation": usage["cache_creation"]},
+            }
+        return result
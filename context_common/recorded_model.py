@@ -0,0 +1,104 @@
+"""
+Record-and-replay chat model for offline experiment runs.
+
+RecordedChatModel wraps a real chat model. Every response is stored in a JSONL file,
+keyed by a hash of the request (bound tool schemas + messages). Later runs are served
+from the file, so sweeps and notebook re-runs can repeat without API calls. Prompts
+that were never recorded go to the wrapped model, or fail when there is none
+(replay-only).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field, PrivateAttr
+
+
+class RecordedChatModel(BaseChatModel):
+    """
+    Chat model that replays recorded responses and records new ones.
+
+    Args:
+        path: JSONL file of recordings (created on the first recorded response)
+        model: Chat model for prompts not recorded yet (None = replay only)
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    path: str
+    model: Optional[Any] = None
+    bound_tools: List[Dict[str, Any]] = Field(default_factory=list)
+    tool_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    _recordings: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"replayed": 0, "recorded": 0})
+    _source_tools: List[Any] = PrivateAttr(default_factory=list)
+
+    def model_post_init(self, __context: Any) -> None:
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings[entry["key"]] = entry["message"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "recorded-chat-model"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Responses replayed from and recorded to the file so far."""
+        return dict(self._stats)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RecordedChatModel":
+        copy = self.model_copy(update={"bound_tools": [convert_to_openai_tool(tool) for tool in tools], "tool_kwargs": kwargs})
+        # Copies share the recordings, lock and stats
+        copy._recordings, copy._lock, copy._stats = self._recordings, self._lock, self._stats
+        copy._source_tools = list(tools)
+        return copy
+
+    def _key(self, messages: List[BaseMessage]) -> str:
+        # Message IDs differ on every run, so only the conversation itself is hashed
+        conversation = [
+            {
+                "type": m.type,
+                "content": m.content,
+                "tool_calls": [(tc["name"], tc["args"], tc.get("id")) for tc in getattr(m, "tool_calls", None) or []],
+                "tool_call_id": getattr(m, "tool_call_id", None),
+            }
+            for m in messages
+        ]
+        payload = json.dumps({"tools": self.bound_tools, "messages": conversation}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._key(messages)
+        with self._lock:
+            recorded = self._recordings.get(key)
+            if recorded is not None:
+                self._stats["replayed"] += 1
+        if recorded is None:
+            if self.model is None:
+                raise KeyError(f"No recorded response for this prompt in {self.path} (replay only; pass model= to record)")
+            model = self.model
+            if self.bound_tools:
+                model = model.bind_tools(self._source_tools, **self.tool_kwargs)
+            # Without callbacks, so usage trackers don't count the recorded call twice
+            message = model.invoke(messages, stop=stop, config={"callbacks": []})
+            recorded = message_to_dict(message)
+            with self._lock:
+                if key not in self._recordings:
+                    self._recordings[key] = recorded
+                    self._stats["recorded"] += 1
+                    with open(self.path, "a") as f:
+                        f.write(json.dumps({"key": key, "message": recorded}, default=str) + "\n")
+        message = messages_from_dict([recorded])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,270 @@
+"""
+Local experiment-results store.
+
+Metric helpers used to re-read every experiment from LangSmith (list(experiment) plus
+read_project(include_stats=True)) each time a notebook cell, plot or comparison table
+needed its numbers. ResultsStore ingests an experiment once into a local SQLite file:
+per-example scores, tokens, latency, cost and the experiment's configuration. Metrics,
+summary tables and regression checks are then queries on that file, with no network
+calls.
+
+Tables:
+- experiments: name, config (JSON), ingested_at, runs
+- runs: one row per root run (example_id, latency, prompt/completion/total tokens, cost, error)
+- scores: one row per (run, evaluator key) score
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+DEFAULT_RESULTS_PATH = Path(
+    os.environ.get("CONTEXT_EVALS_RESULTS_DB", "~/.cache/context-failure-evals/results.sqlite")
+).expanduser()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    name TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    ingested_at TEXT NOT NULL,
+    runs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    experiment TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    example_id TEXT,
+    latency REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    cost REAL,
+    error TEXT,
+    PRIMARY KEY (experiment, run_id)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    experiment TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    score REAL,
+    PRIMARY KEY (experiment, run_id, key)
+);
+CREATE INDEX IF NOT EXISTS scores_by_key ON scores (experiment, key);
+"""
+
+_RUN_COLUMNS = ("run_id", "example_id", "latency", "prompt_tokens", "completion_tokens", "total_tokens", "cost", "error")
+
+
+def _latency(run: Any) -> Optional[float]:
+    start, end = getattr(run, "start_time", None), getattr(run, "end_time", None)
+    return (end - start).total_seconds() if start and end else None
+
+
+def _run_row(run: Any, stats: Any = None) -> Dict[str, Any]:
+    """Row for one root run; token and cost stats come from `stats` (a listed run) if given."""
+    stats = stats if stats is not None else run
+    cost = getattr(stats, "total_cost", None)
+    latency = _latency(stats)
+    return {
+        "run_id": str(run.id),
+        "example_id": str(run.reference_example_id) if getattr(run, "reference_example_id", None) else None,
+        "latency": latency if latency is not None else _latency(run),
+        "prompt_tokens": getattr(stats, "prompt_tokens", None),
+        "completion_tokens": getattr(stats, "completion_tokens", None),
+        "total_tokens": getattr(stats, "total_tokens", None),
+        "cost": float(cost) if cost is not None else None,
+        "error": getattr(run, "error", None),
+    }
+
+
+class ResultsStore:
+    """
+    Experiment results in a local SQLite file.
+
+    Args:
+        path: Database file (":memory:" for a throwaway store)
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_RESULTS_PATH):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def __contains__(self, experiment: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM experiments WHERE name = ?", (experiment,)).fetchone()
+        return row is not None
+
+    def experiments(self) -> List[str]:
+        """Names of the ingested experiments."""
+        with self._lock:
+            return [name for (name,) in self._conn.execute("SELECT name FROM experiments ORDER BY ingested_at")]
+
+    def ingest_rows(self, experiment: str, runs: Iterable[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Store an experiment from plain rows, replacing any earlier copy.
+
+        Args:
+            experiment: Experiment name
+            runs: One dict per run with run_id, example_id, latency, prompt_tokens,
+                completion_tokens, total_tokens, cost, error (all optional except
+                run_id) and scores ({evaluator key: score})
+            config: Experiment configuration (tool count, model, prompt variant, ...)
+        """
+        runs = list(runs)
+        with self._lock, self._conn:
+            for table, column in (("scores", "experiment"), ("runs", "experiment"), ("experiments", "name")):
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (experiment,))
+            self._conn.executemany(
+                f"INSERT INTO runs (experiment, {', '.join(_RUN_COLUMNS)}) VALUES ({', '.join('?' * (len(_RUN_COLUMNS) + 1))})",
+                [(experiment, *(run.get(column) for column in _RUN_COLUMNS)) for run in runs],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (experiment, run_id, key, score) VALUES (?, ?, ?, ?)",
+                [
+                    (experiment, run["run_id"], key, None if score is None else float(score))
+                    for run in runs
+                    for key, score in (run.get("scores") or {}).items()
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO experiments (name, config, ingested_at, runs) VALUES (?, ?, ?, ?)",
+                (experiment, json.dumps(config or {}, sort_keys=True, default=str),
+                 datetime.now(timezone.utc).isoformat(), len(runs)),
+            )
+        return experiment
+
+    def ingest_experiment(self, experiment: Any, config: Optional[Dict[str, Any]] = None, client: Any = None, force: bool = False) -> str:
+        """
+        Ingest a LangSmith experiment (the result of evaluate()) once.
+
+        Scores come from the experiment's evaluation results. Tokens and cost come from
+        a single list_runs call over the experiment's root runs (run stats are only
+        aggregated server-side). An experiment that is already stored is skipped
+        without any network call unless force=True.
+
+        Returns:
+            The experiment name.
+        """
+        name = experiment.experiment_name
+        if not force and name in self:
+            return name
+        results = list(experiment)
+        if client is None:
+            from langsmith import Client
+            client = Client()
+        stats = {str(run.id): run for run in client.list_runs(project_name=name, is_root=True)}
+        runs = []
+        for result in results:
+            run = result["run"]
+            row = _run_row(run, stats.get(str(run.id)))
+            row["scores"] = {
+                eval_result.key: eval_result.score
+                for eval_result in result["evaluation_results"]["results"]
+                if eval_result.score is not None
+            }
+            runs.append(row)
+        return self.ingest_rows(name, runs, config)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        """Run a SQL query on the store."""
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    def runs(self, experiment: str) -> pd.DataFrame:
+        """One row per example: run stats plus one column per evaluator key."""
+        runs = self.query("SELECT * FROM runs WHERE experiment = ?", (experiment,))
+        scores = self.query("SELECT run_id, key, score FROM scores WHERE experiment = ?", (experiment,))
+        if not scores.empty:
+            runs = runs.merge(scores.pivot(index="run_id", columns="key", values="score").reset_index(), on="run_id", how="left")
+        return runs
+
+    def metrics(self, experiment: str) -> Dict[str, float]:
+        """
+        Aggregate metrics for one experiment.
+
+        Returns:
+            Mean score per evaluator key, plus runs, latency_avg, latency_p99 (seconds),
+            avg_tokens and avg_cost.
+        """
+        if experiment not in self:
+            raise KeyError(f"Experiment not in results store: {experiment}")
+        runs = self.runs(experiment)
+        keys = self.query("SELECT DISTINCT key FROM scores WHERE experiment = ?", (experiment,))["key"]
+        metrics = {key: float(runs[key].mean()) for key in keys}
+        latency = runs["latency"].dropna()
+        metrics.update({
+            "runs": len(runs),
+            "latency_avg": float(latency.mean()) if len(latency) else 0.0,
+            "latency_p99": float(latency.quantile(0.99)) if len(latency) else 0.0,
+            "avg_tokens": float(runs["total_tokens"].fillna(0).sum() / len(runs)) if len(runs) else 0.0,
+            "avg_cost": float(runs["cost"].fillna(0).sum() / len(runs)) if len(runs) else 0.0,
+        })
+        return metrics
+
+    def config(self, experiment: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM experiments WHERE name = ?", (experiment,)).fetchone()
+        if row is None:
+            raise KeyError(f"Experiment not in results store: {experiment}")
+        return json.loads(row[0])
+
+    def summary(self, experiments: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """One row per experiment: configuration columns followed by its metrics."""
+        experiments = list(experiments) if experiments is not None else self.experiments()
+        return pd.DataFrame([
+            {"experiment": name, **self.config(name), **self.metrics(name)}
+            for name in experiments
+        ])
+
+    def check_regression(
+        self,
+        baseline: str,
+        candidate: str,
+        tolerance: float = 0.02,
+        lower_is_better: Sequence[str] = ("latency_avg", "latency_p99", "avg_tokens", "avg_cost"),
+    ) -> pd.DataFrame:
+        """
+        Compare a candidate experiment's metrics with a baseline's.
+
+        A score regresses when it drops by more than `tolerance` (absolute); a cost-like
+        metric (lower_is_better) regresses when it grows by more than `tolerance` relative
+        to the baseline.
+
+        Returns:
+            One row per shared metric: metric, baseline, candidate, delta, regressed.
+        """
+        base, cand = self.metrics(baseline), self.metrics(candidate)
+        rows = []
+        for metric in base:
+            if metric == "runs" or metric not in cand:
+                continue
+            delta = cand[metric] - base[metric]
+            if metric in lower_is_better:
+                regressed = delta > tolerance * abs(base[metric])
+            else:
+                regressed = delta < -tolerance
+            rows.append({"metric": metric, "baseline": base[metric], "candidate": cand[metric], "delta": delta, "regressed": regressed})
+        return pd.DataFrame(rows)
+
+
+_DEFAULT_STORE: Optional[ResultsStore] = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def get_results_store() -> ResultsStore:
+    """The shared store at DEFAULT_RESULTS_PATH, opened on first use."""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = ResultsStore()
+        return _DEFAULT_STORE
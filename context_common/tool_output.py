@@ -0,0 +1,202 @@
+"""
+Compact encoding for tool results.
+
+Tool output is most of the prompt tokens in these scenarios. Tools return plain dicts,
+which end up in ToolMessages as default-spaced JSON, often wrapped in {"ok": true,
+"data": ...} envelopes, with unset fields and fields that repeat another field's content
+(e.g. summary_text = json.dumps(summary, indent=2), detailed_analysis = summary).
+
+encode_tool_result turns a result into compact JSON:
+- {"ok": true, "data": X} envelopes are unwrapped to X (errors keep {"ok": false, ...})
+- None and "" fields are dropped (empty lists and dicts are kept: "none" is information)
+- a string field that is a serialized JSON copy of a sibling field is dropped
+- fields the tool declares redundant (e.g. detailed_analysis) are dropped when they
+  repeat a sibling's value; other fields are never merged, however equal their values
+- keys can optionally be abbreviated (see DEFAULT_ABBREVIATIONS)
+- JSON is written without whitespace
+
+Tools opt in with the compact_result decorator (or compact_tools for a list of plain
+tool functions). Setting the mode to "verbose" (set_tool_output_mode, or
+CONTEXT_EVALS_TOOL_OUTPUT=verbose) returns results exactly as the tools built them,
+for comparison runs.
+"""
+
+import functools
+import inspect
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Sequence
+
+COMPACT = "compact"
+VERBOSE = "verbose"
+
+_MODE = os.environ.get("CONTEXT_EVALS_TOOL_OUTPUT", COMPACT)
+
+DEFAULT_ABBREVIATIONS: Dict[str, str] = {
+    "description": "desc",
+    "timestamp": "ts",
+    "customer_id": "cust_id",
+    "order_id": "oid",
+    "tracking_number": "tracking",
+    "warehouse_id": "wh_id",
+    "quantity": "qty",
+    "currency": "cur",
+    "percentage": "pct",
+    "recommendation": "rec",
+    "information": "info",
+    "statistics": "stats",
+}
+
+
+def set_tool_output_mode(mode: str) -> None:
+    """Switch tool output between "compact" (default) and "verbose" (as built by the tools)."""
+    global _MODE
+    if mode not in (COMPACT, VERBOSE):
+        raise ValueError(f"Unknown tool output mode: {mode}")
+    _MODE = mode
+
+
+def get_tool_output_mode() -> str:
+    return _MODE
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _serialized_copy(value: Any) -> Optional[str]:
+    """Canonical form of a JSON object/array held in a string, else None."""
+    if not isinstance(value, str):
+        return None
+    stripped = value.strip()
+    if stripped[:1] not in ("{", "["):
+        return None
+    try:
+        return _canonical(json.loads(stripped))
+    except ValueError:
+        return None
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == ""
+
+
+def compact_value(
+    value: Any,
+    strip_empty: bool = True,
+    redundant: Sequence[str] = (),
+    abbreviations: Optional[Dict[str, str]] = None,
+) -> Any:
+    """
+    Recursively strip unset fields, drop redundant copies of sibling fields and
+    abbreviate keys.
+
+    Args:
+        value: Value to compact
+        strip_empty: Drop None and "" fields
+        redundant: Field names that are dropped when they repeat a sibling's value
+        abbreviations: Key abbreviations to apply
+    """
+    if isinstance(value, dict):
+        structured = {_canonical(raw) for raw in value.values() if isinstance(raw, (dict, list))}
+        compacted = {}
+        kept = set()
+        for key, raw in value.items():
+            # Compared as the tool built them, before compaction
+            copy = _serialized_copy(raw)
+            if copy is not None and copy in structured:
+                continue
+            if key in redundant:
+                fingerprint = copy or _canonical(raw)
+                # Repeats a field that is not itself redundant, or one already kept
+                if fingerprint in kept or any(
+                    other not in redundant and _canonical(other_raw) == fingerprint
+                    for other, other_raw in value.items()
+                ):
+                    continue
+                kept.add(fingerprint)
+            item = compact_value(raw, strip_empty, redundant, abbreviations)
+            if strip_empty and _is_empty(item):
+                continue
+            if abbreviations:
+                key = abbreviations.get(key, key)
+            compacted[key] = item
+        return compacted
+    if isinstance(value, (list, tuple)):
+        return [compact_value(item, strip_empty, redundant, abbreviations) for item in value]
+    return value
+
+
+def encode_tool_result(
+    result: Any,
+    mode: Optional[str] = None,
+    strip_empty: bool = True,
+    redundant: Sequence[str] = (),
+    abbreviations: Optional[Dict[str, str]] = None,
+) -> Any:
+    """
+    Encode a tool result for a ToolMessage.
+
+    Args:
+        result: The tool's return value
+        mode: "compact" or "verbose" (defaults to the current tool output mode)
+        strip_empty: Drop None and "" fields
+        redundant: Field names to drop when they repeat a sibling's value
+        abbreviations: Key abbreviations to apply (e.g. DEFAULT_ABBREVIATIONS)
+
+    Returns:
+        Compact JSON for dict and list results in compact mode; the result unchanged
+        in verbose mode and for strings and other values (which tools return as-is).
+    """
+    if (mode or _MODE) == VERBOSE or not isinstance(result, (dict, list)):
+        return result
+    if isinstance(result, dict) and result.get("ok") is True and set(result) == {"ok", "data"}:
+        result = result["data"]
+    return _dumps(compact_value(result, strip_empty, redundant, abbreviations))
+
+
+def compact_result(
+    func: Optional[Callable] = None,
+    *,
+    strip_empty: bool = True,
+    redundant: Sequence[str] = (),
+    abbreviations: Optional[Dict[str, str]] = None,
+) -> Callable:
+    """
+    Decorate a tool function so its result goes through encode_tool_result.
+
+    The wrapper keeps the function's name, docstring and signature, so it can sit
+    under @tool or be passed to create_agent directly. Usable bare or with options:
+
+        @tool
+        @compact_result
+        def get_statistics(topic: str) -> Dict[str, Any]: ...
+
+        @tool
+        @compact_result(redundant=("detailed_analysis",))
+        def research_topic(topic: str) -> Dict[str, Any]: ...
+
+        compact_result(get_order, abbreviations=DEFAULT_ABBREVIATIONS)
+    """
+    def decorate(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                return encode_tool_result(await fn(*args, **kwargs), None, strip_empty, redundant, abbreviations)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return encode_tool_result(fn(*args, **kwargs), None, strip_empty, redundant, abbreviations)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def compact_tools(tools, **options) -> list:
+    """Apply compact_result (with the same options) to every tool function in a list."""
+    return [compact_result(tool, **options) for tool in tools]
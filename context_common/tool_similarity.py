@@ -0,0 +1,346 @@
+"""
+Near-duplicate tool detection and consolidation planning.
+
+Every bound tool schema is sent on every turn, and overlapping tools (get_order_summary,
+check_order_status, lookup_order_details, ... next to get_order) also make tool choice
+harder. This module fingerprints each tool by:
+- its name and docstring words (with synonyms such as lookup/check/verify -> get folded)
+- its argument names
+- the data tables it reads (upper-case module globals such as ORDERS)
+
+MinHash signatures with LSH banding find candidate pairs without comparing every pair,
+so large registries stay cheap. A candidate pair only counts if both tools perform the
+same operation on the same object (the first two name words, so check_order_status and
+get_order match but get_invoice and get_order don't), and is confirmed with its exact
+Jaccard similarity. Near-duplicates are clustered, and consolidation_plan proposes one tool to keep per
+cluster, with the schema tokens the removed tools cost on every turn.
+
+    python -m context_common.tool_similarity   # plan for the context_confusion registry
+"""
+
+import hashlib
+import inspect
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+from langchain_core.tools import BaseTool
+from langchain_core.tools import tool as as_tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from context_common.prompt_cache import estimate_tokens
+
+DEFAULT_THRESHOLD = 0.3
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 64
+
+# Mersenne prime for the universal hash family; feature hashes are 31-bit so a*x + b
+# fits in 64 bits
+_PRIME = (1 << 31) - 1
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from if in into is it its of on or the this to with "
+    "without before after all any comprehensive".split()
+)
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+
+# Words that name the same operation or payload in tool names and docstrings
+_SYNONYMS = {
+    "lookup": "get", "look": "get", "check": "get", "verify": "get", "validate": "get",
+    "retrieve": "get", "fetch": "get", "analyze": "get", "diagnose": "get", "find": "get",
+    "refresh": "get",
+    "details": "info", "detailed": "info", "information": "info", "summary": "info", "data": "info",
+}
+
+# Repeats per feature. Shared arguments (order_id) and tables (ORDERS) are common to
+# tools with distinct features, so they weigh no more than a single name or doc word
+_ARG_WEIGHT = 1
+_TABLE_WEIGHT = 1
+
+
+def _tool_function(tool: Any) -> Optional[Callable]:
+    """The Python function behind a tool (a plain function or a LangChain tool)."""
+    func = getattr(tool, "func", None) or getattr(tool, "coroutine", None) or tool
+    return inspect.unwrap(func) if callable(func) else None
+
+
+def tool_name(tool: Any) -> str:
+    return getattr(tool, "name", None) or getattr(tool, "__name__", str(tool))
+
+
+def tool_schema(tool: Any) -> Dict[str, Any]:
+    """The function-calling schema a model sees for the tool (built the way create_agent does)."""
+    return convert_to_openai_tool(tool if isinstance(tool, BaseTool) else as_tool(tool))
+
+
+def _code_names(code) -> Set[str]:
+    """Global names used by a code object and its nested functions."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _words(text: str) -> List[str]:
+    words = (_SYNONYMS.get(word, word) for word in _WORD.findall(text.lower()))
+    return [word for word in words if word not in _STOPWORDS]
+
+
+def tool_operation(tool: Any) -> tuple:
+    """Operation and object of a tool: its first two name words (("get", "order") for check_order_status)."""
+    return tuple(_words(tool_name(tool).replace("_", " "))[:2])
+
+
+def tool_features(tool: Any) -> Set[str]:
+    """Feature set (name and doc words, arguments, tables) that fingerprints a tool."""
+    schema = tool_schema(tool)["function"]
+    features = {f"name:{word}" for word in _words(schema["name"].replace("_", " "))}
+    features.update(f"doc:{word}" for word in _words(schema.get("description", "")))
+    for arg in schema.get("parameters", {}).get("properties", {}):
+        features.update(f"arg:{arg}#{k}" for k in range(_ARG_WEIGHT))
+
+    func = _tool_function(tool)
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        module_globals = getattr(func, "__globals__", {})
+        for name in _code_names(code):
+            if name.isupper() and isinstance(module_globals.get(name), (dict, list, tuple, set)):
+                features.update(f"table:{name}#{k}" for k in range(_TABLE_WEIGHT))
+    return features
+
+
+def _feature_hashes(features: Iterable[str]) -> np.ndarray:
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little") % _PRIME for f in features],
+        dtype=np.uint64,
+    )
+
+
+class MinHasher:
+    """
+    MinHash signatures over feature sets.
+
+    Args:
+        num_perm: Signature length (more = more accurate similarity estimates)
+        seed: Seed for the hash family
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        hashes = _feature_hashes(features)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the two feature sets."""
+        return float(np.mean(sig_a == sig_b))
+
+
+def _candidate_pairs(signatures: np.ndarray, bands: int) -> Set[tuple]:
+    """Pairs that share at least one LSH band bucket."""
+    rows = signatures.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, signature in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(signature.tobytes(), []).append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def find_near_duplicates(
+    tools: Sequence[Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    bands: int = DEFAULT_BANDS,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Cluster tools whose feature sets overlap by at least the threshold.
+
+    LSH candidates are verified with the exact Jaccard similarity of their feature sets;
+    tools with different operations (tool_operation) are never near-duplicates.
+    Clusters are merged from the most similar pair down, and only while the average
+    similarity across the two clusters stays at or above the threshold, so one borderline
+    pair can't chain unrelated tools together.
+
+    Args:
+        tools: Tool functions or LangChain tools
+        threshold: Minimum Jaccard similarity for near-duplicates
+        num_perm: MinHash signature length
+        bands: LSH bands (num_perm must be divisible by it); more bands find
+            lower-similarity candidates
+        seed: Seed for the hash family
+
+    Returns:
+        Clusters of two or more tools, largest first:
+        {"tools": [names], "pairs": [(name, name, similarity), ...]}
+    """
+    if num_perm % bands:
+        raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+    hasher = MinHasher(num_perm, seed)
+    names = [tool_name(tool) for tool in tools]
+    operations = [tool_operation(tool) for tool in tools]
+    features = [tool_features(tool) for tool in tools]
+    signatures = np.stack([hasher.signature(f) for f in features])
+
+    def pair_similarity(x: int, y: int) -> float:
+        return jaccard(features[x], features[y]) if operations[x] == operations[y] else 0.0
+
+    similar = {}
+    for i, j in _candidate_pairs(signatures, bands):
+        similarity = pair_similarity(i, j)
+        if similarity >= threshold:
+            similar[(i, j)] = similarity
+
+    def linkage(a: List[int], b: List[int]) -> float:
+        return sum(similar.get((min(x, y), max(x, y)), pair_similarity(x, y)) for x in a for y in b) / (len(a) * len(b))
+
+    cluster_of = {i: [i] for i in range(len(tools))}
+    for (i, j), similarity in sorted(similar.items(), key=lambda item: (-item[1], item[0])):
+        a, b = cluster_of[i], cluster_of[j]
+        if a is b or linkage(a, b) < threshold:
+            continue
+        a.extend(b)
+        for member in b:
+            cluster_of[member] = a
+
+    clusters = []
+    for members in {id(c): c for c in cluster_of.values() if len(c) > 1}.values():
+        members = sorted(members)
+        pairs = [
+            (names[i], names[j], round(similar[(i, j)], 3))
+            for i in members for j in members if (i, j) in similar
+        ]
+        clusters.append({"tools": [names[i] for i in members], "pairs": pairs})
+    return sorted(clusters, key=lambda cluster: -len(cluster["tools"]))
+
+
+def consolidation_plan(
+    tools: Sequence[Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    keep: Iterable[str] = (),
+    **options: Any,
+) -> Dict[str, Any]:
+    """
+    Propose which near-duplicate tools to drop, with the prompt tokens it saves.
+
+    Tools named in `keep` (e.g. the core tools) are never removed; the first of them in a
+    cluster absorbs the rest, else the tool most similar to the rest of its cluster does.
+    The kept tool's arguments are extended with any argument only the removed tools take
+    (add_args), so no capability is lost when it absorbs them.
+
+    Args:
+        tools: Tool registry (functions or LangChain tools)
+        threshold: Minimum estimated similarity for a near-duplicate pair
+        keep: Tool names to prefer as the survivor of their cluster
+        **options: num_perm, bands, seed for find_near_duplicates
+
+    Returns:
+        {"clusters": [{"keep", "remove", "add_args", "tools", "pairs", "tokens_saved"}],
+         "tools_before", "tools_after", "schema_tokens_before", "schema_tokens_after",
+         "tokens_saved", "savings_pct"}; token counts are per turn (all schemas bound).
+    """
+    by_name = {tool_name(tool): tool for tool in tools}
+    schemas = {name: tool_schema(tool) for name, tool in by_name.items()}
+    tokens = {name: estimate_tokens(json.dumps(schema)) for name, schema in schemas.items()}
+    preferred = set(keep)
+
+    clusters = []
+    for cluster in find_near_duplicates(tools, threshold, **options):
+        members = cluster["tools"]
+        keepers = [name for name in members if name in preferred]
+        if keepers:
+            survivor = keepers[0]
+        else:
+            affinity = {name: 0.0 for name in members}
+            for a, b, similarity in cluster["pairs"]:
+                affinity[a] += similarity
+                affinity[b] += similarity
+            survivor = max(members, key=lambda name: (affinity[name], -tokens[name]))
+        removed = [name for name in members if name != survivor and name not in preferred]
+        if not removed:
+            continue
+        kept_args = set(schemas[survivor]["function"].get("parameters", {}).get("properties", {}))
+        add_args = sorted({
+            arg
+            for name in removed
+            for arg in schemas[name]["function"].get("parameters", {}).get("properties", {})
+        } - kept_args)
+        clusters.append({
+            "keep": survivor,
+            "remove": removed,
+            "add_args": add_args,
+            "tools": members,
+            "pairs": cluster["pairs"],
+            "tokens_saved": sum(tokens[name] for name in removed),
+        })
+
+    before = sum(tokens.values())
+    saved = sum(cluster["tokens_saved"] for cluster in clusters)
+    removed_count = sum(len(cluster["remove"]) for cluster in clusters)
+    return {
+        "clusters": clusters,
+        "tools_before": len(by_name),
+        "tools_after": len(by_name) - removed_count,
+        "schema_tokens_before": before,
+        "schema_tokens_after": before - saved,
+        "tokens_saved": saved,
+        "savings_pct": saved / before * 100 if before else 0.0,
+    }
+
+
+def format_plan(plan: Dict[str, Any]) -> str:
+    """Human-readable consolidation report."""
+    lines = [
+        f"Tools: {plan['tools_before']} -> {plan['tools_after']}",
+        f"Schema tokens per turn: {plan['schema_tokens_before']:,} -> {plan['schema_tokens_after']:,} "
+        f"(-{plan['tokens_saved']:,}, {plan['savings_pct']:.1f}%)",
+    ]
+    for cluster in plan["clusters"]:
+        lines.append("")
+        lines.append(f"keep {cluster['keep']}  (saves ~{cluster['tokens_saved']} tokens/turn)")
+        lines.append(f"  remove: {', '.join(cluster['remove'])}")
+        if cluster["add_args"]:
+            lines.append(f"  add args: {', '.join(cluster['add_args'])}")
+    return "\n".join(lines)
+
+
+def check_plan(plan: Dict[str, Any], duplicates: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Compare a plan with a known answer (the names of the registry's redundant tools).
+
+    Returns:
+        {"wrongly_removed": removed tools that aren't known duplicates (lost features),
+         "missed": known duplicates the plan keeps}
+    """
+    duplicates = set(duplicates)
+    removed = {name for cluster in plan["clusters"] for name in cluster["remove"]}
+    return {"wrongly_removed": sorted(removed - duplicates), "missed": sorted(duplicates - removed)}
+
+
+if __name__ == "__main__":
+    from context_confusion.tools import all_tools, confusing_duplicate_tools, shipping_core_tools
+
+    plan = consolidation_plan(all_tools, keep=[tool_name(tool) for tool in shipping_core_tools])
+    print(format_plan(plan))
+    # confusing_duplicate_tools are the registry's known near-duplicates
+    result = check_plan(plan, [tool_name(tool) for tool in confusing_duplicate_tools])
+    print(f"\nKnown answer: wrongly removed {result['wrongly_removed'] or 'none'}, missed {result['missed'] or 'none'}")
+    raise SystemExit(1 if result["wrongly_removed"] else 0)
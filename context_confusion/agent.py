@@ -28,6 +28,11 @@ from context_confusion.instructions import (
 
 from context_confusion.additional_context import IRRELEVANT_INSTRUCTIONS
 
+from langchain.agents import create_agent
+
+from context_common.prompt_cache import system_prompt_for
+from context_confusion.solutions.tool_loading import TOOL_GROUPS, ToolGroupLoader
+
 
 # =====================================================
 # Configuration Options
@@ -77,6 +82,13 @@ ALL_INSTRUCTIONS = f"""
 {IRRELEVANT_INSTRUCTIONS}
 """
 
+# Lazy tool loading: start with the core groups, load the others on demand
+LAZY_PRELOADED_GROUPS = ("shipping_core", "carrier")
+FULL_SHIPPING_GROUPS = (
+    "shipping_core", "carrier", "returns", "warehouse",
+    "order_modification", "customer_service", "billing",
+)
+
 
 # =====================================================
 # Agent System Message
@@ -110,51 +122,100 @@ def create_focused_agent(llm):
     """
     system_message = SYSTEM_MESSAGE.format(instructions=CORE_INSTRUCTIONS)
     
-    # Your agent creation logic here
-    # Example:
-    # from langgraph.prebuilt import create_react_agent
-    # return create_react_agent(llm, CORE_TOOLS, messages_modifier=system_message)
+    # Create the agent with build_agent(llm, create_focused_agent(llm))
     
     return {
         "tools": CORE_TOOLS,
         "system_message": system_message,
+        "system_prompt": system_prompt_for(llm, [system_message]),
         "description": "Focused shipping support agent"
     }
 
 
-def create_full_operations_agent(llm):
+def _create_lazy_agent(llm, group_names, description):
+    """
+    Agent config that binds only the core groups plus a load_tool_group catalog tool.
+    
+    The returned middleware registers every group's tools and exposes a group's
+    schemas and instructions only after the agent loads it:
+        build_agent(llm, config)
+    """
+    system_message = SYSTEM_MESSAGE.format(instructions=CORE_INSTRUCTIONS)
+    loader = ToolGroupLoader(
+        groups={name: TOOL_GROUPS[name] for name in group_names},
+        preloaded=LAZY_PRELOADED_GROUPS,
+    )
+    
+    return {
+        "tools": [],
+        "middleware": [loader],
+        "system_message": system_message,
+        "system_prompt": system_prompt_for(llm, [system_message]),
+        "description": description
+    }
+
+
+def create_full_operations_agent(llm, lazy_tools: bool = False):
     """
     Create an agent with full shipping operations capabilities.
     
     This configuration includes returns, warehouse, billing, and
     customer service tools - more realistic for a production system.
+    With lazy_tools=True, only the core groups are bound up front and the
+    rest are loaded on demand.
     """
+    if lazy_tools:
+        return _create_lazy_agent(llm, FULL_SHIPPING_GROUPS, "Full shipping operations agent (lazy tool loading)")
+    
     system_message = SYSTEM_MESSAGE.format(instructions=FULL_SHIPPING_INSTRUCTIONS)
     
     return {
         "tools": FULL_SHIPPING_TOOLS,
         "system_message": system_message,
+        "system_prompt": system_prompt_for(llm, [system_message]),
         "description": "Full shipping operations agent"
     }
 
 
-def create_context_confusion_agent(llm):
+def create_context_confusion_agent(llm, lazy_tools: bool = False):
     """
     Create an agent with ALL tools including irrelevant domains.
     
     This configuration is designed to test context confusion by
     providing many tools and instructions across diverse domains,
     many of which are not relevant to shipping support.
+    With lazy_tools=True, every domain group stays out of the prompt
+    until the agent loads it.
     """
+    if lazy_tools:
+        return _create_lazy_agent(llm, list(TOOL_GROUPS), "Context confusion test agent (lazy tool loading)")
+    
     system_message = SYSTEM_MESSAGE.format(instructions=ALL_INSTRUCTIONS)
     
     return {
         "tools": ALL_TOOLS,
         "system_message": system_message,
+        "system_prompt": system_prompt_for(llm, [system_message]),
         "description": "Context confusion test agent"
     }
 
 
+def build_agent(llm, config):
+    """
+    Create the agent for a config from one of the create_*_agent functions.
+    
+    The config's system_prompt is the system message laid out for the model's prompt
+    caching (a cache breakpoint for Anthropic models), so the long instructions and
+    the tool schemas ahead of them are served from the cache on repeat calls.
+    """
+    return create_agent(
+        model=llm,
+        tools=config["tools"],
+        system_prompt=config["system_prompt"],
+        middleware=config.get("middleware", ()),
+    )
+
+
 # =====================================================
 # Example Test Queries
 # =====================================================
@@ -220,6 +281,6 @@ if __name__ == "__main__":
     print("To use this agent:")
     print("1. Initialize your LLM")
     print("2. Choose a configuration (focused, full, or context_confusion)")
-    print("3. Create the agent with create_*_agent(llm)")
+    print("3. Create the agent with build_agent(llm, create_*_agent(llm))")
     print("4. Test with example queries or your own")
 
@@ -31,6 +31,77 @@ Rules to follow:
 7. If a customer asks about expediting, check if their preferred carrier offers overnight/express services
 """
 
+# Full shipping operations instructions (used with the expanded tool set)
+RETURNS_INSTRUCTIONS = """You can handle returns and refunds with these tools:
+
+- `get_return_request`: Pass in order_id to get the return request details and status
+- `create_return_label`: Pass in order_id and reason to generate a return shipping label
+- `approve_return`: Pass in order_id to approve a pending return request
+- `process_refund`: Pass in order_id, amount_cents, and reason to issue a refund
+
+Rules to follow:
+1. Check for an existing return request before creating a new return label
+2. Only approve returns for orders that have been delivered
+3. Never refund more than the order total
+4. Issue refunds only after the return has been approved
+5. Tell the customer the refund amount and reason once it is processed
+"""
+
+WAREHOUSE_OPERATIONS_INSTRUCTIONS = """You can answer inventory and fulfillment questions with these tools:
+
+- `get_warehouse_info`: Pass in warehouse_id to get warehouse details, capacity, and status
+- `check_inventory`: Pass in sku to check stock levels across all warehouses
+- `get_warehouse_incidents`: Pass in a date (YYYY-MM-DD format) to check for warehouse operational issues
+- `transfer_inventory`: Pass in sku, from_warehouse, to_warehouse, and quantity to move stock
+
+Rules to follow:
+1. Check inventory before promising that an item can ship
+2. If a shipment is delayed before carrier pickup, check for warehouse incidents on the relevant dates
+3. Only transfer inventory when the source warehouse has enough stock for the requested quantity
+4. Recommend shipping from the warehouse closest to the destination that has stock
+"""
+
+ORDER_MODIFICATION_INSTRUCTIONS = """You can change existing orders with these tools:
+
+- `update_delivery_address`: Pass in order_id and new_address to change where an order ships
+- `cancel_order`: Pass in order_id and reason to cancel an order
+- `expedite_order`: Pass in order_id and new_shipping_method to upgrade shipping
+- `hold_order`: Pass in order_id and reason to pause fulfillment
+
+Rules to follow:
+1. Check the order status before making any change
+2. Orders that have already shipped cannot be cancelled or re-addressed - offer a return instead
+3. Confirm the new address with the customer before updating it
+4. Tell the customer about any extra cost before expediting an order
+"""
+
+CUSTOMER_SERVICE_INSTRUCTIONS = """You can support customers directly with these tools:
+
+- `create_support_ticket`: Pass in customer_id, category, subject, and description to open a ticket
+- `get_customer_preferences`: Pass in customer_id to get delivery preferences and notification settings
+- `update_customer_preferences`: Pass in customer_id and preferences to change delivery preferences
+- `send_notification`: Pass in customer_id, notification_type, and message to email or text the customer
+
+Rules to follow:
+1. Open a support ticket for any issue you cannot resolve in the conversation
+2. Respect the customer's notification preferences when sending notifications
+3. Check delivery preferences before answering questions about delivery instructions
+"""
+
+BILLING_INSTRUCTIONS = """You can answer billing questions with these tools:
+
+- `get_billing_info`: Pass in customer_id to get billing information and payment method
+- `get_invoice`: Pass in order_id to retrieve the invoice for an order
+- `apply_credit`: Pass in customer_id, amount_cents, and reason to add account credit
+- `charge_customer`: Pass in customer_id, amount_cents, and description to charge additional fees
+
+Rules to follow:
+1. Verify the customer's identity before sharing billing details
+2. Never share full payment card numbers
+3. Only charge customers for fees they have agreed to
+4. Prefer account credit over refunds for goodwill gestures
+"""
+
 # =====================================================
 # NOISE / IRRELEVANT DOMAIN INSTRUCTIONS (Problem 3)
 # =====================================================
@@ -344,6 +415,9 @@ Example: get_order_info("12345", include=["status", "tracking", "shipment"])
   - Provides SPECIFIC location details (e.g., "Memphis, TN") not just "in transit"
   - Much better than calling with just ["status"]
   
+  For several orders, pass order_ids=[...] or customer_id="cust_123" (open_only=True for open orders)
+  to get every order back in ONE call instead of one call per order.
+  
 - `get_customer_info`: Use 'lookup_by' to find by email or ID, 'include' for profile, preferences, billing
   Example: get_customer_info("user@example.com", lookup_by="email", include=["profile", "preferences"])
   
@@ -19,13 +19,14 @@ Benefits measured via LangSmith evaluators:
 """
 
 from typing import List, Literal, Optional, Dict
+from context_common.tool_output import compact_tools
 from context_confusion.resources.mock_orders import ORDERS, SHIPMENTS, ORDER_EVENTS
 from context_confusion.resources.mock_customers import CUSTOMERS, CUSTOMER_EMAIL_MAP, CUSTOMER_PREFERENCES, BILLING_INFO
 from context_confusion.resources.mock_carriers import TRACKING_SCANS, CARRIERS, CARRIER_INCIDENTS, RATE_CARDS
 from context_confusion.resources.mock_warehouses import WAREHOUSES, INVENTORY, WAREHOUSE_INCIDENTS
 from context_confusion.tools import (
     get_customer_by_email, get_customer, get_customer_preferences, get_billing_info,
-    get_tracking_details, get_carrier_info as get_carrier_info_orig, get_carrier_incidents,
+    get_tracking_details,
     get_shipping_rates, get_carrier_performance, get_return_request, create_return_label,
     cancel_order, hold_order, expedite_order, update_delivery_address, process_refund,
     get_warehouse_info as get_warehouse_info_orig, check_inventory, get_warehouse_incidents,
@@ -37,10 +38,123 @@ from context_confusion.tools import (
 # SWEET SPOT: 12 Consolidated Tools with Flexible Parameters
 # ============================================================================
 
+# Order projection resolver used by get_order_info.
+# Each include maps to the output columns it contributes; the resolver compiles
+# the requested includes into one list of column getters and applies it to every
+# order in a single pass, so the source tables are only touched for what was asked.
+
+_CLOSED_ORDER_STATUSES = {"DELIVERED", "RETURNED", "CANCELLED"}
+
+# customer_id -> order IDs, built once so customer queries skip the ORDERS scan
+_ORDERS_BY_CUSTOMER: Dict[str, List[str]] = {}
+for _oid, _order in ORDERS.items():
+    _ORDERS_BY_CUSTOMER.setdefault(_order["customer_id"], []).append(_oid)
+
+
+def _order_total(oid: str, order: dict):
+    return {"cents": order["total_cents"], "currency": order["currency"]}
+
+
+def _order_tracking_scans(oid: str, order: dict):
+    return TRACKING_SCANS.get(order["tracking_number"]) if order["tracking_number"] else None
+
+
+def _order_shipment(oid: str, order: dict):
+    shipment = SHIPMENTS.get(oid)
+    if shipment is None:
+        return None
+    return {
+        "carrier": shipment["carrier"],
+        "service_level": shipment["service_level"],
+        "eta_date": shipment["eta_date"],
+        "latest_scan": shipment["latest_scan"],
+        "scan_location": shipment["scan_location"],
+        "scan_timestamp": shipment["scan_timestamp"],
+    }
+
+
+def _order_customer(oid: str, order: dict):
+    customer = CUSTOMERS.get(order["customer_id"], {})
+    return {
+        "email": customer.get("email"),
+        "name": customer.get("name"),
+        "tier": customer.get("tier"),
+    }
+
+
+_ORDER_PROJECTIONS = {
+    "status": [
+        ("status", lambda oid, order: order["status"]),
+        ("order_date", lambda oid, order: order["order_date"]),
+        ("last_update", lambda oid, order: order["last_update"]),
+        ("total", _order_total),
+    ],
+    "tracking": [
+        ("tracking_number", lambda oid, order: order["tracking_number"] or None),
+        ("tracking_scans", _order_tracking_scans),
+    ],
+    "events": [
+        ("events", lambda oid, order: ORDER_EVENTS.get(oid)),
+    ],
+    "shipment": [
+        ("shipment", _order_shipment),
+    ],
+    "customer": [
+        ("customer", _order_customer),
+    ],
+}
+
+
+def _normalize_order_id(order_id: str) -> str:
+    return order_id.strip().lstrip("#")
+
+
+def resolve_order_projection(order_ids: List[str], include: List[str]) -> dict:
+    """
+    Resolve the requested includes for many orders in one batched pass.
+    
+    The include list is compiled once into a plan of (column, getter) pairs,
+    then each order is looked up exactly once and every planned column is
+    filled from it. Missing joins (no shipment, no events) are None.
+    
+    Args:
+        order_ids: Order IDs to resolve ("#" prefixes and whitespace are ignored)
+        include: Information types, same values as get_order_info
+    
+    Returns:
+        Columnar result: {"order_id": [...], <column>: [...], ...} with one entry
+        per found order, plus "not_found" listing IDs that don't exist.
+    """
+    plan = [
+        column
+        for name in _ORDER_PROJECTIONS
+        if name in include
+        for column in _ORDER_PROJECTIONS[name]
+    ]
+    columns = {"order_id": []}
+    columns.update((column, []) for column, _ in plan)
+    not_found = []
+    
+    for order_id in order_ids:
+        oid = _normalize_order_id(order_id)
+        order = ORDERS.get(oid)
+        if order is None:
+            not_found.append(oid)
+            continue
+        columns["order_id"].append(oid)
+        for column, getter in plan:
+            columns[column].append(getter(oid, order))
+    
+    return {"columns": columns, "not_found": not_found}
+
+
 # Tool 1: get_order_info
 def get_order_info(
-    order_id: str,
-    include: List[Literal["status", "tracking", "events", "shipment", "customer"]] = ["status", "shipment"]
+    order_id: Optional[str] = None,
+    include: List[Literal["status", "tracking", "events", "shipment", "customer"]] = ["status", "shipment"],
+    order_ids: Optional[List[str]] = None,
+    customer_id: Optional[str] = None,
+    open_only: bool = False
 ) -> dict:
     """
     Retrieve comprehensive order information with flexible parameters.
@@ -63,55 +177,50 @@ def get_order_info(
                 - "events": Full order event log
                 - "shipment": Carrier, service level, ETA
                 - "customer": Associated customer details
+        order_ids: Several order IDs to look up together (instead of order_id)
+        customer_id: Look up all orders for this customer (instead of order_id or order_ids)
+        open_only: With customer_id, only return orders that are not delivered, returned or cancelled
     
     Example:
         get_order_info("12345", include=["status", "tracking", "shipment"])
         Returns complete info in one call instead of 3 separate calls
+        
+        get_order_info(customer_id="cust_123", open_only=True, include=["status", "shipment"])
+        Returns every open order for the customer in one call, one list per field
     """
-    oid = order_id.strip().lstrip("#")
-    
-    if oid not in ORDERS:
-        return {"ok": False, "error": f"Order not found: {oid}"}
-    
-    order = ORDERS[oid]
-    result = {"ok": True, "order_id": oid}
-    
-    if "status" in include:
-        result.update({
-            "status": order["status"],
-            "order_date": order["order_date"],
-            "last_update": order["last_update"],
-            "total": {"cents": order["total_cents"], "currency": order["currency"]}
-        })
-    
-    if "tracking" in include and order["tracking_number"]:
-        tracking_num = order["tracking_number"]
-        result["tracking_number"] = tracking_num
-        if tracking_num in TRACKING_SCANS:
-            result["tracking_scans"] = TRACKING_SCANS[tracking_num]
-    
-    if "events" in include and oid in ORDER_EVENTS:
-        result["events"] = ORDER_EVENTS[oid]
-    
-    if "shipment" in include and oid in SHIPMENTS:
-        shipment = SHIPMENTS[oid]
-        result["shipment"] = {
-            "carrier": shipment["carrier"],
-            "service_level": shipment["service_level"],
-            "eta_date": shipment["eta_date"],
-            "latest_scan": shipment["latest_scan"],
-            "scan_location": shipment["scan_location"],
-            "scan_timestamp": shipment["scan_timestamp"],
-        }
-    
-    if "customer" in include:
-        customer = CUSTOMERS.get(order["customer_id"], {})
-        result["customer"] = {
-            "email": customer.get("email"),
-            "name": customer.get("name"),
-            "tier": customer.get("tier"),
-        }
-    
+    selectors = [value for value in (order_id, order_ids, customer_id) if value is not None]
+    if not selectors:
+        return {"ok": False, "error": "Provide order_id, order_ids or customer_id"}
+    if len(selectors) > 1:
+        return {"ok": False, "error": "Provide only one of order_id, order_ids or customer_id"}
+    
+    if order_id is not None:
+        resolved = resolve_order_projection([order_id], include)
+        if resolved["not_found"]:
+            return {"ok": False, "error": f"Order not found: {resolved['not_found'][0]}"}
+        
+        result = {"ok": True}
+        for column, values in resolved["columns"].items():
+            if values[0] is not None:
+                result[column] = values[0]
+        return result
+    
+    if customer_id is not None:
+        cid = customer_id.strip()
+        if cid not in CUSTOMERS:
+            return {"ok": False, "error": f"Customer not found: {cid}"}
+        order_ids = _ORDERS_BY_CUSTOMER.get(cid, [])
+        if open_only:
+            order_ids = [oid for oid in order_ids if ORDERS[oid]["status"] not in _CLOSED_ORDER_STATUSES]
+    
+    resolved = resolve_order_projection(order_ids, include)
+    result = {
+        "ok": True,
+        "count": len(resolved["columns"]["order_id"]),
+        "columns": resolved["columns"],
+    }
+    if resolved["not_found"]:
+        result["not_found"] = resolved["not_found"]
     return result
 
 
@@ -219,15 +328,13 @@ def get_carrier_info(
     """
     result = {"ok": True}
     
-    if carrier_id and "details" in include:
-        carrier_result = get_carrier_info_orig(carrier_id)
-        if carrier_result["ok"]:
-            result["carrier"] = carrier_result["data"]
+    # Read the carrier tables directly instead of round-tripping through the
+    # single-purpose tools and unwrapping their envelopes
+    if carrier_id and "details" in include and carrier_id in CARRIERS:
+        result["carrier"] = CARRIERS[carrier_id]
     
     if "incidents" in include and date:
-        incidents_result = get_carrier_incidents(date)
-        if incidents_result["ok"]:
-            result["incidents"] = incidents_result["data"]
+        result["incidents"] = {"date": date, "incidents": CARRIER_INCIDENTS.get(date, [])}
     
     if "rates" in include:
         result["rate_info"] = "Use get_shipping_rates with origin/destination"
@@ -347,8 +454,8 @@ def get_warehouse_info_consolidated(
     return result
 
 
-# Final consolidated tools list (12 tools)
-consolidated_tools = [
+# Final consolidated tools list (12 tools), with results through the compact encoder
+consolidated_tools = compact_tools([
     get_order_info,
     get_customer_info,
     get_tracking_info,
@@ -361,5 +468,5 @@ consolidated_tools = [
     send_notification,
     apply_credit,
     check_fraud_score,
-]
+])
 
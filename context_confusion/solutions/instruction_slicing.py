@@ -0,0 +1,358 @@
+"""
+Per-turn instruction slicing for context confusion solution.
+
+This module demonstrates Instruction Slicing - ALL_INSTRUCTIONS and
+CONFUSING_BLOATED_INSTRUCTIONS paste every domain block into every system prompt,
+although a turn usually needs one or two of them. InstructionIndex splits a prompt
+into addressable sections:
+- the named instruction blocks from instructions.py (FRAUD_DETECTION_INSTRUCTIONS, ...)
+- markdown-headed sections of everything else (## DEPRECATED TOOL ALERT, ...)
+
+Per turn, slice() keeps the always-on sections plus the sections relevant to the
+query, ranked with BM25 over the section text plus a boost for query terms in the
+section's key (e.g. "carrier" for CARRIER_MANAGEMENT_INSTRUCTIONS) or in the names of the
+tools it documents (e.g. get_carrier_info). Sections that only document tools the agent doesn't
+have bound are dropped. The result reports a measured token count next to the full
+prompt's. InstructionSlicer applies this to every model call of an agent, so no
+hand-written prompt variants are needed. Only the indexed span of the agent's system
+prompt is sliced; text around it (e.g. the SYSTEM_MESSAGE wrapper) is kept as is.
+
+Usage:
+    slicer = InstructionSlicer(InstructionIndex.from_text(ALL_INSTRUCTIONS, token_counter=llm.get_num_tokens))
+    agent = create_agent(model=llm, tools=all_tools, middleware=[slicer],
+                         system_prompt=SYSTEM_MESSAGE.format(instructions=ALL_INSTRUCTIONS))
+"""
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from langchain.agents.middleware.types import AgentMiddleware
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from context_common.prompt_cache import assemble_prompt, cached_system_message, estimate_tokens
+from context_confusion import instructions as confusion_instructions
+
+_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+_TOOL_REF = re.compile(r"`([a-z][a-z0-9]*(?:_[a-z0-9]+)+)`")
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+_STOPWORDS = frozenset(
+    "the and for with you your are can this that from into have has not but any all use "
+    "pass get what when where which will should must may our their them they its "
+    "tell need want know please".split()
+)
+
+# Composite prompts made of other blocks; their headed parts are indexed instead
+_COMPOSITE_BLOCKS = ("CONFUSING_BLOATED_INSTRUCTIONS", "CONSOLIDATED_INSTRUCTIONS")
+
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+# Extra score, as a multiple of the term's IDF, for a query term in a section's key or
+# in the names of the tools it documents
+_KEY_BOOST = 1.5
+_TOOL_BOOST = 0.75
+# Key words every block shares, which say nothing about its domain
+_KEY_STOPWORDS = frozenset({"instruction"})
+
+# Sample queries and the domain block each one's slice must include (check_sample_slices)
+SAMPLE_SLICES = {
+    "What's the status of order #84721?": "SHIPPING_SUPPORT_INSTRUCTIONS",
+    "Track order #99002 and tell me where it is": "SHIPPING_SUPPORT_INSTRUCTIONS",
+    "What carrier is handling order #45678?": "CARRIER_MANAGEMENT_INSTRUCTIONS",
+    "Are there any UPS service disruptions today?": "CARRIER_MANAGEMENT_INSTRUCTIONS",
+    "I need to return order #11111, it was the wrong item": "RETURNS_INSTRUCTIONS",
+    "I want a refund for order #84721": "RETURNS_INSTRUCTIONS",
+}
+
+
+def _terms(text: str) -> List[str]:
+    terms = []
+    for word in _WORD.findall(text.lower().replace("_", " ")):
+        if len(word) < 3 or word in _STOPWORDS:
+            continue
+        # Light suffix folding so "orders" matches "order" and "tracking" matches "track"
+        if len(word) > 4 and word.endswith("s") and not word.endswith(("ss", "us")):
+            word = word[:-1]
+        elif len(word) > 5 and word.endswith("ing"):
+            word = word[:-3]
+        terms.append(word)
+    return terms
+
+
+def _slug(title: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+
+
+def instruction_blocks(module: Any = confusion_instructions) -> Dict[str, str]:
+    """Named single-domain instruction blocks (*_INSTRUCTIONS constants) of a module."""
+    return {
+        name: value for name, value in vars(module).items()
+        if name.endswith("_INSTRUCTIONS") and isinstance(value, str) and name not in _COMPOSITE_BLOCKS
+    }
+
+
+class InstructionIndex:
+    """
+    Addressable sections of a system prompt.
+
+    Each section is {"key", "text", "tools", "terms" ({term: count}), "length",
+    "key_terms", "tool_terms"}; sections keep their order in the original prompt. source_text is the prompt the sections were cut from (the
+    span InstructionSlicer replaces in a system message).
+    """
+
+    def __init__(
+        self,
+        sections: List[Dict[str, Any]],
+        token_counter: Callable[[str], int] = estimate_tokens,
+        source_text: Optional[str] = None,
+    ):
+        self.sections = sections
+        self.by_key = {section["key"]: section for section in sections}
+        self.token_counter = token_counter
+        self._avg_length = sum(section["length"] for section in sections) / len(sections) if sections else 0.0
+        document_frequency: Dict[str, int] = {}
+        for section in sections:
+            for term in section["terms"]:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        self._idf = {
+            term: math.log(1 + (len(sections) - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+        self.full_text = assemble_prompt([section["text"] for section in sections])
+        self.full_tokens = token_counter(self.full_text)
+        self.source_text = source_text if source_text is not None else self.full_text
+
+    @classmethod
+    def from_text(
+        cls,
+        text: str,
+        blocks: Optional[Dict[str, str]] = None,
+        token_counter: Callable[[str], int] = estimate_tokens,
+    ) -> "InstructionIndex":
+        """
+        Split a prompt into sections.
+
+        Args:
+            text: The full prompt (e.g. ALL_INSTRUCTIONS)
+            blocks: Named blocks to cut out as whole sections, keyed by their constant
+                name (defaults to instruction_blocks() of instructions.py)
+            token_counter: Token counter for the sliced prompts (e.g. llm.get_num_tokens)
+        """
+        blocks = blocks if blocks is not None else instruction_blocks()
+        spans = []
+        for name, block in sorted(blocks.items(), key=lambda item: -len(item[1])):
+            body = block.strip()
+            start = text.find(body) if body else -1
+            if start >= 0 and not any(start < end and start + len(body) > begin for begin, end, _ in spans):
+                spans.append((start, start + len(body), name))
+        spans.sort()
+
+        raw_sections = []
+        position = 0
+        for begin, end, name in spans + [(len(text), len(text), None)]:
+            raw_sections.extend(cls._split_headings(text[position:begin]))
+            if name is not None:
+                raw_sections.append((name, text[begin:end]))
+            position = end
+
+        sections = []
+        seen: Dict[str, int] = {}
+        for key, section_text in raw_sections:
+            count = seen[key] = seen.get(key, 0) + 1
+            terms = _terms(section_text)
+            term_counts: Dict[str, int] = {}
+            for term in terms:
+                term_counts[term] = term_counts.get(term, 0) + 1
+            tools = set(_TOOL_REF.findall(section_text))
+            sections.append({
+                "key": key if count == 1 else f"{key}-{count}",
+                "text": section_text.strip(),
+                "tools": tools,
+                "terms": term_counts,
+                "length": len(terms),
+                "key_terms": set(_terms(key)) - _KEY_STOPWORDS,
+                "tool_terms": set(_terms(" ".join(tools))),
+            })
+        return cls(sections, token_counter, source_text=text)
+
+    @staticmethod
+    def _split_headings(text: str) -> List[tuple]:
+        """(key, text) for each markdown-headed part of text; parts without a body are skipped."""
+        matches = list(_HEADING.finditer(text))
+        parts = [(None, text[:matches[0].start()] if matches else text)]
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            parts.append((_slug(match.group(1)), text[match.start():end]))
+        return [
+            (key or "preamble", part) for key, part in parts
+            if _HEADING.sub("", part).strip()
+        ]
+
+    def score(self, section: Dict[str, Any], query_terms: Set[str]) -> float:
+        """BM25 relevance of a section to the query, plus the key and tool-name boosts."""
+        norm = 1 - _BM25_B + _BM25_B * section["length"] / self._avg_length if self._avg_length else 1.0
+        score = 0.0
+        for term in query_terms:
+            idf = self._idf.get(term, 0.0)
+            tf = section["terms"].get(term, 0)
+            if tf:
+                score += idf * tf * (_BM25_K1 + 1) / (tf + _BM25_K1 * norm)
+            if term in section["key_terms"]:
+                score += _KEY_BOOST * idf
+            if term in section["tool_terms"]:
+                score += _TOOL_BOOST * idf
+        return score
+
+    def slice(
+        self,
+        query: str,
+        tools: Optional[Iterable[str]] = None,
+        always: Sequence[str] = ("SHIPPING_SUPPORT_INSTRUCTIONS",),
+        min_score: float = 2.5,
+        relative_score: float = 0.5,
+        max_sections: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Assemble the sections relevant to one turn.
+
+        Args:
+            query: The user's request for this turn
+            tools: Names of the tools bound this turn (None = don't filter by tools)
+            always: Section keys included on every turn
+            min_score: Minimum relevance for a section to be included
+            relative_score: Minimum relevance as a fraction of the best section's
+            max_sections: Most query-selected sections (on top of the always-on ones)
+
+        Returns:
+            {"text", "sections" (keys in prompt order), "always_text", "turn_text",
+             "tokens", "full_tokens", "ratio"}
+        """
+        bound = set(tools) if tools is not None else None
+        query_terms = set(_terms(query))
+        scored = []
+        for section in self.sections:
+            if section["key"] in always:
+                continue
+            # Instructions for tools the agent can't call this turn are pure noise
+            if bound is not None and section["tools"] and not section["tools"] & bound:
+                continue
+            score = self.score(section, query_terms)
+            if score >= min_score:
+                scored.append((score, section["key"]))
+        best = max((score for score, _ in scored), default=0.0)
+        selected = {key for score, key in sorted(scored, reverse=True)[:max_sections] if score >= relative_score * best}
+
+        keys = [section["key"] for section in self.sections if section["key"] in selected or section["key"] in always]
+        always_text = assemble_prompt([self.by_key[key]["text"] for key in keys if key in always])
+        turn_text = assemble_prompt([self.by_key[key]["text"] for key in keys if key not in always])
+        text = assemble_prompt([self.by_key[key]["text"] for key in keys])
+        tokens = self.token_counter(text)
+        return {
+            "text": text,
+            "sections": keys,
+            "always_text": always_text,
+            "turn_text": turn_text,
+            "tokens": tokens,
+            "full_tokens": self.full_tokens,
+            "ratio": tokens / self.full_tokens if self.full_tokens else 0.0,
+        }
+
+
+def check_sample_slices(index: InstructionIndex, **slice_options: Any) -> List[str]:
+    """
+    Slice each of SAMPLE_SLICES' queries and report the ones missing their domain block.
+
+    Returns:
+        One message per failing query (empty if every slice has its block)
+    """
+    failures = []
+    for query, block in SAMPLE_SLICES.items():
+        sections = index.slice(query, **slice_options)["sections"]
+        if block not in sections:
+            failures.append(f"{query!r}: expected {block}, got {sections}")
+    return failures
+
+
+def _message_text(message: Any, separator: str = " ") -> str:
+    content = message.content
+    if isinstance(content, list):
+        return separator.join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+class InstructionSlicer(AgentMiddleware):
+    """
+    Slice the indexed instructions in the agent's system prompt on each model call.
+
+    The query is the latest user message and the tools are the ones bound for the
+    call. The index's source text is replaced by the relevant sections; text before
+    and after it in the system message is kept. If the agent's system message uses
+    cache breakpoints, the leading text and always-on sections stay in the cached
+    block and the per-turn sections follow it.
+
+    Args:
+        index: InstructionIndex of the instructions in the agent's system prompt
+        history: Most recent per-call slice stats kept in `slices`
+        **slice_options: Passed to InstructionIndex.slice (always, min_score, ...)
+    """
+
+    def __init__(self, index: InstructionIndex, history: int = 100, **slice_options: Any):
+        super().__init__()
+        self.index = index
+        self.slice_options = slice_options
+        # Recent per-call slice stats: {"sections", "tokens", "full_tokens", "ratio"}
+        self.slices: deque = deque(maxlen=history)
+        # Running totals over every call: calls, tokens, full_tokens
+        self.totals = {"calls": 0, "tokens": 0, "full_tokens": 0}
+        self._lock = threading.Lock()
+
+    def _record(self, sliced: Dict[str, Any]) -> None:
+        with self._lock:
+            self.slices.append({key: sliced[key] for key in ("sections", "tokens", "full_tokens", "ratio")})
+            self.totals["calls"] += 1
+            self.totals["tokens"] += sliced["tokens"]
+            self.totals["full_tokens"] += sliced["full_tokens"]
+
+    def _prepare(self, request: Any) -> Any:
+        original = request.system_message
+        text = _message_text(original, "\n\n") if original is not None else ""
+        span = self.index.source_text.strip()
+        start = text.find(span)
+        if start < 0:
+            raise ValueError(
+                "The agent's system message does not contain the indexed instructions; "
+                "build the InstructionIndex from the text used in the system prompt"
+            )
+        prefix, suffix = text[:start], text[start + len(span):]
+
+        query = next((_message_text(m) for m in reversed(request.messages) if isinstance(m, HumanMessage)), "")
+        tools = [getattr(tool, "name", None) or tool.get("name") for tool in request.tools]
+        sliced = self.index.slice(query, tools=tools, **self.slice_options)
+        self._record(sliced)
+
+        static = [part for part in (prefix, sliced["always_text"]) if part.strip()]
+        dynamic = [part for part in (sliced["turn_text"], suffix) if part.strip()]
+        uses_breakpoints = isinstance(original.content, list) and any(
+            isinstance(block, dict) and "cache_control" in block for block in original.content
+        )
+        if uses_breakpoints:
+            system_message = cached_system_message(static, dynamic)
+        else:
+            system_message = SystemMessage(content=assemble_prompt(static, dynamic))
+        return request.override(system_message=system_message)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._prepare(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._prepare(request))
+
+
+if __name__ == "__main__":
+    from context_confusion.agent import ALL_INSTRUCTIONS
+
+    failures = check_sample_slices(InstructionIndex.from_text(ALL_INSTRUCTIONS))
+    print("\n".join(failures) or f"All {len(SAMPLE_SLICES)} sample queries select their domain block")
+    raise SystemExit(1 if failures else 0)
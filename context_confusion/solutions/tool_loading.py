@@ -0,0 +1,166 @@
+"""
+On-demand tool-group loading for context confusion solution.
+
+This module demonstrates Lazy Tool Loading - instead of binding every domain's
+tools and instructions up front, the agent starts with its core tools and a small
+catalog tool (load_tool_group) that lists the domain groups defined in tools.py and
+instructions.py. A group's tool schemas and instruction block enter the prompt only
+after the agent loads that group, i.e. only for requests that need the domain.
+
+Loaded groups are read back from the conversation (successful load_tool_group calls),
+so the middleware keeps no state of its own and a thread resumes with the same tools.
+
+Usage:
+    loader = ToolGroupLoader(preloaded=("shipping_core", "carrier"))
+    agent = create_agent(model=llm, tools=[], system_prompt=..., middleware=[loader])
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from langchain.agents.middleware.types import AgentMiddleware
+from langchain_core.messages import AIMessage, SystemMessage, ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langchain_core.tools import tool as as_tool
+
+from context_confusion import instructions as confusion_instructions
+from context_confusion import tools as confusion_tools
+
+CATALOG_TOOL_NAME = "load_tool_group"
+
+# group name -> (description, tool list in tools.py, instruction block in instructions.py)
+_GROUP_SOURCES = [
+    ("shipping_core", "Orders, shipments, customers and tracking", "shipping_core_tools", "SHIPPING_SUPPORT_INSTRUCTIONS"),
+    ("carrier", "Carrier details, incidents, rates and performance", "carrier_tools", "CARRIER_MANAGEMENT_INSTRUCTIONS"),
+    ("returns", "Return requests, labels and refunds", "returns_tools", "RETURNS_INSTRUCTIONS"),
+    ("warehouse", "Warehouses, inventory and warehouse incidents", "warehouse_tools", "WAREHOUSE_OPERATIONS_INSTRUCTIONS"),
+    ("order_modification", "Cancel, hold, expedite or re-address orders", "order_modification_tools", "ORDER_MODIFICATION_INSTRUCTIONS"),
+    ("customer_service", "Support tickets, notifications, preferences and credits", "customer_service_tools", "CUSTOMER_SERVICE_INSTRUCTIONS"),
+    ("billing", "Billing info, invoices and payments", "billing_tools", "BILLING_INSTRUCTIONS"),
+    ("fraud", "Fraud scores, flags and verification", "fraud_tools", "FRAUD_DETECTION_INSTRUCTIONS"),
+    ("analytics", "Reports and shipping metrics", "analytics_tools", "ANALYTICS_INSTRUCTIONS"),
+    ("marketing", "Promotions, discounts and loyalty points", "marketing_tools", "MARKETING_INSTRUCTIONS"),
+    ("vendor", "Vendors, purchase orders and contracts", "vendor_tools", "VENDOR_MANAGEMENT_INSTRUCTIONS"),
+    ("employee", "Warehouse staff schedules and hours", "employee_tools", "EMPLOYEE_MANAGEMENT_INSTRUCTIONS"),
+    ("quality", "Inspections, defects and quality metrics", "quality_tools", "QUALITY_ASSURANCE_INSTRUCTIONS"),
+    ("customs", "Customs declarations, duties and restrictions", "customs_tools", "CUSTOMS_COMPLIANCE_INSTRUCTIONS"),
+    ("subscription", "Customer subscriptions", "subscription_tools", "SUBSCRIPTION_MANAGEMENT_INSTRUCTIONS"),
+    ("fleet", "Delivery vehicles, routes and maintenance", "fleet_tools", "FLEET_MANAGEMENT_INSTRUCTIONS"),
+    ("environmental", "Carbon footprint and offsets", "environmental_tools", "ENVIRONMENTAL_COMPLIANCE_INSTRUCTIONS"),
+    ("insurance", "Shipment insurance and claims", "insurance_tools", "INSURANCE_INSTRUCTIONS"),
+    # The near-duplicate order/customer lookups of the full 74-tool agent, kept loadable
+    # so the lazy agent can reach every tool the eager one binds
+    ("order_diagnostics", "Extra order, shipment and account lookups, checks and diagnostics", "confusing_duplicate_tools", None),
+]
+
+TOOL_GROUPS: Dict[str, Dict[str, Any]] = {
+    name: {
+        "description": description,
+        "tools": getattr(confusion_tools, tools_attr),
+        "instructions": getattr(confusion_instructions, instructions_attr) if instructions_attr else "",
+    }
+    for name, description, tools_attr, instructions_attr in _GROUP_SOURCES
+}
+
+
+def _as_base_tool(tool: Any) -> BaseTool:
+    return tool if isinstance(tool, BaseTool) else as_tool(tool)
+
+
+def loaded_groups(messages: Iterable[Any], groups: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Groups loaded by successful load_tool_group calls in a conversation, in load order."""
+    groups = groups if groups is not None else TOOL_GROUPS
+    requested: Dict[str, str] = {}
+    loaded: List[str] = []
+    for message in messages:
+        if isinstance(message, AIMessage):
+            for tool_call in message.tool_calls:
+                if tool_call["name"] == CATALOG_TOOL_NAME:
+                    requested[tool_call["id"]] = tool_call["args"].get("group", "")
+        elif isinstance(message, ToolMessage) and message.tool_call_id in requested:
+            group = requested.pop(message.tool_call_id)
+            if message.status != "error" and group in groups and group not in loaded:
+                loaded.append(group)
+    return loaded
+
+
+class ToolGroupLoader(AgentMiddleware):
+    """
+    Bind tool groups only after the agent loads them.
+
+    Args:
+        groups: Group name -> {"description", "tools", "instructions"} (defaults to TOOL_GROUPS)
+        preloaded: Groups bound from the first turn (their instructions are expected
+            in the agent's own system prompt)
+    """
+
+    def __init__(self, groups: Optional[Dict[str, Dict[str, Any]]] = None, preloaded: Sequence[str] = ("shipping_core",)):
+        super().__init__()
+        self.groups = groups if groups is not None else TOOL_GROUPS
+        unknown = [name for name in preloaded if name not in self.groups]
+        if unknown:
+            raise ValueError(f"Unknown tool groups: {unknown}")
+        self.preloaded = list(preloaded)
+        self._group_tools = {
+            name: [_as_base_tool(tool) for tool in group["tools"]]
+            for name, group in self.groups.items()
+        }
+        self._group_tool_names = {name: {tool.name for tool in tools} for name, tools in self._group_tools.items()}
+        self._owned: Set[str] = set().union(*self._group_tool_names.values())
+        self.catalog_tool = self._build_catalog_tool()
+        # Registered with the agent so any loaded tool can run; wrap_model_call decides
+        # which of them the model sees
+        registered = {tool.name: tool for tools in self._group_tools.values() for tool in tools}
+        self.tools = [self.catalog_tool, *registered.values()]
+
+    def _build_catalog_tool(self) -> BaseTool:
+        lazy = [name for name in self.groups if name not in self.preloaded]
+        catalog = "\n".join(f"- {name}: {self.groups[name]['description']}" for name in lazy)
+
+        def load_tool_group(group: str) -> str:
+            if group not in self.groups:
+                raise ToolException(f"Unknown tool group: {group}. Available: {', '.join(lazy)}")
+            names = sorted(self._group_tool_names[group])
+            return f"Loaded {group} tools: {', '.join(names)}"
+
+        return StructuredTool.from_function(
+            load_tool_group,
+            name=CATALOG_TOOL_NAME,
+            description=(
+                "Load a group of tools (and its instructions) for a domain the current tools "
+                f"don't cover. Groups:\n{catalog}"
+            ),
+            handle_tool_error=True,
+        )
+
+    def active_groups(self, messages: Iterable[Any]) -> List[str]:
+        """Preloaded groups followed by the groups loaded so far in the conversation."""
+        loaded = loaded_groups(messages, self.groups)
+        return self.preloaded + [name for name in loaded if name not in self.preloaded]
+
+    def _system_message(self, system_message: Optional[SystemMessage], groups: List[str]) -> Optional[SystemMessage]:
+        blocks = [self.groups[name]["instructions"] for name in groups if name not in self.preloaded and self.groups[name]["instructions"]]
+        if not blocks:
+            return system_message
+        text = "\n\n".join(block.strip("\n") for block in blocks)
+        if system_message is None:
+            return SystemMessage(content=text)
+        content = system_message.content
+        # Appended after the existing content, so a cached static prefix stays intact
+        if isinstance(content, list):
+            return SystemMessage(content=[*content, {"type": "text", "text": text}])
+        return SystemMessage(content=f"{content}\n\n{text}")
+
+    def _prepare(self, request: Any) -> Any:
+        groups = self.active_groups(request.messages)
+        visible = set().union(*(self._group_tool_names[name] for name in groups))
+        tools = [
+            tool for tool in request.tools
+            if getattr(tool, "name", None) not in self._owned or tool.name in visible
+        ]
+        return request.override(tools=tools, system_message=self._system_message(request.system_message, groups))
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._prepare(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._prepare(request))
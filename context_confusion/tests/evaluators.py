@@ -1,122 +1,172 @@
 """Evaluators for context confusion evaluation."""
 
-from typing import Dict, Any, Literal, Annotated, TypedDict
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Literal, Annotated, Optional, Tuple, TypedDict
 from langsmith.schemas import Run, Example
-from langchain_openai import ChatOpenAI
 
+from context_common.judges import clear_judges, get_judge
 
-def compare_trajectory(tool_calls, expected_tool_calls, mode="strict"):
+
+def _make_hashable(obj):
+    """Recursively convert unhashable types to hashable ones."""
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _make_hashable(v)) for k, v in obj.items()))
+    elif isinstance(obj, list):
+        return tuple(_make_hashable(item) for item in obj)
+    elif isinstance(obj, set):
+        return tuple(sorted(_make_hashable(item) for item in obj))
+    else:
+        return obj
+
+
+UNKNOWN_ID = -1
+
+
+class ToolCallInterner:
     """
-    Compare tool call trajectories with multiple comparison modes.
-    Returns a score between 0.0 and 1.0 for partial credit.
-    Trajectory mode is defined in the dataset
-    
-    Modes:
-        strict: Exact match - same tools, same order
-        unordered: Same tools, any order
-        superset: Actual contains all expected (allows extras)
-        subset: Actual contains only expected tools (penalizes missing)
+    Maps normalized tool-call signatures (name, hashable args) to small integer IDs.
     
-    This flexible comparison is critical for evaluating agents with different tool designs.
+    Sharing one interner across a dataset means each distinct tool call is hashed
+    once, and trajectories become plain int lists that compare cheaply. Only
+    expected trajectories are interned; actual calls are looked up, and any
+    signature the dataset never expects maps to UNKNOWN_ID, so the table stays
+    the size of the dataset however many runs are scored.
     """
-    def make_hashable(obj):
-        """Recursively convert unhashable types to hashable ones."""
-        if isinstance(obj, dict):
-            return tuple(sorted((k, make_hashable(v)) for k, v in obj.items()))
-        elif isinstance(obj, list):
-            return tuple(make_hashable(item) for item in obj)
-        elif isinstance(obj, set):
-            return tuple(sorted(make_hashable(item) for item in obj))
-        else:
-            return obj
-    
-    def normalize_tool_call(tc):
+    
+    def __init__(self):
+        self._ids: Dict[Any, int] = {}
+    
+    @staticmethod
+    def _key(tc: Dict[str, Any]):
+        return (tc.get("name", ""), _make_hashable(tc.get("args", {})))
+    
+    def intern(self, tc: Dict[str, Any]) -> int:
+        key = self._key(tc)
+        sig_id = self._ids.get(key)
+        if sig_id is None:
+            sig_id = len(self._ids)
+            self._ids[key] = sig_id
+        return sig_id
+    
+    def intern_trajectory(self, tool_calls: List[Dict[str, Any]]) -> List[int]:
+        return [self.intern(tc) for tc in tool_calls]
+    
+    def lookup_trajectory(self, tool_calls: List[Dict[str, Any]]) -> Tuple[List[int], int]:
         """
-        Normalize a tool call for comparison.
-        Converts to a hashable tuple of (name, sorted_args).
+        Map an actual trajectory to IDs without growing the table.
+        
+        Returns the ID list (unexpected calls as UNKNOWN_ID) and the number of
+        distinct unexpected signatures, which the set-based modes count as extras.
         """
-        name = tc.get("name", "")
-        args = tc.get("args", {})
-        # Convert args to completely hashable structure (handles nested lists/dicts)
-        args_hashable = make_hashable(args)
-        return (name, args_hashable)
+        ids = []
+        unknown = set()
+        for tc in tool_calls:
+            key = self._key(tc)
+            sig_id = self._ids.get(key)
+            if sig_id is None:
+                sig_id = UNKNOWN_ID
+                unknown.add(key)
+            ids.append(sig_id)
+        return ids, len(unknown)
+
+
+def _score_interned(actual: List[int], expected: List[int], mode: str, expected_counter=None, expected_set=None, unknown_count: int = 0) -> float:
+    """
+    Score two interned trajectories. See compare_trajectory for the mode semantics.
     
+    unknown_count is the number of distinct signatures folded into UNKNOWN_ID in
+    actual; they never match expected calls but still count as distinct extras.
+    """
     # Handle empty cases
-    if len(tool_calls) == 0 and len(expected_tool_calls) == 0:
+    if len(actual) == 0 and len(expected) == 0:
         return 1.0
-    if len(expected_tool_calls) == 0:
-        return 0.0 if len(tool_calls) > 0 else 1.0
-    if len(tool_calls) == 0:
+    if len(expected) == 0:
+        return 0.0 if len(actual) > 0 else 1.0
+    if len(actual) == 0:
         return 0.0
     
-    # Normalize both trajectories
-    actual_normalized = [normalize_tool_call(tc) for tc in tool_calls]
-    expected_normalized = [normalize_tool_call(tc) for tc in expected_tool_calls]
-    
     if mode == "strict":
         # Exact match - same tools, same order
         # Score = ratio of correct positions
-        matches = sum(1 for a, e in zip(actual_normalized, expected_normalized) if a == e)
-        max_len = max(len(actual_normalized), len(expected_normalized))
-        return matches / max_len if max_len > 0 else 0.0
-        
+        matches = sum(1 for a, e in zip(actual, expected) if a == e)
+        return matches / max(len(actual), len(expected))
+    
     elif mode == "unordered":
         # Same tools, any order - compare as multisets
-        from collections import Counter
-        actual_counter = Counter(actual_normalized)
-        expected_counter = Counter(expected_normalized)
-        
-        # Count matches (intersection)
-        matches = sum((actual_counter & expected_counter).values())
-        total_expected = len(expected_normalized)
-        return matches / total_expected if total_expected > 0 else 0.0
-        
-    elif mode == "superset":
+        expected_counter = expected_counter if expected_counter is not None else Counter(expected)
+        matches = sum((Counter(actual) & expected_counter).values())
+        return matches / len(expected)
+    
+    expected_set = expected_set if expected_set is not None else set(expected)
+    actual_set = set(actual)
+    found = len(expected_set & actual_set)
+    actual_distinct = len(actual_set)
+    if UNKNOWN_ID in actual_set:
+        actual_distinct += unknown_count - 1
+    
+    if mode == "superset":
         # Actual must contain all expected (extras allowed)
         # Score = ratio of expected tools found, penalized by extras
-        expected_set = set(expected_normalized)
-        actual_set = set(actual_normalized)
-        
-        # How many expected tools were called?
-        found = len(expected_set.intersection(actual_set))
         expected_count = len(expected_set)
-        
-        if expected_count == 0:
-            return 1.0
-        
-        # Base score: ratio of expected tools found
         base_score = found / expected_count
-        
         # Penalty for extra tools (noise)
-        extra = len(actual_set - expected_set)
-        noise_penalty = extra / (expected_count + extra) if (expected_count + extra) > 0 else 0
-        
+        extra = actual_distinct - found
+        noise_penalty = extra / (expected_count + extra)
         return max(0.0, base_score - noise_penalty)
-        
+    
     elif mode == "subset":
         # All actual tools must be in expected (no extras)
-        # Score = ratio of actual tools that are valid (in expected)
-        expected_set = set(expected_normalized)
-        actual_set = set(actual_normalized)
-        
-        # How many actual tools are valid (in expected)?
-        valid = len(actual_set.intersection(expected_set))
-        actual_count = len(actual_set)
-        
-        if actual_count == 0:
-            return 0.0
-        
-        # Base score: ratio of valid actual tools
-        base_score = valid / actual_count
-        
-        # Additional check: did we call all expected tools?
-        expected_count = len(expected_set)
-        coverage = len(expected_set.intersection(actual_set)) / expected_count if expected_count > 0 else 1.0
-        
-        # Final score is average of validity and coverage
+        # Final score is average of validity (actual tools that are expected)
+        # and coverage (expected tools that were called)
+        base_score = found / actual_distinct
+        coverage = found / len(expected_set)
         return (base_score + coverage) / 2.0
+    
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+def compare_trajectory(tool_calls, expected_tool_calls, mode="strict"):
+    """
+    Compare tool call trajectories with multiple comparison modes.
+    Returns a score between 0.0 and 1.0 for partial credit.
+    Trajectory mode is defined in the dataset
+    
+    Modes:
+        strict: Exact match - same tools, same order
+        unordered: Same tools, any order
+        superset: Actual contains all expected (allows extras)
+        subset: Actual contains only expected tools (penalizes missing)
+    
+    This flexible comparison is critical for evaluating agents with different tool designs.
+    For scoring whole experiments, use TrajectoryBatchScorer instead.
+    """
+    interner = ToolCallInterner()
+    expected = interner.intern_trajectory(expected_tool_calls)
+    actual, unknown_count = interner.lookup_trajectory(tool_calls)
+    return _score_interned(actual, expected, mode, unknown_count=unknown_count)
+
+
+def _trajectory_match_result(score: float, actual_names: List[str], expected_names: List[str], expected_name_set=None) -> Dict[str, Any]:
+    """Build the trajectory_match evaluator result, counting noise and missing tools by name."""
+    expected_name_set = expected_name_set if expected_name_set is not None else set(expected_names)
+    actual_name_set = set(actual_names)
+    noise_count = sum(1 for t in actual_names if t not in expected_name_set)
+    missing_count = sum(1 for t in expected_names if t not in actual_name_set)
+    
+    # Generate informative comment
+    if score == 1.0:
+        comment = f"Perfect match! Called {len(actual_names)} tools as expected."
+    elif score == 0.0:
+        comment = f"No match. Called {len(actual_names)} tools, expected {len(expected_names)}. Missing: {missing_count}, Extra: {noise_count}"
     else:
-        raise ValueError(f"Unknown mode: {mode}")
+        comment = f"Partial match ({score:.1%}). Called {len(actual_names)} tools, expected {len(expected_names)}. Missing: {missing_count}, Extra: {noise_count}"
+    
+    return {
+        "key": "trajectory_match",
+        "score": score,
+        "comment": comment
+    }
 
 
 def trajectory_match_evaluator(run: Run, example: Example) -> Dict[str, Any]:
@@ -135,27 +185,177 @@ def trajectory_match_evaluator(run: Run, example: Example) -> Dict[str, Any]:
     # Use flexible comparison function
     score = compare_trajectory(actual_trajectory, expected_trajectory, mode=mode)
     
-    # Count noise tools (tools called that weren't expected)
-    actual_tools = [t["name"] for t in actual_trajectory]
-    expected_tools = [t["name"] for t in expected_trajectory]
-    noise_count = len([t for t in actual_tools if t not in expected_tools])
-    missing_count = len([t for t in expected_tools if t not in actual_tools])
+    return _trajectory_match_result(
+        score,
+        [t["name"] for t in actual_trajectory],
+        [t["name"] for t in expected_trajectory],
+    )
+
+
+class TrajectoryBatchScorer:
+    """
+    Batch trajectory_match scoring for whole experiments.
     
-    # Generate informative comment
-    if score == 1.0:
-        comment = f"Perfect match! Called {len(actual_tools)} tools as expected."
-    elif score == 0.0:
-        comment = f"No match. Called {len(actual_tools)} tools, expected {len(expected_tools)}. Missing: {missing_count}, Extra: {noise_count}"
-    else:
-        comment = f"Partial match ({score:.1%}). Called {len(actual_tools)} tools, expected {len(expected_tools)}. Missing: {missing_count}, Extra: {noise_count}"
+    Expected trajectories are interned once when the scorer is built, together
+    with the per-example counters, sets and tool names each mode needs. Scoring a
+    run then only looks up its actual trajectory and compares int lists; the
+    interner never grows past the dataset's own signatures.
     
+    Example:
+        scorer = TrajectoryBatchScorer(client.list_examples(dataset_name=dataset_name))
+        results = scorer.evaluate(runs)  # runs with reference_example_id set
+    """
+    
+    def __init__(self, examples):
+        self._interner = ToolCallInterner()
+        self._expected: Dict[str, Dict[str, Any]] = {}
+        for example in examples:
+            self.add_example(example)
+    
+    def add_example(self, example: Example) -> None:
+        """Normalize one dataset example. NO FALLBACKS - fails loudly if outputs are missing."""
+        trajectory = example.outputs["trajectory"]
+        ids = self._interner.intern_trajectory(trajectory)
+        names = [t["name"] for t in trajectory]
+        self._expected[str(example.id)] = {
+            "ids": ids,
+            "counter": Counter(ids),
+            "set": set(ids),
+            "names": names,
+            "name_set": set(names),
+            "mode": example.outputs["trajectory_comparison_mode"],
+        }
+    
+    def score(self, example_id, actual_trajectory: List[Dict[str, Any]]) -> float:
+        """Score one actual trajectory against a normalized example."""
+        expected = self._expected[str(example_id)]
+        actual, unknown_count = self._interner.lookup_trajectory(actual_trajectory)
+        return _score_interned(
+            actual,
+            expected["ids"],
+            expected["mode"],
+            expected_counter=expected["counter"],
+            expected_set=expected["set"],
+            unknown_count=unknown_count,
+        )
+    
+    def evaluate_one(self, example_id, actual_trajectory: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Same result as trajectory_match_evaluator, from the precomputed example."""
+        expected = self._expected[str(example_id)]
+        return _trajectory_match_result(
+            self.score(example_id, actual_trajectory),
+            [t["name"] for t in actual_trajectory],
+            expected["names"],
+            expected_name_set=expected["name_set"],
+        )
+    
+    def evaluate(self, runs) -> List[Dict[str, Any]]:
+        """Score every run against its reference example, in run order."""
+        return [
+            self.evaluate_one(run.reference_example_id, run.outputs["trajectory"])
+            for run in runs
+        ]
+
+
+def trajectory_match_summary_evaluator(runs: List[Run], examples: List[Example]) -> Dict[str, Any]:
+    """
+    Summary evaluator: mean trajectory_match over a whole experiment in one batch pass.
+    
+    Pass it via evaluate(..., summary_evaluators=[trajectory_match_summary_evaluator]).
+    """
+    scorer = TrajectoryBatchScorer(examples)
+    scores = [
+        scorer.score(example.id, run.outputs["trajectory"])
+        for run, example in zip(runs, examples)
+    ]
+    mean_score = sum(scores) / len(scores) if scores else 0.0
+    perfect = sum(1 for score in scores if score == 1.0)
     return {
-        "key": "trajectory_match",
-        "score": score,
-        "comment": comment
+        "key": "trajectory_match_mean",
+        "score": mean_score,
+        "comment": f"{perfect}/{len(scores)} runs matched the expected trajectory exactly"
     }
 
 
+# =====================================================
+# DETERMINISTIC PRE-JUDGE
+# =====================================================
+# The LLM judges below first try cheap rules for obvious cases (exact trajectory
+# match, no tool calls, empty response) and the shared judge's memo of earlier
+# verdicts. Only ambiguous, unseen cases reach the model.
+
+_JUDGE_LOCK = threading.Lock()
+_JUDGE_STATS = {"llm_calls": 0, "avoided_by_rules": 0, "avoided_by_cache": 0}
+
+
+def _record_judge_outcome(outcome: str) -> None:
+    with _JUDGE_LOCK:
+        _JUDGE_STATS[outcome] += 1
+
+
+def get_judge_stats() -> Dict[str, int]:
+    """
+    Return how many judge verdicts came from the LLM vs. the pre-judge tier.
+    
+    Returns:
+        {"llm_calls", "avoided_by_rules", "avoided_by_cache", "avoided_total"}
+    """
+    with _JUDGE_LOCK:
+        stats = dict(_JUDGE_STATS)
+    stats["avoided_total"] = stats["avoided_by_rules"] + stats["avoided_by_cache"]
+    return stats
+
+
+def reset_judge_stats(clear_cache: bool = False) -> None:
+    """Zero the judge counters (and optionally drop the judges' memoized verdicts)."""
+    with _JUDGE_LOCK:
+        for key in _JUDGE_STATS:
+            _JUDGE_STATS[key] = 0
+    if clear_cache:
+        clear_judges()
+
+
+def pre_judge_trajectory(actual_trajectory: List[Dict[str, Any]], expected_trajectory: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Rule-based llm_trajectory verdict for unambiguous trajectories.
+    
+    Returns:
+        An evaluator result, or None when the case needs the LLM judge.
+    """
+    if not actual_trajectory:
+        if not expected_trajectory:
+            return {"key": "llm_trajectory", "score": 1.0, "comment": "Pre-judge: no tool calls expected and none made"}
+        return {"key": "llm_trajectory", "score": 0.0, "comment": "Pre-judge: no tool calls made"}
+    
+    # Exactly the expected calls (no extras, none missing) is always appropriate
+    if compare_trajectory(actual_trajectory, expected_trajectory, mode="subset") == 1.0:
+        return {"key": "llm_trajectory", "score": 1.0, "comment": "Pre-judge: tool calls match the expected trajectory"}
+    
+    return None
+
+
+def pre_judge_success_criteria(final_response: str) -> Optional[Dict[str, Any]]:
+    """
+    Rule-based success_criteria verdict for unambiguous responses.
+    
+    Returns:
+        An evaluator result, or None when the case needs the LLM judge.
+    """
+    if not final_response or final_response.strip() == "":
+        return {"key": "success_criteria", "score": 0.0, "comment": "No response generated"}
+    return None
+
+
+def _judge_once(judge, messages) -> Any:
+    """Judge output for messages, from the judge's memo when it was already judged."""
+    output = judge.lookup(messages)
+    if output is not None:
+        _record_judge_outcome("avoided_by_cache")
+        return output
+    _record_judge_outcome("llm_calls")
+    return judge.invoke(messages)
+
+
 class TrajectoryAssessment(TypedDict):
     """Evaluate tool call trajectory quality."""
     reasoning: Annotated[str, ..., "Explain your assessment of the tool calls."]
@@ -173,8 +373,13 @@ def llm_trajectory_evaluator(run: Run, example: Example) -> Dict[str, Any]:
     actual_trajectory = run.outputs["trajectory"]
     expected_trajectory = example.outputs["trajectory"]
     
-    trajectory_judge = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    trajectory_judge_llm = trajectory_judge.with_structured_output(TrajectoryAssessment, method="function_calling")
+    verdict = pre_judge_trajectory(actual_trajectory, expected_trajectory)
+    if verdict is not None:
+        _record_judge_outcome("avoided_by_rules")
+        return verdict
+    
+    # Shared judge client: reused across evaluations, retried with backoff
+    trajectory_judge_llm = get_judge("gpt-4o-mini", TrajectoryAssessment, method="function_calling")
     
     instructions = """
     You are evaluating an AI agent's tool usage. Judge if the agent made appropriate tool calls with correct arguments.
@@ -203,7 +408,7 @@ Are the actual tool calls appropriate for accomplishing the same goal?
 """
     
     try:
-        grade = trajectory_judge_llm.invoke([
+        grade = _judge_once(trajectory_judge_llm, [
             {"role": "system", "content": instructions},
             {"role": "user", "content": user_context}
         ])
@@ -262,13 +467,11 @@ def success_criteria_evaluator(run: Run, example: Example) -> Dict[str, Any]:
     final_response = run.outputs["final_response"]
     success_criteria = example.outputs["success_criteria"]
     
-    # If no response, return 0
-    if not final_response or final_response.strip() == "":
-        return {
-            "key": "success_criteria",
-            "score": 0.0,
-            "comment": "No response generated"
-        }
+    # Short-circuit obvious cases (empty response) before calling the judge
+    verdict = pre_judge_success_criteria(final_response)
+    if verdict is not None:
+        _record_judge_outcome("avoided_by_rules")
+        return verdict
     
     instructions = """
 You are evaluating an AI agent's response against specific success criteria.
@@ -302,12 +505,11 @@ Evaluate strictly: Does this response FULLY and ACCURATELY meet ALL the success
 Check each criterion individually. Be demanding about completeness.
 """
     
-    # Use GPT-4o for better evaluation
-    judge_llm = ChatOpenAI(model="gpt-4o", temperature=0)
-    grader = judge_llm.with_structured_output(SuccessCriteriaAssessment, method="function_calling")
+    # Use GPT-4o for better evaluation (shared judge client, retried with backoff)
+    grader = get_judge("gpt-4o", SuccessCriteriaAssessment, method="function_calling")
     
     try:
-        assessment = grader.invoke([
+        assessment = _judge_once(grader, [
             {"role": "system", "content": instructions},
             {"role": "user", "content": user_context}
         ])
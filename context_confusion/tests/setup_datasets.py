@@ -3,10 +3,12 @@
 from typing import List, Dict, Any
 from langsmith import Client
 
+from context_common.datasets import sync_dataset
+
 
 def create_shipping_dataset(dataset_name: str, test_cases: List[Dict[str, Any]], client: Client):
     """
-    Create or recreate a LangSmith dataset with shipping support test cases.
+    Create or incrementally sync a LangSmith dataset with shipping support test cases.
     
     Args:
         dataset_name: Name of the dataset to create
@@ -16,28 +18,22 @@ def create_shipping_dataset(dataset_name: str, test_cases: List[Dict[str, Any]],
     Returns:
         Dataset object
     """
-    # Force recreate to ensure correct structure
-    try:
-        existing = client.read_dataset(dataset_name=dataset_name)
-        client.delete_dataset(dataset_id=existing.id)
-    except:
-        pass
-
-    dataset = client.create_dataset(
-        dataset_name=dataset_name,
-        description="Test queries exposing context confusion patterns with success criteria"
-    )
-
-    for case in test_cases:
-        client.create_example(
-            inputs={"query": case["query"]},
-            outputs={
+    examples = [
+        {
+            "inputs": {"query": case["query"]},
+            "outputs": {
                 "success_criteria": case["success_criteria"],
                 "trajectory": case["trajectory"],
                 "trajectory_comparison_mode": case["trajectory_comparison_mode"]
             },
-            dataset_id=dataset.id
-        )
-    
-    return dataset
+        }
+        for case in test_cases
+    ]
 
+    # Push only the examples that changed since the last sync
+    return sync_dataset(
+        client,
+        dataset_name,
+        examples,
+        description="Test queries exposing context confusion patterns with success criteria",
+    )
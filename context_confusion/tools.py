@@ -2,6 +2,7 @@ from context_confusion.resources.mock_customers import CUSTOMERS, CUSTOMER_EMAIL
 from context_confusion.resources.mock_orders import ORDERS, SHIPMENTS, ORDER_EVENTS, RETURN_REQUESTS
 from context_confusion.resources.mock_warehouses import WAREHOUSES, INVENTORY, WAREHOUSE_INCIDENTS
 from context_confusion.resources.mock_carriers import CARRIERS, CARRIER_INCIDENTS, TRACKING_SCANS, RATE_CARDS
+from context_common.tool_output import compact_tools
 from langchain_core.tools import tool
 from typing import Dict, Any, List, Literal, Optional
 
@@ -1035,6 +1036,31 @@ confusing_duplicate_tools = [
 # ALL TOOLS
 # =====================================================
 
+# Agents get tool results through the shared compact encoder (context_common/tool_output.py).
+# The functions above still return dicts for direct callers such as the consolidated tools.
+for _group in (
+    shipping_core_tools,
+    carrier_tools,
+    returns_tools,
+    warehouse_tools,
+    order_modification_tools,
+    customer_service_tools,
+    billing_tools,
+    fraud_tools,
+    analytics_tools,
+    marketing_tools,
+    vendor_tools,
+    employee_tools,
+    quality_tools,
+    customs_tools,
+    subscription_tools,
+    fleet_tools,
+    environmental_tools,
+    insurance_tools,
+    confusing_duplicate_tools,
+):
+    _group[:] = compact_tools(_group)
+
 all_tools = (
     shipping_core_tools +
     carrier_tools +
@@ -1,14 +1,23 @@
 """Agent helper utilities for context confusion demonstrations."""
 
-from typing import Dict
+from typing import Dict, Optional
 import pandas as pd
 from IPython.display import display
 
+from context_common.results_store import ResultsStore, get_results_store
 
-def run_agent_with_trajectory(agent, query: str) -> dict:
+CONFUSION_SCORE_KEYS = ("trajectory_match", "llm_trajectory", "success_criteria", "tool_efficiency")
+
+
+def run_agent_with_trajectory(agent, query: str, config: Optional[dict] = None) -> dict:
     """
     Runs an agent and returns structured output to compare the reference output
     
+    Args:
+        agent: Agent to invoke
+        query: User query
+        config: Optional run config (e.g. {"callbacks": [...]})
+    
     Returns:
         {
             "final_response": str,  # The final AI message text
@@ -19,7 +28,7 @@ def run_agent_with_trajectory(agent, query: str) -> dict:
         }
     """
     # Execute the agent
-    result = agent.invoke({"messages": [("user", query)]})
+    result = agent.invoke({"messages": [("user", query)]}, config=config)
     
     # Extract final AI message
     final_response = ""
@@ -57,6 +66,27 @@ def run_agent_with_trajectory(agent, query: str) -> dict:
     }
 
 
+def get_metrics_from_experiment(experiment, store: Optional[ResultsStore] = None) -> Dict[str, float]:
+    """
+    Extract average scores, p99 latency, and average tokens and cost from an experiment.
+    
+    The experiment is ingested into the local results store on first use, so plots
+    and tables that ask for the same experiment again don't go back to LangSmith.
+    
+    Args:
+        experiment: Result of langsmith.evaluate()
+        store: Results store (defaults to the shared local store)
+    """
+    store = store if store is not None else get_results_store()
+    metrics = store.metrics(store.ingest_experiment(experiment))
+    
+    avg_metrics = {key: metrics[key] for key in CONFUSION_SCORE_KEYS if key in metrics}
+    avg_metrics["latency"] = metrics["latency_p99"]
+    avg_metrics["tokens"] = metrics["avg_tokens"]
+    avg_metrics["cost"] = metrics["avg_cost"]
+    return avg_metrics
+
+
 def display_metrics_table(metrics: Dict[str, float], title: str = "Evaluation Metrics", note: str = ""):
     """
     Display evaluation metrics as a formatted dataframe.
@@ -202,6 +202,40 @@ def plot_noise_impact(noise_experiments, get_metrics_from_experiment):
     print("   - Quality of tools matters as much as quantity")
 
 
+def plot_sweep_results(sweep_results, metric="accuracy"):
+    """
+    Plot the degradation curve from a noise-ratio / tool-count sweep.
+
+    Creates a line chart of the metric against % relevant tools, one line per
+    tool count (results from context_confusion.utils.sweep.run_sweep).
+
+    Also displays the results table.
+    """
+    fig = go.Figure()
+    for tool_count, group in sweep_results.groupby("tool_count"):
+        group = group.sort_values("relevance")
+        fig.add_trace(go.Scatter(
+            x=group["relevance"] * 100,
+            y=group[metric],
+            mode='lines+markers',
+            name=f"{tool_count} tools",
+            marker=dict(size=8),
+        ))
+
+    fig.update_layout(
+        title="Agent Performance Across Noise Ratios and Tool Counts",
+        xaxis_title="% Relevant Tools",
+        yaxis_title=metric.replace("_", " ").title(),
+        xaxis=dict(autorange="reversed"),
+        hovermode='x unified',
+        height=450
+    )
+
+    fig.show()
+
+    display(sweep_results)
+
+
 def plot_routing_comparison(worst_noise_metrics, routed_metrics):
     """
     Compare routing solution vs worst noise configuration.
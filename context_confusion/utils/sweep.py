@@ -0,0 +1,216 @@
+"""
+Noise-ratio and tool-count sweeps for context confusion.
+
+The notebook's noise experiment builds three tool sets by hand. run_sweep builds a tool
+set for every (relevance ratio, tool count) point of a grid from the existing tool
+groups, runs the test cases against each configuration in parallel, and returns one
+row per configuration with accuracy, tokens and latency, so the whole degradation
+curve can be plotted (see plot_sweep_results).
+
+Runs are meant for an offline model. Wrap a real model in RecordedChatModel
+(context_common/recorded_model.py) to record it once and replay sweeps without API calls.
+"""
+
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+from langchain.agents import create_agent
+
+from context_common.prompt_cache import CacheUsageTracker
+from context_confusion.instructions import SHIPPING_SUPPORT_INSTRUCTIONS
+from context_confusion.resources.test_cases import test_cases as default_test_cases
+from context_confusion.tests.evaluators import compare_trajectory
+from context_confusion.tools import (
+    analytics_tools,
+    billing_tools,
+    carrier_tools,
+    customer_service_tools,
+    customs_tools,
+    employee_tools,
+    environmental_tools,
+    fleet_tools,
+    fraud_tools,
+    insurance_tools,
+    marketing_tools,
+    order_modification_tools,
+    quality_tools,
+    returns_tools,
+    shipping_core_tools,
+    subscription_tools,
+    vendor_tools,
+    warehouse_tools,
+)
+from context_confusion.utils.agent_helpers import run_agent_with_trajectory
+
+# Shipping support groups, most essential first: smaller tool sets keep the core tools
+RELEVANT_TOOL_GROUPS = [
+    shipping_core_tools,
+    carrier_tools,
+    returns_tools,
+    order_modification_tools,
+    customer_service_tools,
+    warehouse_tools,
+    billing_tools,
+]
+
+# Groups from unrelated domains, sampled as noise
+NOISE_TOOL_GROUPS = [
+    fraud_tools,
+    analytics_tools,
+    marketing_tools,
+    vendor_tools,
+    employee_tools,
+    quality_tools,
+    customs_tools,
+    subscription_tools,
+    fleet_tools,
+    environmental_tools,
+    insurance_tools,
+]
+
+DEFAULT_RELEVANCE_RATIOS = (1.0, 0.75, 0.5, 0.25)
+DEFAULT_TOOL_COUNTS = (8, 16, 32)
+
+
+def build_tool_set(
+    relevance: float,
+    tool_count: int,
+    seed: int = 0,
+    relevant_groups: Sequence[list] = RELEVANT_TOOL_GROUPS,
+    noise_groups: Sequence[list] = NOISE_TOOL_GROUPS,
+) -> Optional[list]:
+    """
+    Build a tool set with a given share of relevant tools.
+
+    Relevant tools are taken in group order (core shipping tools first); noise tools are
+    sampled with a seeded RNG, so the same arguments always give the same tool set.
+
+    Returns:
+        The tools, or None if the groups don't have enough relevant or noise tools.
+    """
+    if not 0.0 <= relevance <= 1.0:
+        raise ValueError(f"relevance must be between 0 and 1, got {relevance}")
+    relevant_pool = [tool for group in relevant_groups for tool in group]
+    noise_pool = [tool for group in noise_groups for tool in group]
+    relevant_count = round(relevance * tool_count)
+    noise_count = tool_count - relevant_count
+    if relevant_count > len(relevant_pool) or noise_count > len(noise_pool):
+        return None
+    noise = random.Random(f"{seed}:{relevance}:{tool_count}").sample(noise_pool, noise_count)
+    return relevant_pool[:relevant_count] + noise
+
+
+def sweep_configs(
+    relevance_ratios: Sequence[float] = DEFAULT_RELEVANCE_RATIOS,
+    tool_counts: Sequence[int] = DEFAULT_TOOL_COUNTS,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Tool set configurations for every (relevance, tool count) pair of the grid.
+
+    Pairs the tool groups can't fill (e.g. 100% relevant with more tools than the
+    relevant groups hold) are left out.
+    """
+    configs = []
+    for relevance, tool_count in itertools.product(relevance_ratios, tool_counts):
+        tools = build_tool_set(relevance, tool_count, seed)
+        if tools is None:
+            continue
+        relevant_count = round(relevance * tool_count)
+        configs.append({
+            "name": f"{relevance * 100:.0f}-pct-relevant-{tool_count}-tools",
+            "relevance": relevance,
+            "tool_count": tool_count,
+            "relevant_tools": relevant_count,
+            "noise_tools": tool_count - relevant_count,
+            "tools": tools,
+        })
+    return configs
+
+
+def _run_case(agent, config: Dict[str, Any], case_index: int, test_case: Dict[str, Any]) -> Dict[str, Any]:
+    tracker = CacheUsageTracker()
+    start = time.perf_counter()
+    error = None
+    try:
+        outputs = run_agent_with_trajectory(agent, test_case["query"], config={"callbacks": [tracker]})
+    except Exception as e:
+        outputs = {"final_response": "", "trajectory": []}
+        error = f"{type(e).__name__}: {e}"
+    latency = time.perf_counter() - start
+    trajectory = outputs["trajectory"]
+    expected = test_case["trajectory"]
+    usage = tracker.summary()
+    return {
+        "name": config["name"],
+        "relevance": config["relevance"],
+        "tool_count": config["tool_count"],
+        "case": case_index,
+        "query": test_case["query"],
+        "accuracy": compare_trajectory(trajectory, expected, test_case.get("trajectory_comparison_mode", "strict")),
+        "tool_efficiency": min(1.0, len(expected) / len(trajectory)) if trajectory else 0.0,
+        "tool_calls": len(trajectory),
+        "input_tokens": usage["input_tokens"],
+        "output_tokens": usage["output_tokens"],
+        "tokens": usage["input_tokens"] + usage["output_tokens"],
+        "latency": latency,
+        "error": error,
+    }
+
+
+def run_sweep(
+    model: Any,
+    configs: Optional[List[Dict[str, Any]]] = None,
+    test_cases: Optional[List[Dict[str, Any]]] = None,
+    system_prompt: Any = SHIPPING_SUPPORT_INSTRUCTIONS,
+    max_workers: int = 8,
+    per_run: bool = False,
+) -> pd.DataFrame:
+    """
+    Run every test case against every tool set configuration in parallel.
+
+    Args:
+        model: Chat model for the agents (an offline or RecordedChatModel for repeatable sweeps)
+        configs: Configurations from sweep_configs (defaults to the default grid)
+        test_cases: Test cases with query / trajectory / trajectory_comparison_mode
+            (defaults to context_confusion.resources.test_cases)
+        system_prompt: System prompt for every agent
+        max_workers: Runs in flight at once
+        per_run: Return one row per (configuration, test case) instead of per configuration
+
+    Returns:
+        Per configuration: name, relevance, tool_count, relevant_tools, noise_tools,
+        runs, errors, accuracy (mean trajectory match against the expected tool calls),
+        tool_efficiency, avg_tokens and avg_latency (seconds), ordered by tool count and
+        decreasing relevance.
+    """
+    configs = configs if configs is not None else sweep_configs()
+    test_cases = test_cases if test_cases is not None else default_test_cases
+    agents = {
+        config["name"]: create_agent(model=model, tools=config["tools"], system_prompt=system_prompt)
+        for config in configs
+    }
+    jobs = [(config, i, case) for config in configs for i, case in enumerate(test_cases)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        rows = list(pool.map(lambda job: _run_case(agents[job[0]["name"]], *job), jobs))
+
+    runs = pd.DataFrame(rows)
+    if per_run:
+        return runs
+    summary = runs.groupby("name", sort=False).agg(
+        runs=("case", "count"),
+        errors=("error", "count"),
+        accuracy=("accuracy", "mean"),
+        tool_efficiency=("tool_efficiency", "mean"),
+        avg_tokens=("tokens", "mean"),
+        avg_latency=("latency", "mean"),
+    ).reset_index()
+    layout = pd.DataFrame(
+        [{key: config[key] for key in ("name", "relevance", "tool_count", "relevant_tools", "noise_tools")} for config in configs]
+    )
+    results = layout.merge(summary, on="name")
+    return results.sort_values(["tool_count", "relevance"], ascending=[True, False], ignore_index=True)
@@ -9,9 +9,10 @@ import json
 import re
 from typing import Dict, Any, Optional, List
 from collections import Counter
-from langchain_openai import ChatOpenAI
 from typing import TypedDict, Annotated
 
+from context_common.judges import get_judge
+
 
 def extract_tool_calls_from_message(msg: Any) -> List[Dict[str, Any]]:
     """Extract tool calls from a message (dict or AIMessage object)."""
@@ -34,6 +35,186 @@ def extract_tool_calls_from_message(msg: Any) -> List[Dict[str, Any]]:
     return tool_calls
 
 
+# =====================================================
+# SINGLE-PASS REPORT PARSING
+# =====================================================
+# Reports are tokenized once into a heading tree (with section offsets) and a list
+# of fenced code blocks. Answers and every domain section are then looked up from
+# that structure instead of re-running regex searches over the whole document.
+
+_FENCE_RE = re.compile(r"^\s*```\s*([\w-]*)")
+_HEADING_RE = re.compile(r"^(#{1,6})\s*(.*?)\s*#*\s*$")
+_ANSWERS_START_RE = re.compile(r'\{\s*"answers"\s*:')
+
+# Domain name mappings for markdown headings
+_DOMAIN_PATTERNS = {
+    "renewable_energy": re.compile(r"\b(?:renewable\s+energy|solar|wind|renewables)\b", re.IGNORECASE),
+    "artificial_intelligence": re.compile(r"\b(?:artificial\s+intelligence|ai|machine\s+learning)\b", re.IGNORECASE),
+    "electric_vehicles": re.compile(r"\b(?:electric\s+vehicles?|ev|electric\s+car)\b", re.IGNORECASE),
+    "quantum_computing": re.compile(r"\b(?:quantum\s+computing|quantum)\b", re.IGNORECASE),
+    "biotechnology": re.compile(r"\b(?:biotechnology|bio\s+tech|biotech)\b", re.IGNORECASE),
+}
+
+
+def _domain_pattern(domain: str) -> re.Pattern:
+    pattern = _DOMAIN_PATTERNS.get(domain)
+    if pattern is None:
+        words = r"[\s_]+".join(re.escape(word) for word in domain.split("_"))
+        pattern = re.compile(rf"\b{words}\b", re.IGNORECASE)
+        _DOMAIN_PATTERNS[domain] = pattern
+    return pattern
+
+
+def parse_report(markdown: str) -> Dict[str, Any]:
+    """
+    Tokenize a markdown report in one pass.
+    
+    Returns:
+        {
+            "text": the original markdown,
+            "headings": [{"level", "title", "start", "end"}, ...],  # end = section end offset
+            "fences": [{"lang", "start", "end"}, ...],  # offsets of the fenced content
+        }
+    Lines inside fenced code blocks are never treated as headings.
+    """
+    headings = []
+    fences = []
+    open_headings = []  # stack of headings whose section hasn't ended yet
+    fence = None
+    offset = 0
+    
+    for line in markdown.splitlines(keepends=True):
+        line_start = offset
+        offset += len(line)
+        
+        fence_match = _FENCE_RE.match(line)
+        if fence is not None:
+            if fence_match and not fence_match.group(1):
+                fence["end"] = line_start
+                fences.append(fence)
+                fence = None
+            continue
+        if fence_match:
+            fence = {"lang": fence_match.group(1).lower(), "start": offset, "end": None}
+            continue
+        
+        if not line.startswith("#"):
+            continue
+        heading_match = _HEADING_RE.match(line.rstrip("\r\n"))
+        if not heading_match:
+            continue
+        level = len(heading_match.group(1))
+        # A heading closes every open section at the same or a deeper level
+        while open_headings and open_headings[-1]["level"] >= level:
+            open_headings.pop()["end"] = line_start
+        heading = {"level": level, "title": heading_match.group(2), "start": line_start, "end": None}
+        headings.append(heading)
+        open_headings.append(heading)
+    
+    for heading in open_headings:
+        heading["end"] = len(markdown)
+    if fence is not None:
+        # Unterminated fence runs to the end of the document
+        fence["end"] = len(markdown)
+        fences.append(fence)
+    
+    return {"text": markdown, "headings": headings, "fences": fences}
+
+
+def _scan_json_object(text: str, start: int) -> int:
+    """
+    Return the index just past the JSON object starting at text[start] ("{"),
+    or -1 if braces never balance. Braces inside strings are ignored.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _load_answers(json_str: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(json_str)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(data, dict) and "answers" in data:
+        return data["answers"]
+    return None
+
+
+def extract_answers_from_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the answers dict from a parsed report.
+    
+    Checks fenced ```json blocks first, then falls back to the first inline
+    {"answers": ...} object, delimited with a balanced-brace scan.
+    """
+    text = report["text"]
+    for fence in report["fences"]:
+        if fence["lang"] != "json":
+            continue
+        content = text[fence["start"]:fence["end"]]
+        brace = content.find("{")
+        if brace == -1:
+            continue
+        end = _scan_json_object(content, brace)
+        answers = _load_answers(content[brace:end] if end != -1 else content[brace:])
+        if answers is not None:
+            return answers
+    
+    inline = _ANSWERS_START_RE.search(text)
+    if inline:
+        end = _scan_json_object(text, inline.start())
+        if end != -1:
+            answers = _load_answers(text[inline.start():end])
+            if answers is not None:
+                return answers
+    return {}
+
+
+def extract_domain_section(report: Dict[str, Any], domain: str) -> str:
+    """Return the section of a parsed report for a domain (see extract_domain_section_from_markdown)."""
+    text = report["text"]
+    pattern = _domain_pattern(domain)
+    
+    # Look for headings (## or ###) containing domain name
+    for heading in report["headings"]:
+        if heading["level"] in (2, 3) and pattern.search(heading["title"]):
+            return text[heading["start"]:heading["end"]]
+    
+    # Fallback: return a section around the first mention of the domain
+    mention = pattern.search(text)
+    if mention:
+        start = max(0, mention.start() - 500)
+        end = min(len(text), mention.start() + 1000)
+        return text[start:end]
+    
+    return ""
+
+
+def extract_domain_sections(markdown: str, domains: List[str]) -> Dict[str, str]:
+    """Parse a report once and return {domain: section markdown} for every domain."""
+    report = parse_report(markdown)
+    return {domain: extract_domain_section(report, domain) for domain in domains}
+
+
 def extract_answers_json(response: str) -> Dict[str, Any]:
     """
     Extract answers JSON from markdown response.
@@ -41,21 +222,9 @@ def extract_answers_json(response: str) -> Dict[str, Any]:
     
     Returns empty dict if JSON is missing or invalid.
     """
-    # Try to find JSON code block first
-    json_match = re.search(r'```json\s*(\{.*?\})\s*```', response, re.DOTALL)
-    if not json_match:
-        # Try to find JSON starting with {"answers" - match until balanced braces
-        json_match = re.search(r'(\{"answers".*?\})', response, re.DOTALL)
-    
-    if json_match:
-        try:
-            json_str = json_match.group(1)
-            data = json.loads(json_str)
-            if "answers" in data:
-                return data["answers"]
-        except json.JSONDecodeError:
-            pass
-    return {}
+    if not response:
+        return {}
+    return extract_answers_from_report(parse_report(response))
 
 
 def compare_values(actual_value: Any, expected_value: str, tolerance: float = 0.005) -> bool:
@@ -97,47 +266,15 @@ class ConsistencyCheck(TypedDict):
 
 
 def extract_domain_section_from_markdown(markdown: str, domain: str) -> str:
-    """Extract the markdown section for a specific domain using regex."""
-    # Domain name mappings for markdown headings
-    domain_names = {
-        "renewable_energy": r"(?i)(renewable\s+energy|solar|wind|renewables)",
-        "artificial_intelligence": r"(?i)(artificial\s+intelligence|ai|machine\s+learning)",
-        "electric_vehicles": r"(?i)(electric\s+vehicles?|ev|electric\s+car)",
-        "quantum_computing": r"(?i)(quantum\s+computing|quantum)",
-        "biotechnology": r"(?i)(biotechnology|bio\s+tech|biotech)",
-    }
-    
-    # Try to find domain section
-    pattern = domain_names.get(domain, domain.replace("_", r"\s+"))
-    
-    # Look for headings (## or ###) containing domain name
-    heading_pattern = rf"(?:^|\n)(#{{2,3}})\s*.*?{pattern}.*?(?:\n|$)"
-    match = re.search(heading_pattern, markdown, re.MULTILINE | re.IGNORECASE)
-    
-    if match:
-        start_pos = match.start()
-        heading_level = len(match.group(1))
-        
-        # Find the next heading at same or higher level, or end of document
-        next_heading_pattern = rf"\n#{{1,{heading_level}}}\s+"
-        next_match = re.search(next_heading_pattern, markdown[start_pos + 1:], re.MULTILINE)
-        
-        if next_match:
-            end_pos = start_pos + 1 + next_match.start()
-            return markdown[start_pos:end_pos]
-        else:
-            return markdown[start_pos:]
-    
-    # Fallback: return a section around mentions of the domain
-    domain_mentions = list(re.finditer(rf"\b{pattern}\b", markdown, re.IGNORECASE))
-    if domain_mentions:
-        # Get context around first mention (500 chars before and after)
-        first_mention = domain_mentions[0].start()
-        start = max(0, first_mention - 500)
-        end = min(len(markdown), first_mention + 1000)
-        return markdown[start:end]
+    """
+    Extract the markdown section for a specific domain.
     
-    return ""
+    The section is the first level-2/3 heading whose title names the domain, up to
+    the next heading at the same or a higher level. Falls back to a window around
+    the first mention of the domain. To extract several domains, use
+    extract_domain_sections so the report is only parsed once.
+    """
+    return extract_domain_section(parse_report(markdown), domain)
 
 
 def check_consistency_with_llm(
@@ -146,8 +283,7 @@ def check_consistency_with_llm(
     model: str = "gpt-4o-mini"
 ) -> Dict[str, Any]:
     """Use LLM to check consistency between markdown and JSON, checking each domain separately."""
-    judge_llm = ChatOpenAI(model=model, temperature=0)
-    judge = judge_llm.with_structured_output(ConsistencyCheck)
+    judge = get_judge(model, ConsistencyCheck)
     
     system_prompt = """You are checking consistency between markdown content and JSON data in a research report.
 
@@ -188,12 +324,15 @@ REQUIREMENTS:
     all_reasoning = []
     domain_scores = []
     
-    # Check each domain separately
+    # Build one prompt per domain, then judge all domains in a single concurrent batch
     domains = list(calculations_json.get("calculations", {}).keys())
+    # Parse the report once and extract every domain section from it
+    domain_sections = extract_domain_sections(response, domains)
+    checked_domains = []
+    prompts = []
     
     for domain in domains:
-        # Extract domain-specific markdown section
-        domain_markdown = extract_domain_section_from_markdown(response, domain)
+        domain_markdown = domain_sections[domain]
         domain_json = calculations_json.get("calculations", {}).get(domain, {})
         
         if not domain_markdown or not domain_json:
@@ -208,33 +347,37 @@ JSON Data for {domain}:
 
 Check consistency between the markdown and JSON for the {domain} domain."""
         
-        try:
-            result = judge.invoke([
-                ("system", system_prompt),
-                ("human", human_message)
-            ])
-            
-            # Aggregate results
-            inconsistencies = result.get("inconsistencies", [])
-            examples = result.get("specific_examples", [])
-            reasoning = result.get("reasoning", "")
-            score = result.get("consistency_score", 0.0)
-            
-            # Prefix domain name to inconsistencies and examples
-            for inc in inconsistencies:
-                all_inconsistencies.append(f"{domain}: {inc}")
-            for ex in examples:
-                ex_copy = dict(ex)
-                if "field_name" in ex_copy:
-                    ex_copy["field_name"] = f"{domain}.{ex_copy['field_name']}"
-                all_examples.append(ex_copy)
-            
-            all_reasoning.append(f"{domain}: {reasoning[:150]}")
-            domain_scores.append(score)
-            
-        except Exception as e:
-            all_inconsistencies.append(f"{domain}: Error checking consistency: {str(e)}")
+        checked_domains.append(domain)
+        prompts.append([
+            ("system", system_prompt),
+            ("human", human_message)
+        ])
+    
+    results = judge.batch(prompts, return_exceptions=True)
+    
+    for domain, result in zip(checked_domains, results):
+        if isinstance(result, Exception):
+            all_inconsistencies.append(f"{domain}: Error checking consistency: {str(result)}")
             domain_scores.append(0.0)
+            continue
+        
+        # Aggregate results
+        inconsistencies = result.get("inconsistencies", [])
+        examples = result.get("specific_examples", [])
+        reasoning = result.get("reasoning", "")
+        score = result.get("consistency_score", 0.0)
+        
+        # Prefix domain name to inconsistencies and examples
+        for inc in inconsistencies:
+            all_inconsistencies.append(f"{domain}: {inc}")
+        for ex in examples:
+            ex_copy = dict(ex)
+            if "field_name" in ex_copy:
+                ex_copy["field_name"] = f"{domain}.{ex_copy['field_name']}"
+            all_examples.append(ex_copy)
+        
+        all_reasoning.append(f"{domain}: {reasoning[:150]}")
+        domain_scores.append(score)
     
     # Calculate overall score as average of domain scores
     overall_score = sum(domain_scores) / len(domain_scores) if domain_scores else 0.0
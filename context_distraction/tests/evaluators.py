@@ -1,11 +1,10 @@
 """Evaluators for context distraction evaluation."""
 
-import json
-import re
 from typing import Dict, Any, List
 from context_distraction.resources.validation_utils import (
     compare_values,
     compare_tool_calls,
+    extract_answers_json,
 )
 
 
@@ -16,19 +15,7 @@ def extract_answers_json_from_text(text: str) -> Dict[str, Any]:
     
     Returns empty dict if JSON is missing or invalid.
     """
-    if not text:
-        return {}
-    
-    # Look for JSON code block - the closing ``` tells us exactly where it ends
-    json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-    if json_match:
-        try:
-            data = json.loads(json_match.group(1))
-            return data.get("answers", {})
-        except json.JSONDecodeError:
-            pass
-    
-    return {}
+    return extract_answers_json(text)
 
 
 def recall_accuracy_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any], reference_outputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -3,6 +3,7 @@
 from typing import Dict, Any, List
 from langsmith import Client
 
+from context_common.datasets import sync_dataset
 from context_distraction.resources.test_tasks import TEST_TASKS
 from context_distraction.resources.validation_utils import generate_expected_tool_calls
 
@@ -33,32 +34,20 @@ def build_reference_outputs(task: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def create_or_get_dataset(dataset_name: str, tasks: List[Dict[str, Any]] = None) -> Any:
-    """Create or get LangSmith dataset with test tasks."""
+    """Create or incrementally sync a LangSmith dataset with test tasks (one example per query)."""
     if tasks is None:
         tasks = TEST_TASKS
     
-    try:
-        dataset = client.read_dataset(dataset_name=dataset_name)
-    except:
-        dataset = client.create_dataset(
-            dataset_name=dataset_name,
-            description="Research tasks of varying complexity"
-        )
-    
-    # Get existing examples to avoid duplicates
-    existing_examples = list(client.list_examples(dataset_id=dataset.id))
-    existing_queries = {ex.inputs.get("query") for ex in existing_examples}
-    
-    # Only add examples that don't already exist
-    for task in tasks:
-        if task["query"] not in existing_queries:
-            client.create_example(
-                inputs={"query": task["query"]},
-                outputs=build_reference_outputs(task),
-                dataset_id=dataset.id
-            )
-    
-    return dataset
+    examples = [
+        {"inputs": {"query": task["query"]}, "outputs": build_reference_outputs(task)}
+        for task in tasks
+    ]
+    return sync_dataset(
+        client,
+        dataset_name,
+        examples,
+        description="Research tasks of varying complexity",
+    )
 
 
 def setup_datasets(full_name: str, slim_name: str, tasks: List[Dict[str, Any]]):
@@ -5,6 +5,7 @@ Each tool call returns detailed information designed to fill context
 and test the agent's ability to recall specific details across many steps.
 """
 
+from context_common.tool_output import compact_result
 from context_distraction.resources.synthetic_data import (
     RESEARCH_TOPICS,
     EXPERT_OPINIONS,
@@ -168,6 +169,7 @@ def _research_topic_impl(topic: str, depth: str = "comprehensive") -> Dict[str,
 
 
 @tool
+@compact_result(redundant=("detailed_analysis",))
 def research_topic(topic: str, depth: str = "comprehensive") -> Dict[str, Any]:
     """
     Get qualitative research insights for a topic (key findings, methodology, analysis context).
@@ -180,6 +182,7 @@ def research_topic(topic: str, depth: str = "comprehensive") -> Dict[str, Any]:
 
 
 @tool
+@compact_result
 def get_expert_opinion(topic: str, expert_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Get expert opinion on a specific topic.
@@ -228,6 +231,7 @@ def get_expert_opinion(topic: str, expert_id: Optional[str] = None) -> Dict[str,
 
 
 @tool
+@compact_result
 def get_statistics(topic: str) -> Dict[str, Any]:
     """
     Get quantitative metrics for a topic (market size, growth rates, investments, correlations).
@@ -311,6 +315,7 @@ def get_statistics(topic: str) -> Dict[str, Any]:
 
 
 @tool
+@compact_result
 def get_case_study(topic: str, case_study_id: Optional[str] = None) -> Dict[str, Any]:
     """
     Get detailed case study information for a topic.
@@ -364,6 +369,7 @@ def get_case_study(topic: str, case_study_id: Optional[str] = None) -> Dict[str,
 
 
 @tool
+@compact_result
 def get_year_data(topic: str, year: int) -> Dict[str, Any]:
     """
     Get data for a specific topic in a specific year. More atomic than get_historical_trends.
@@ -436,6 +442,7 @@ is essential for trend analysis, growth projections, and understanding the long-
 
 
 @tool
+@compact_result
 def get_historical_trends(topic: str, time_range_years: int = 10) -> Dict[str, Any]:
     """
     Get historical trends and evolution of a topic over time.
@@ -501,6 +508,7 @@ def get_historical_trends(topic: str, time_range_years: int = 10) -> Dict[str, A
 
 
 @tool
+@compact_result
 def synthesize_research(topics: List[str], focus_areas: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     Synthesize research findings across multiple topics.
@@ -617,6 +625,7 @@ core_research_tools = [
 ]
 
 @tool
+@compact_result
 def calculate_compound_growth(initial_value: float, growth_rate: float, years: int) -> List[float]:
     """
     Calculate compound growth over multiple years.
@@ -640,6 +649,7 @@ def calculate_compound_growth(initial_value: float, growth_rate: float, years: i
 
 
 @tool
+@compact_result
 def calculate_market_share(market_size: float, company_revenue: float, market_segments: Optional[List[Dict[str, float]]] = None) -> Dict[str, Any]:
     """
     Calculate market share and perform market analysis.
@@ -680,6 +690,7 @@ def calculate_market_share(market_size: float, company_revenue: float, market_se
 
 
 @tool
+@compact_result
 def analyze_correlation(data_points: List[Dict[str, float]], variable1: str, variable2: str) -> Dict[str, Any]:
     """
     Perform correlation analysis between two variables across multiple data points.
@@ -742,6 +753,7 @@ def analyze_correlation(data_points: List[Dict[str, float]], variable1: str, var
 
 
 @tool
+@compact_result
 def calculate_cost_benefit_analysis(
     initial_investment: float,
     annual_benefits: List[float],
@@ -809,6 +821,7 @@ def calculate_cost_benefit_analysis(
 
 
 @tool
+@compact_result
 def aggregate_statistics(data: List[Dict[str, Any]], group_by: str, metrics: List[str]) -> Dict[str, Any]:
     """
     SQL-like aggregation: group by field and calculate metrics.
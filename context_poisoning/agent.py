@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain_anthropic import ChatAnthropic
 
+from context_common.prompt_cache import system_prompt_for
+from context_poisoning.guard import EntityGuardMiddleware
 from context_poisoning.tools import all_tools
 from context_poisoning.instructions import FINANCIAL_RESEARCH_INSTRUCTIONS
 
@@ -15,8 +17,19 @@ load_dotenv()
 
 llm = ChatAnthropic(model="claude-haiku-4-5-20251001", temperature=0)
 
+# Cache breakpoint after the instructions: tool schemas + instructions are reused across runs
+system_prompt = system_prompt_for(llm, [FINANCIAL_RESEARCH_INSTRUCTIONS])
+
 agent = create_agent(
     model=llm,
     tools=all_tools,
-    system_prompt=FINANCIAL_RESEARCH_INSTRUCTIONS
+    system_prompt=system_prompt
+)
+
+# Same agent with unknown tickers/sectors/goals rejected before dispatch
+guarded_agent = create_agent(
+    model=llm,
+    tools=all_tools,
+    system_prompt=system_prompt,
+    middleware=[EntityGuardMiddleware()]
 )
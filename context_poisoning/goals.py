@@ -0,0 +1,101 @@
+"""
+Indexed research-goal store.
+
+Goals keep their insertion order (so list positions stay valid for index-based
+addressing), and also get a stable ID ("G1", "G2", ...). The store maintains a
+per-status index and a max-heap of active goals by priority, so "highest priority
+active goals" and status filters don't need a scan, and updates cost O(log n).
+
+Heap entries are invalidated lazily: an update pushes a fresh entry and stale ones
+are skipped (and periodically compacted away).
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class GoalStore:
+    """Research goals with stable IDs, status indexes and an active-goal priority heap."""
+
+    def __init__(self):
+        self.goals: List[Dict[str, Any]] = []
+        self._position: Dict[str, int] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        # (-priority, position, goal_id, stamp); an entry is live if its stamp is current
+        self._heap: List[Tuple[int, int, str, int]] = []
+        self._stamps: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.goals)
+
+    def next_id(self) -> str:
+        return f"G{len(self.goals) + 1}"
+
+    def add(self, goal: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a goal (assigning an ID if it has none) and index it."""
+        goal.setdefault("id", self.next_id())
+        self._position[goal["id"]] = len(self.goals)
+        self.goals.append(goal)
+        self._index(goal)
+        return goal
+
+    def get(self, goal_id: str) -> Optional[Dict[str, Any]]:
+        position = self._position.get(goal_id)
+        return None if position is None else self.goals[position]
+
+    def position(self, goal_id: str) -> Optional[int]:
+        return self._position.get(goal_id)
+
+    def update(self, goal_id: str, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply changes to a goal and re-index it."""
+        goal = self.goals[self._position[goal_id]]
+        self._by_status[goal.get("status")].pop(goal_id, None)
+        goal.update(changes)
+        self._index(goal)
+        return goal
+
+    def _index(self, goal: Dict[str, Any]) -> None:
+        goal_id = goal["id"]
+        self._by_status.setdefault(goal.get("status"), {})[goal_id] = None
+        stamp = self._stamps.get(goal_id, 0) + 1
+        self._stamps[goal_id] = stamp
+        if goal.get("status") == "active":
+            heapq.heappush(self._heap, (-(goal.get("priority") or 0), self._position[goal_id], goal_id, stamp))
+            # Keep stale entries from piling up over long sessions
+            if len(self._heap) > 2 * len(self._by_status.get("active", {})) + 16:
+                self._compact()
+
+    def _is_live(self, entry: Tuple[int, int, str, int]) -> bool:
+        _, _, goal_id, stamp = entry
+        return self._stamps.get(goal_id) == stamp and goal_id in self._by_status.get("active", {})
+
+    def _compact(self) -> None:
+        self._heap = [entry for entry in self._heap if self._is_live(entry)]
+        heapq.heapify(self._heap)
+
+    def with_status(self, status: str) -> List[Dict[str, Any]]:
+        """Goals with a status, in insertion order."""
+        positions = sorted(self._position[goal_id] for goal_id in self._by_status.get(status, {}))
+        return [self.goals[position] for position in positions]
+
+    def count(self, status: str) -> int:
+        return len(self._by_status.get(status, {}))
+
+    def top_active(self, limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Highest-priority active goals (ties in insertion order).
+        
+        The heap is walked best-first without popping, so reads never mutate the store
+        (stores in forked states are shared between sessions until written), and only
+        the top entries and their children are visited.
+        """
+        top = []
+        frontier = [(self._heap[0], 0)] if self._heap else []
+        while frontier and len(top) < limit:
+            entry, i = heapq.heappop(frontier)
+            if self._is_live(entry):
+                top.append(self.goals[entry[1]])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+        return top
@@ -0,0 +1,153 @@
+"""
+Entity pre-validation guard for the financial research agent.
+
+EntityGuardMiddleware checks a tool call's entity arguments (tickers, sectors, goal
+IDs and indexes) against the in-memory company universe and the session's goal store
+before the tool runs. Calls on unknown entities are answered immediately with a
+compact, cached rejection instead of being dispatched, and any active goal that names
+the unknown entity is marked for cancellation (cancel_requested), so the rejection can
+point the agent at the goal to drop and the recovery shows up in the trajectory.
+"""
+
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain.agents.middleware.types import AgentMiddleware
+from langchain_core.messages import ToolMessage
+
+from context_common.tool_output import encode_tool_result
+from context_poisoning import tools
+from context_poisoning.state import get_session
+
+# Tool arguments holding a single ticker / sector
+_TICKER_ARGS = ("ticker",)
+_SECTOR_ARGS = ("sector",)
+
+# Rejection texts and counts are kept per (kind, value); both are bounded (oldest entry
+# evicted first) so a stream of distinct bogus tickers can't grow them without limit
+_MAX_CACHED_REJECTIONS = 1024
+
+
+class EntityGuardMiddleware(AgentMiddleware):
+    """
+    Reject tool calls on unknown entities before dispatch.
+
+    Args:
+        flag_goals: Mark active goals that mention a rejected entity for cancellation
+    """
+
+    def __init__(self, flag_goals: bool = True):
+        super().__init__()
+        self.flag_goals = flag_goals
+        # Rejection counts per (kind, value), for the most recent _MAX_CACHED_REJECTIONS entities
+        self.rejections: Dict[Tuple[str, str], int] = {}
+        self._cache: Dict[Tuple[str, str], str] = {}
+        self._cache_universe = None
+        # The guard is shared by concurrent sessions; the lock covers the cache and counters
+        self._lock = threading.Lock()
+
+    def _cached_error(self, universe: Any, kind: str, value: str, build: Callable[[], str]) -> str:
+        key = (kind, value)
+        with self._lock:
+            # Suggestions depend on the universe, so a swapped universe starts a fresh cache
+            if self._cache_universe is not universe:
+                self._cache = {}
+                self._cache_universe = universe
+            error = self._cache.get(key)
+        if error is not None:
+            return error
+        error = build()
+        with self._lock:
+            if self._cache_universe is universe:
+                if key not in self._cache and len(self._cache) >= _MAX_CACHED_REJECTIONS:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = error
+        return error
+
+    def validate(self, name: str, args: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Optional[Tuple[str, str, str]]:
+        """
+        Check a tool call's entity arguments.
+
+        Returns:
+            None if the call may run, else (kind, value, error) for the first unknown entity.
+        """
+        universe = tools.get_company_universe()
+        for arg in _TICKER_ARGS:
+            ticker = args.get(arg)
+            if isinstance(ticker, str) and ticker not in universe:
+                return "ticker", ticker, self._cached_error(universe, "ticker", ticker, lambda: universe.ticker_not_found(ticker))
+        tickers = args.get("tickers")
+        if isinstance(tickers, list) and tickers and not any(t in universe for t in tickers):
+            # Batch lookups with some known tickers still run and report the rest
+            missing = [str(t) for t in tickers]
+            return "ticker", missing[0], self._cached_error(universe, "tickers", ",".join(missing), lambda: universe.tickers_not_found(missing))
+        for arg in _SECTOR_ARGS:
+            sector = args.get(arg)
+            if isinstance(sector, str) and sector not in universe.sectors:
+                return "sector", sector, self._cached_error(universe, "sector", sector, lambda: universe.sector_not_found(sector))
+
+        if name == "update_research_goal":
+            goal_store = get_session(config=config).state["goal_store"]
+            goal_id, goal_index = args.get("goal_id"), args.get("goal_index")
+            if goal_id is not None and goal_store.get(goal_id) is None:
+                return "goal", str(goal_id), f"Goal '{goal_id}' not found. Current goals count: {len(goal_store)}"
+            if goal_id is None and isinstance(goal_index, int) and not 0 <= goal_index < len(goal_store):
+                return "goal", str(goal_index), f"Goal index {goal_index} out of range. Current goals count: {len(goal_store)}"
+        return None
+
+    def _flag_goals(self, kind: str, value: str, config: Optional[Dict[str, Any]]) -> List[str]:
+        """Mark active goals that mention the unknown entity for cancellation; return their IDs."""
+        if kind not in ("ticker", "sector"):
+            return []
+        session = get_session(config=config)
+        flags = re.IGNORECASE if kind == "sector" else 0
+        pattern = re.compile(rf"(?<![A-Za-z0-9]){re.escape(value)}(?![A-Za-z0-9])", flags)
+        flagged = []
+        for goal in session.state["goal_store"].with_status("active"):
+            if pattern.search(goal.get("description", "")):
+                if not goal.get("cancel_requested"):
+                    session.record("goal_updated", goal_id=goal["id"], changes={
+                        "cancel_requested": True,
+                        "cancel_reason": f"Unknown {kind} '{value}'"
+                    })
+                flagged.append(goal["id"])
+        return flagged
+
+    def _rejection(self, request: Any, rejected: Tuple[str, str, str], config: Optional[Dict[str, Any]]) -> ToolMessage:
+        kind, value, error = rejected
+        key = (kind, value)
+        with self._lock:
+            if key not in self.rejections and len(self.rejections) >= _MAX_CACHED_REJECTIONS:
+                self.rejections.pop(next(iter(self.rejections)))
+            self.rejections[key] = self.rejections.get(key, 0) + 1
+        content: Dict[str, Any] = {"ok": False, "error": error}
+        if self.flag_goals:
+            flagged = self._flag_goals(kind, value, config)
+            if flagged:
+                content["cancel_goals"] = flagged
+                content["hint"] = (
+                    f"Goal(s) {', '.join(flagged)} depend on unknown {kind} '{value}'. "
+                    f"Cancel with update_research_goal(goal_id=\"{flagged[0]}\", status=\"cancelled\")."
+                )
+        encoded = encode_tool_result(content)
+        return ToolMessage(
+            content=encoded if isinstance(encoded, str) else json.dumps(encoded),
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+            status="error",
+        )
+
+    def _check(self, request: Any) -> Optional[ToolMessage]:
+        config = request.runtime.config if request.runtime is not None else None
+        rejected = self.validate(request.tool_call["name"], request.tool_call.get("args") or {}, config)
+        return None if rejected is None else self._rejection(request, rejected, config)
+
+    def wrap_tool_call(self, request, handler):
+        rejection = self._check(request)
+        return rejection if rejection is not None else handler(request)
+
+    async def awrap_tool_call(self, request, handler):
+        rejection = self._check(request)
+        return rejection if rejection is not None else await handler(request)
@@ -0,0 +1,187 @@
+"""
+Deterministic market-data simulator for the financial research tools.
+
+Each ticker's price series is generated from its own seed, derived from the base seed
+and the ticker name, as NumPy arrays over the trading days: daily OHLC from a
+geometric Brownian motion, daily returns, and rolling 20-day annualized volatility.
+Series are generated on first access and kept in a bounded LRU, so memory follows the
+tickers actually queried rather than the size of the universe, and adding a ticker to
+the universe never changes any other ticker's series. Point-in-time quotes and date
+ranges are served by slicing those arrays, so results are identical across processes
+and runs, and can be cached or replayed.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SEED = 42
+DEFAULT_END_DATE = "2025-12-19"
+TRADING_DAYS = 252
+VOLATILITY_WINDOW = 20
+# Tickers whose generated series are kept in memory (least recently used are dropped)
+DEFAULT_MAX_CACHED = 4096
+
+
+def _business_days(end_date: str, days: int) -> np.ndarray:
+    end = np.busday_offset(np.datetime64(end_date, "D"), 0, roll="backward")
+    return np.busday_offset(end, np.arange(-(days - 1), 1), roll="backward")
+
+
+def _ticker_seed(seed: int, ticker: str) -> int:
+    """Stable per-ticker seed (independent of PYTHONHASHSEED and of the other tickers)."""
+    digest = hashlib.sha256(f"{seed}:{ticker}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+class MarketDataSimulator:
+    """
+    Seeded market data for a fixed universe of tickers.
+
+    Args:
+        tickers: Tickers to simulate (each ticker's series depends only on the seed
+            and its own name)
+        seed: Random seed
+        days: Number of trading days of history
+        end_date: Last trading day (ISO date)
+        max_cached: Most tickers whose generated series are kept in memory
+    """
+
+    def __init__(
+        self,
+        tickers: Iterable[str],
+        seed: int = DEFAULT_SEED,
+        days: int = TRADING_DAYS,
+        end_date: str = DEFAULT_END_DATE,
+        max_cached: int = DEFAULT_MAX_CACHED,
+    ):
+        self.tickers = sorted(set(tickers))
+        self._universe = frozenset(self.tickers)
+        self.seed = seed
+        self.days = days
+        self.dates = _business_days(end_date, days)
+        self.max_cached = max_cached
+        self._series: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _generate(self, ticker: str) -> Dict[str, np.ndarray]:
+        """Simulate one ticker's series from its own seed."""
+        rng = np.random.default_rng(_ticker_seed(self.seed, ticker))
+        days = self.days
+        drift = rng.normal(0.08, 0.05)
+        sigma = rng.uniform(0.15, 0.45)
+        start_price = rng.uniform(20.0, 400.0)
+
+        # Geometric Brownian motion on daily log returns
+        daily_sigma = sigma / np.sqrt(TRADING_DAYS)
+        log_returns = (drift - 0.5 * sigma ** 2) / TRADING_DAYS + daily_sigma * rng.standard_normal(days)
+        log_returns[0] = 0.0
+        close = start_price * np.exp(np.cumsum(log_returns))
+
+        previous_close = np.concatenate([[start_price], close[:-1]])
+        open_ = previous_close * np.exp(0.25 * daily_sigma * rng.standard_normal(days))
+        wick = 0.5 * daily_sigma * np.abs(rng.standard_normal((2, days)))
+        return {
+            "close": close,
+            "open": open_,
+            "high": np.maximum(open_, close) * np.exp(wick[0]),
+            "low": np.minimum(open_, close) * np.exp(-wick[1]),
+            "returns": np.concatenate([[0.0], close[1:] / close[:-1] - 1.0]),
+            "volatility": self._rolling_volatility(log_returns[np.newaxis, :], VOLATILITY_WINDOW)[0],
+        }
+
+    def series(self, ticker: str) -> Dict[str, np.ndarray]:
+        """
+        Daily arrays for one ticker: close, open, high, low, returns, volatility
+        (KeyError if the ticker is not in the universe).
+        """
+        if ticker not in self._universe:
+            raise KeyError(ticker)
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is not None:
+                self._series.move_to_end(ticker)
+                return series
+        series = self._generate(ticker)
+        with self._lock:
+            self._series[ticker] = series
+            while len(self._series) > self.max_cached:
+                self._series.popitem(last=False)
+        return series
+
+    @staticmethod
+    def _rolling_volatility(log_returns: np.ndarray, window: int) -> np.ndarray:
+        """Annualized rolling standard deviation (NaN until a full window is available)."""
+        n, days = log_returns.shape
+        padded = np.concatenate([np.zeros((n, 1)), np.cumsum(log_returns, axis=1)], axis=1)
+        padded_sq = np.concatenate([np.zeros((n, 1)), np.cumsum(log_returns ** 2, axis=1)], axis=1)
+        volatility = np.full((n, days), np.nan)
+        if days >= window:
+            total = padded[:, window:] - padded[:, :-window]
+            total_sq = padded_sq[:, window:] - padded_sq[:, :-window]
+            variance = np.maximum(total_sq / window - (total / window) ** 2, 0.0) * window / (window - 1)
+            volatility[:, window - 1:] = np.sqrt(variance * TRADING_DAYS)
+        return volatility
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._universe
+
+    def day_index(self, as_of: Optional[str] = None) -> int:
+        """Index of the last trading day on or before `as_of` (defaults to the latest day)."""
+        if as_of is None:
+            return len(self.dates) - 1
+        index = int(np.searchsorted(self.dates, np.datetime64(as_of, "D"), side="right")) - 1
+        if index < 0:
+            raise ValueError(f"No market data on or before {as_of} (history starts {self.dates[0]})")
+        return index
+
+    def _quote_at(self, series: Dict[str, np.ndarray], day: int) -> Dict[str, Any]:
+        volatility = series["volatility"][day]
+        return {
+            "date": str(self.dates[day]),
+            "price": round(float(series["close"][day]), 2),
+            "open": round(float(series["open"][day]), 2),
+            "high": round(float(series["high"][day]), 2),
+            "low": round(float(series["low"][day]), 2),
+            "change_pct": round(float(series["returns"][day]) * 100, 2),
+            "volatility_20d": None if np.isnan(volatility) else round(float(volatility), 4),
+        }
+
+    def quote(self, ticker: str, as_of: Optional[str] = None) -> Dict[str, Any]:
+        """Point-in-time quote for one ticker (KeyError if unknown)."""
+        return self._quote_at(self.series(ticker), self.day_index(as_of))
+
+    def quotes(self, tickers: Iterable[str], as_of: Optional[str] = None) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """
+        Point-in-time quotes for several tickers.
+
+        Returns:
+            ({ticker: quote}, [unknown tickers])
+        """
+        day = self.day_index(as_of)
+        found, missing = {}, []
+        for ticker in dict.fromkeys(tickers):
+            if ticker not in self._universe:
+                missing.append(ticker)
+            else:
+                found[ticker] = self._quote_at(self.series(ticker), day)
+        return found, missing
+
+    def history(self, ticker: str, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, List[Any]]:
+        """Daily OHLC, returns and volatility between two dates (inclusive), as columns."""
+        series = self.series(ticker)
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, "D"), side="left"))
+        hi = self.day_index(end) + 1
+        window = slice(lo, max(lo, hi))
+        return {
+            "date": [str(d) for d in self.dates[window]],
+            "open": np.round(series["open"][window], 2).tolist(),
+            "high": np.round(series["high"][window], 2).tolist(),
+            "low": np.round(series["low"][window], 2).tolist(),
+            "close": np.round(series["close"][window], 2).tolist(),
+            "return": np.round(series["returns"][window], 6).tolist(),
+            "volatility_20d": [None if np.isnan(v) else round(float(v), 4) for v in series["volatility"][window]],
+        }
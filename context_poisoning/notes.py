@@ -0,0 +1,144 @@
+"""
+Searchable, bounded research-notes store.
+
+Notes are kept per topic, indexed in a local inverted index (token -> note IDs with
+term counts), and ranked with BM25 for search_notes. A retention policy caps the
+notes kept per topic and in total, evicting the oldest notes first and counting what
+was evicted, so memory and state reads stay bounded over long sessions. State reads
+use a fixed-size view (note counts plus the most recent notes per topic) instead of
+every note.
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+MAX_NOTES_PER_TOPIC = 50
+MAX_NOTES = 2000
+
+# Size of the state view: topics shown and recent notes shown per topic
+VIEW_TOPICS = 20
+VIEW_NOTES_PER_TOPIC = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class NotesStore:
+    """
+    Research notes with per-topic lists, an inverted index and a retention policy.
+
+    Args:
+        max_per_topic: Notes kept per topic before the oldest are evicted
+        max_notes: Notes kept in total before the oldest are evicted
+    """
+
+    def __init__(self, max_per_topic: int = MAX_NOTES_PER_TOPIC, max_notes: int = MAX_NOTES):
+        self.max_per_topic = max_per_topic
+        self.max_notes = max_notes
+        # topic -> retained notes, oldest first ({"id", "note", "timestamp"}); topics are
+        # kept in order of their latest note
+        self.by_topic: Dict[str, List[Dict[str, Any]]] = {}
+        self.evicted: Dict[str, int] = {}
+        # note ID -> {"topic", "note", "terms", "length"}, oldest first
+        self._notes: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def add(self, topic: str, note: Dict[str, Any]) -> Dict[str, Any]:
+        """Add a note ({"note", "timestamp"}) under a topic, evicting old notes if needed."""
+        note = dict(note)
+        note.setdefault("id", f"N{self._next_id}")
+        self._next_id += 1
+        note_id = note["id"]
+
+        tokens = _tokens(f"{topic} {note.get('note', '')}")
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[note_id] = count
+        self._notes[note_id] = {"topic": topic, "note": note, "terms": list(counts), "length": len(tokens)}
+        self._total_length += len(tokens)
+        topic_notes = self.by_topic.pop(topic, [])
+        topic_notes.append(note)
+        self.by_topic[topic] = topic_notes
+
+        if len(self.by_topic[topic]) > self.max_per_topic:
+            self._evict(self.by_topic[topic][0]["id"])
+        while len(self._notes) > self.max_notes:
+            self._evict(next(iter(self._notes)))
+        return note
+
+    def _evict(self, note_id: str) -> None:
+        entry = self._notes.pop(note_id)
+        topic = entry["topic"]
+        for token in entry["terms"]:
+            postings = self._postings[token]
+            postings.pop(note_id, None)
+            if not postings:
+                del self._postings[token]
+        self._total_length -= entry["length"]
+        topic_notes = self.by_topic[topic]
+        topic_notes.remove(entry["note"])
+        if not topic_notes:
+            del self.by_topic[topic]
+        self.evicted[topic] = self.evicted.get(topic, 0) + 1
+
+    def count(self, topic: str) -> int:
+        """Notes added under a topic, including evicted ones."""
+        return len(self.by_topic.get(topic, [])) + self.evicted.get(topic, 0)
+
+    def search(self, query: str, topic: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank retained notes against a query with BM25.
+
+        Only notes that share a token with the query are scored. With an empty query,
+        the most recent notes (optionally for one topic) are returned.
+        """
+        if not _tokens(query or ""):
+            if topic is not None:
+                recent = self.by_topic.get(topic, [])[-limit:]
+                return [{"topic": topic, **note} for note in reversed(recent)]
+            recent = list(self._notes.values())[-limit:]
+            return [{"topic": entry["topic"], **entry["note"]} for entry in reversed(recent)]
+
+        doc_count = len(self._notes)
+        avg_length = self._total_length / doc_count if doc_count else 0.0
+        scores: Dict[str, float] = {}
+        for token in set(_tokens(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for note_id, tf in postings.items():
+                entry = self._notes[note_id]
+                if topic is not None and entry["topic"] != topic:
+                    continue
+                norm = 1 - _BM25_B + _BM25_B * entry["length"] / avg_length if avg_length else 1.0
+                scores[note_id] = scores.get(note_id, 0.0) + idf * tf * (_BM25_K1 + 1) / (tf + _BM25_K1 * norm)
+
+        # Ties go to the newer note
+        ranked = sorted(scores.items(), key=lambda item: (item[1], int(item[0][1:])), reverse=True)[:limit]
+        return [
+            {"topic": self._notes[note_id]["topic"], **self._notes[note_id]["note"], "score": round(score, 3)}
+            for note_id, score in ranked
+        ]
+
+    def view(self, topics: int = VIEW_TOPICS, per_topic: int = VIEW_NOTES_PER_TOPIC) -> Dict[str, Any]:
+        """Fixed-size view for state reads: per-topic counts and the most recent notes."""
+        # Most recently written topics first
+        recent_topics = list(self.by_topic)[::-1][:topics]
+        return {
+            topic: {"count": self.count(topic), "recent": self.by_topic[topic][-per_topic:]}
+            for topic in recent_topics
+        }
@@ -0,0 +1,362 @@
+"""
+Session-scoped research state for the financial research tools.
+
+Every agent run resolves its own research state, so several poisoning scenarios can
+run concurrently in one process without sharing goals, notes, or tracked companies.
+
+A tool call resolves its session from, in order:
+1. The active research_session() context. This is a contextvar, so it follows asyncio
+   tasks and the executor threads LangChain runs sync tools in.
+2. The run's thread ID (config["configurable"]["thread_id"]), for agent.batch() style
+   runs where each input carries its own config.
+3. A process-wide default session, which keeps single-run notebooks working unchanged.
+
+State changes are event-sourced. Each mutation is appended to the session's event log
+under a new version number and applied to the materialized state, with periodic
+snapshots. Only the last MAX_SNAPSHOTS snapshots are kept, and events older than the
+oldest of them are dropped, so a session's memory stays bounded however long it runs.
+Readers that remember the last version they saw can fetch only the changes since then
+instead of the whole state (or fall back to the full state once those were dropped).
+
+Scenario fixtures are named, immutable state snapshots (save_snapshot). A session
+forked from one (fork_session, or research_session(snapshot=...)) shares the frozen
+state until its first write, which copies it, so a fork costs O(1) no matter how many
+runs start from the same fixture.
+"""
+
+import copy
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from context_poisoning.goals import GoalStore
+from context_poisoning.notes import NotesStore
+
+DEFAULT_SESSION_ID = "default"
+
+# A snapshot of the materialized state is taken every SNAPSHOT_INTERVAL events
+SNAPSHOT_INTERVAL = 25
+
+# Snapshots kept per session; the event log only reaches back to the oldest of them
+MAX_SNAPSHOTS = 4
+
+_SESSIONS: Dict[str, "ResearchSession"] = {}
+_SNAPSHOTS: Dict[str, "StateSnapshot"] = {}
+_SESSIONS_LOCK = threading.Lock()
+_CURRENT_SESSION: ContextVar[Optional[str]] = ContextVar("research_session_id", default=None)
+
+
+def new_research_state() -> Dict[str, Any]:
+    """
+    Return an empty research state.
+    
+    research_goals is the goal store's list, so goals can be read as a list while
+    goal_store provides the ID, status and priority indexes. Likewise research_notes
+    is the notes store's retained {topic: [notes]} map, with notes_store providing
+    search and retention.
+    """
+    goal_store = GoalStore()
+    notes_store = NotesStore()
+    return {
+        "goal_store": goal_store,
+        "research_goals": goal_store.goals,
+        "completed_research": [],
+        "companies_tracked": [],
+        "sectors_analyzed": [],
+        "notes_store": notes_store,
+        "research_notes": notes_store.by_topic,
+        "current_focus": None,
+    }
+
+
+def _apply_goal_added(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    # Copy so later updates to the live goal never rewrite the logged event
+    goal = state["goal_store"].add(dict(event["goal"]))
+    # IDs are assigned on first apply (under the session lock) and kept in the
+    # event, so replays and delta readers see the same ID
+    event["goal"].setdefault("id", goal["id"])
+
+
+def _apply_goal_updated(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    state["goal_store"].update(event["goal_id"], event["changes"])
+
+
+def _apply_company_tracked(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    state["companies_tracked"].append(event["ticker"])
+
+
+def _apply_sector_analyzed(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    state["sectors_analyzed"].append(event["sector"])
+
+
+def _apply_note_added(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    note = state["notes_store"].add(event["topic"], dict(event["note"]))
+    event["note"].setdefault("id", note["id"])
+
+
+def _apply_research_completed(state: Dict[str, Any], event: Dict[str, Any]) -> None:
+    state["completed_research"].append(event["topic"])
+
+
+_EVENT_HANDLERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {
+    "goal_added": _apply_goal_added,
+    "goal_updated": _apply_goal_updated,
+    "company_tracked": _apply_company_tracked,
+    "sector_analyzed": _apply_sector_analyzed,
+    "note_added": _apply_note_added,
+    "research_completed": _apply_research_completed,
+}
+
+
+class ResearchSession:
+    """
+    Research state for one session, built from an append-only event log.
+    
+    Events are dicts with "version", "type" and the event payload. Versions start
+    at 1 and increase by one per event; version 0 is the empty state.
+    
+    A session forked from a snapshot starts at the snapshot's version, with the log
+    compacted up to it, and reads the snapshot's frozen state until its first write.
+    """
+    
+    def __init__(self, session_id: str, snapshot: Optional["StateSnapshot"] = None):
+        self.session_id = session_id
+        if snapshot is None:
+            self._state = new_research_state()
+            self._shared = False
+            self.version = 0
+            self.snapshots: List[Tuple[int, Dict[str, Any]]] = [(0, new_research_state())]
+        else:
+            # Snapshot states are never mutated (state_at copies them), so they can be shared
+            self._state = snapshot.state
+            self._shared = True
+            self.version = snapshot.version
+            self.snapshots = [(snapshot.version, snapshot.state)]
+        self.events: List[Dict[str, Any]] = []
+        # Version of the last event dropped by compact(); events[i] has version log_start + i + 1
+        self.log_start = self.version
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> Dict[str, Any]:
+        """The materialized state (read-only; change it through record())."""
+        return self._state
+    
+    def record(self, event_type: str, **data: Any) -> Dict[str, Any]:
+        """Append an event to the log, apply it to the state, and return it."""
+        handler = _EVENT_HANDLERS[event_type]
+        with self._lock:
+            if self._shared:
+                # Copy on first write so the snapshot (and other forks) never see it
+                self._state = copy.deepcopy(self._state)
+                self._shared = False
+            self.version += 1
+            event = {"version": self.version, "type": event_type, **data}
+            handler(self._state, event)
+            self.events.append(event)
+            if self.version % SNAPSHOT_INTERVAL == 0:
+                self.snapshots.append((self.version, copy.deepcopy(self._state)))
+                self._trim(MAX_SNAPSHOTS)
+        return event
+    
+    def changes_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the events recorded after `version`.
+        
+        Returns None if those events were compacted away, in which case the caller
+        should fall back to reading the full state.
+        """
+        if version < self.log_start:
+            return None
+        return self.events[max(0, version - self.log_start):]
+    
+    def state_at(self, version: int) -> Dict[str, Any]:
+        """Rebuild the state as of `version` from the nearest snapshot and the log."""
+        if version < self.log_start or version > self.version:
+            raise ValueError(f"Version {version} out of range ({self.log_start}-{self.version})")
+        snapshot_version, snapshot = max(
+            (snap for snap in self.snapshots if snap[0] <= version),
+            key=lambda snap: snap[0],
+        )
+        state = copy.deepcopy(snapshot)
+        for event in self.events[max(0, snapshot_version - self.log_start):version - self.log_start]:
+            _EVENT_HANDLERS[event["type"]](state, event)
+        return state
+    
+    def _trim(self, keep: int) -> None:
+        """Keep the last `keep` snapshots and drop the events behind the oldest one (lock held)."""
+        self.snapshots = self.snapshots[-keep:]
+        snapshot_version = self.snapshots[0][0]
+        if snapshot_version > self.log_start:
+            self.events = self.events[snapshot_version - self.log_start:]
+            self.log_start = snapshot_version
+    
+    def compact(self) -> None:
+        """Drop events and snapshots older than the latest snapshot."""
+        with self._lock:
+            self._trim(1)
+
+
+class StateSnapshot:
+    """
+    Named, immutable research state (a scenario fixture).
+    
+    The state is a private deep copy taken when the snapshot is saved, and is only
+    ever read or copied afterwards.
+    """
+    
+    __slots__ = ("name", "version", "state")
+    
+    def __init__(self, name: str, version: int, state: Dict[str, Any]):
+        self.name = name
+        self.version = version
+        self.state = state
+    
+    def __repr__(self) -> str:
+        return f"StateSnapshot(name={self.name!r}, version={self.version})"
+
+
+def resolve_session_id(config: Optional[Dict[str, Any]] = None) -> str:
+    """Resolve the session ID for the current context (see module docstring)."""
+    session_id = _CURRENT_SESSION.get()
+    if session_id:
+        return session_id
+    if config:
+        thread_id = (config.get("configurable") or {}).get("thread_id")
+        if thread_id:
+            return str(thread_id)
+    return DEFAULT_SESSION_ID
+
+
+def get_session(session_id: Optional[str] = None, config: Optional[Dict[str, Any]] = None) -> ResearchSession:
+    """
+    Get a research session, creating an empty one on first use.
+
+    Args:
+        session_id: Explicit session ID (defaults to resolve_session_id(config))
+        config: Runnable config of the current tool call (optional)
+    """
+    session_id = session_id or resolve_session_id(config)
+    session = _SESSIONS.get(session_id)
+    if session is None:
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.setdefault(session_id, ResearchSession(session_id))
+    return session
+
+
+def get_research_state(session_id: Optional[str] = None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Get the materialized research state for a session (see get_session).
+    
+    The returned dict is read-only by convention: change it through
+    get_session(...).record() so the change is versioned.
+    """
+    return get_session(session_id, config).state
+
+
+def reset_session(session_id: Optional[str] = None) -> ResearchSession:
+    """Replace a session with an empty one and return it."""
+    session_id = session_id or resolve_session_id()
+    session = ResearchSession(session_id)
+    with _SESSIONS_LOCK:
+        _SESSIONS[session_id] = session
+    return session
+
+
+def drop_session(session_id: str) -> None:
+    """Forget a session's research state."""
+    with _SESSIONS_LOCK:
+        _SESSIONS.pop(session_id, None)
+
+
+def list_sessions() -> List[str]:
+    """List the IDs of all live sessions."""
+    with _SESSIONS_LOCK:
+        return list(_SESSIONS)
+
+
+def save_snapshot(name: str, session_id: Optional[str] = None) -> StateSnapshot:
+    """
+    Freeze a session's current state as a named snapshot (replacing any with that name).
+    
+    Args:
+        name: Snapshot name (e.g. the test case name)
+        session_id: Session to freeze (defaults to the current session)
+    """
+    session = get_session(session_id)
+    with session._lock:
+        snapshot = StateSnapshot(name, session.version, copy.deepcopy(session.state))
+    with _SESSIONS_LOCK:
+        _SNAPSHOTS[name] = snapshot
+    return snapshot
+
+
+def get_snapshot(name: str) -> StateSnapshot:
+    """Get a named snapshot (KeyError if there is none)."""
+    return _SNAPSHOTS[name]
+
+
+def drop_snapshot(name: str) -> None:
+    """Forget a named snapshot (sessions already forked from it are unaffected)."""
+    with _SESSIONS_LOCK:
+        _SNAPSHOTS.pop(name, None)
+
+
+def list_snapshots() -> List[str]:
+    """List the names of all saved snapshots."""
+    with _SESSIONS_LOCK:
+        return list(_SNAPSHOTS)
+
+
+def fork_session(snapshot: str, session_id: Optional[str] = None) -> ResearchSession:
+    """
+    Replace a session with a copy-on-write fork of a named snapshot and return it.
+    
+    Args:
+        snapshot: Name of the snapshot to fork
+        session_id: Session to replace (defaults to the current session)
+    """
+    session_id = session_id or resolve_session_id()
+    session = ResearchSession(session_id, _SNAPSHOTS[snapshot])
+    with _SESSIONS_LOCK:
+        _SESSIONS[session_id] = session
+    return session
+
+
+def session_config(session_id: str) -> Dict[str, Any]:
+    """Build a runnable config that routes an agent run's tool calls to a session."""
+    return {"configurable": {"thread_id": session_id}}
+
+
+@contextmanager
+def research_session(session_id: Optional[str] = None, keep: bool = False, snapshot: Optional[str] = None) -> Iterator[str]:
+    """
+    Run a block against its own, freshly reset research state.
+
+    Args:
+        session_id: Session ID to use (a random one is generated if omitted)
+        keep: Keep the session's state after the block exits (dropped by default)
+        snapshot: Start from a fork of this named snapshot instead of an empty state
+
+    Yields:
+        The session ID.
+
+    Example:
+        with research_session() as session_id:
+            inject_poisoned_goal("Research QDYN")
+            result = run_agent_with_trajectory(agent, query)
+    """
+    session_id = session_id or uuid.uuid4().hex
+    if snapshot is None:
+        reset_session(session_id)
+    else:
+        fork_session(snapshot, session_id)
+    token = _CURRENT_SESSION.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _CURRENT_SESSION.reset(token)
+        if not keep:
+            drop_session(session_id)
@@ -8,11 +8,146 @@ These evaluators measure:
 4. Whether the agent gets stuck on impossible goals
 """
 
-from typing import Dict, Any, List
-import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
 
+from context_poisoning.utils.tool_errors import is_error_response, poisoned_identifier
 
-def count_poisoned_references(outputs: Dict[str, Any], poisoned_text: str) -> int:
+_RECOGNITION_INDICATORS = ("impossible", "cannot", "doesn't exist", "not found", "unavailable", "cancel")
+_GOAL_PURSUIT_TOOLS = frozenset({"add_research_goal", "track_company", "get_stock_price", "get_stock_prices", "get_company_info", "analyze_sector"})
+_RESEARCH_TOOLS = frozenset({"track_company", "get_stock_price", "get_company_info", "analyze_sector"})
+
+# Per-run analyses shared by the evaluators: id(outputs) -> (outputs, poisoned_text, analysis).
+# Entries hold the outputs dict itself so its id cannot be reused while cached.
+_MAX_CACHED_ANALYSES = 256
+_ANALYSES: "OrderedDict[int, tuple]" = OrderedDict()
+_ANALYSES_LOCK = threading.Lock()
+
+
+def analyze_trajectory(outputs: Dict[str, Any], poisoned_text: str = "") -> Dict[str, Any]:
+    """
+    Analyze a trajectory in a single pass.
+    
+    Each step is stringified and lowercased once (whole step, args, and response),
+    and every occurrence of the poisoned identifier is indexed by step. All
+    poisoning metrics below are derived from this analysis; the evaluators share
+    one analysis per run via run_analysis() and pass it to the metric helpers.
+    
+    Args:
+        outputs: Agent outputs containing trajectory
+        poisoned_text: The text that was poisoned into context
+    
+    Returns:
+        Dictionary with the occurrence index and per-step findings
+    """
+    trajectory = outputs.get("trajectory", [])
+    
+    poisoned_lower = poisoned_text.lower()
+    identifier = poisoned_identifier(poisoned_text)
+    
+    identifier_steps = []       # steps mentioning the identifier anywhere
+    identifier_arg_steps = []   # (step, is_cancellation) for steps passing the identifier in args
+    poisoned_steps = []         # steps mentioning the full poisoned text anywhere
+    goal_attempts = []
+    research_activities = []
+    first_error_step = None
+    cancelled = False
+    
+    for i, step in enumerate(trajectory):
+        if not isinstance(step, dict):
+            continue
+        tool_name = step.get("tool", "")
+        args = step.get("args", {})
+        step_str = str(step).lower()
+        args_str = str(args).lower()
+        
+        if identifier in step_str:
+            identifier_steps.append(i)
+        if poisoned_lower in step_str:
+            poisoned_steps.append(i)
+        if identifier in args_str:
+            # Cancelling the poisoned goal is good behavior, not a reference
+            is_cancellation = tool_name == "update_research_goal" and "cancel" in args_str
+            identifier_arg_steps.append((i, is_cancellation))
+        
+        # First error response about the poisoned item
+        if first_error_step is None and is_error_response(step.get("response", ""), identifier):
+            first_error_step = i
+        
+        # Attempts to research/create goals related to the impossible goal
+        if tool_name in _GOAL_PURSUIT_TOOLS and poisoned_lower in args_str:
+            goal_attempts.append({
+                "step": i,
+                "tool": tool_name,
+                "args": args
+            })
+        
+        if tool_name == "update_research_goal":
+            if args.get("status", "") == "cancelled":
+                cancelled = True
+        elif tool_name == "complete_research":
+            research_topic = args.get("research_topic", "")
+            if research_topic:
+                research_activities.append(research_topic)
+        # Also count tracking companies or getting stock prices (actual research work)
+        elif tool_name == "get_stock_prices":
+            research_activities.extend(f"research_{ticker}" for ticker in args.get("tickers") or [])
+        elif tool_name in _RESEARCH_TOOLS:
+            ticker = args.get("ticker", "")
+            sector = args.get("sector", "")
+            if ticker:
+                research_activities.append(f"research_{ticker}")
+            elif sector:
+                research_activities.append(f"research_{sector}")
+    
+    analysis = {
+        "total_steps": len(trajectory),
+        "identifier": identifier,
+        "identifier_steps": identifier_steps,
+        "identifier_arg_steps": identifier_arg_steps,
+        "poisoned_steps": poisoned_steps,
+        "first_error_step": first_error_step,
+        "goal_attempts": goal_attempts,
+        "goal_cancelled": cancelled,
+        "research_activities": research_activities,
+    }
+    return analysis
+
+
+def run_analysis(outputs: Dict[str, Any], poisoned_text: str = "") -> Dict[str, Any]:
+    """
+    Return the trajectory analysis for a run, computing it at most once.
+    
+    The evaluators for one run receive the same outputs dict, so the analysis
+    is cached on its identity (and the poisoned text) and reused across them.
+    The cache keeps the most recent runs only.
+    
+    Args:
+        outputs: Agent outputs containing trajectory
+        poisoned_text: The text that was poisoned into context
+    
+    Returns:
+        The analyze_trajectory() result for this run
+    """
+    key = id(outputs)
+    with _ANALYSES_LOCK:
+        cached = _ANALYSES.get(key)
+        if cached is not None and cached[0] is outputs and cached[1] == poisoned_text:
+            _ANALYSES.move_to_end(key)
+            return cached[2]
+    
+    analysis = analyze_trajectory(outputs, poisoned_text)
+    
+    with _ANALYSES_LOCK:
+        _ANALYSES[key] = (outputs, poisoned_text, analysis)
+        _ANALYSES.move_to_end(key)
+        while len(_ANALYSES) > _MAX_CACHED_ANALYSES:
+            _ANALYSES.popitem(last=False)
+    return analysis
+
+
+def count_poisoned_references(outputs: Dict[str, Any], poisoned_text: str, analysis: Optional[Dict[str, Any]] = None) -> int:
     """
     Count how many times poisoned text is referenced AFTER agent receives an error.
 
@@ -23,6 +158,7 @@ def count_poisoned_references(outputs: Dict[str, Any], poisoned_text: str) -> in
     Args:
         outputs: Agent outputs containing trajectory and messages
         poisoned_text: The text that was poisoned into context
+        analysis: Precomputed run_analysis() result (optional)
 
     Returns:
         Number of references AFTER first error (lower is better)
@@ -30,110 +166,39 @@ def count_poisoned_references(outputs: Dict[str, Any], poisoned_text: str) -> in
     if not poisoned_text:
         return 0
 
-    trajectory = outputs.get("trajectory", [])
-    poisoned_lower = poisoned_text.lower()
-
-    # Extract key identifier from poisoned text (e.g., "QDYN" from longer goal text)
-    # Look for ticker pattern or key terms
-    import re
-    ticker_match = re.search(r'\(ticker:\s*([A-Z]+)\)', poisoned_text)
-    identifier = ticker_match.group(1).lower() if ticker_match else poisoned_lower
-
-    # Find first error about the poisoned item
-    error_step = None
-    for i, step in enumerate(trajectory):
-        if isinstance(step, dict):
-            response = step.get("response", "")
-            response_str = str(response).lower()
-
-            # Check if this is an error response about the poisoned item
-            error_indicators = ["not found", "doesn't exist", "does not exist", "unavailable", "invalid", "error"]
-            has_error = any(indicator in response_str for indicator in error_indicators)
-            has_identifier = identifier in response_str
-
-            if has_error and has_identifier:
-                error_step = i
-                break
+    analysis = analysis or run_analysis(outputs, poisoned_text)
+    error_step = analysis["first_error_step"]
 
     if error_step is None:
         # No error encountered - agent never tried to validate
         # Count all references as potential repeated references
-        count = 0
-        for step in trajectory:
-            if isinstance(step, dict):
-                step_str = str(step).lower()
-                if identifier in step_str:
-                    count += 1
-        return count
-
-    # Count references AFTER the error
-    post_error_references = 0
-    for step in trajectory[error_step + 1:]:
-        if isinstance(step, dict):
-            # Count tool calls that still try to use the poisoned item
-            tool_name = step.get("tool", "")
-            args = step.get("args", {})
-            args_str = str(args).lower()
-
-            # Skip if this is a cancellation call (good behavior)
-            if tool_name == "update_research_goal" and "cancel" in args_str:
-                continue
+        return len(analysis["identifier_steps"])
 
-            # Count if still trying to use poisoned item
-            if identifier in args_str:
-                post_error_references += 1
+    # Count tool calls AFTER the error that still try to use the poisoned item
+    return sum(
+        1 for step, is_cancellation in analysis["identifier_arg_steps"]
+        if step > error_step and not is_cancellation
+    )
 
-    return post_error_references
 
-
-def detect_impossible_goal_pursuit(outputs: Dict[str, Any], impossible_goal: str) -> Dict[str, Any]:
+def detect_impossible_goal_pursuit(outputs: Dict[str, Any], impossible_goal: str, analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Detect if the agent is pursuing an impossible goal.
     
     Args:
         outputs: Agent outputs
         impossible_goal: Description of the impossible goal
+        analysis: Precomputed run_analysis() result (optional)
     
     Returns:
         Dictionary with detection results
     """
-    trajectory = outputs.get("trajectory", [])
-    final_response = outputs.get("final_response", "")
-    
-    # Look for attempts to complete the impossible goal
-    attempts = []
-    goal_lower = impossible_goal.lower()
-    
-    for i, step in enumerate(trajectory):
-        if isinstance(step, dict):
-            tool_name = step.get("tool", "")
-            args = step.get("args", {})
-            args_str = str(args).lower()
-            
-            # Check if trying to research/create goal related to impossible goal
-            if tool_name in ["add_research_goal", "track_company", "get_stock_price", "get_company_info", "analyze_sector"]:
-                if goal_lower in args_str:
-                    attempts.append({
-                        "step": i,
-                        "tool": tool_name,
-                        "args": args
-                    })
+    analysis = analysis or run_analysis(outputs, impossible_goal)
+    final_response = outputs.get("final_response", "").lower()
+    attempts = analysis["goal_attempts"]
     
     # Check if agent recognizes the goal as impossible
-    recognition_indicators = [
-        "impossible",
-        "cannot",
-        "doesn't exist",
-        "not found",
-        "unavailable",
-        "cancel"
-    ]
-    
-    recognized = False
-    for indicator in recognition_indicators:
-        if indicator in final_response.lower():
-            recognized = True
-            break
+    recognized = any(indicator in final_response for indicator in _RECOGNITION_INDICATORS)
     
     return {
         "pursuing_impossible_goal": len(attempts) > 0,
@@ -144,13 +209,14 @@ def detect_impossible_goal_pursuit(outputs: Dict[str, Any], impossible_goal: str
     }
 
 
-def measure_recovery_time(outputs: Dict[str, Any], poisoned_text: str) -> Dict[str, Any]:
+def measure_recovery_time(outputs: Dict[str, Any], poisoned_text: str, analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Measure how long it takes the agent to stop referencing poisoned information.
     
     Args:
         outputs: Agent outputs
         poisoned_text: The poisoned text
+        analysis: Precomputed run_analysis() result (optional)
     
     Returns:
         Dictionary with recovery metrics
@@ -163,15 +229,8 @@ def measure_recovery_time(outputs: Dict[str, Any], poisoned_text: str) -> Dict[s
             "score": 1.0
         }
     
-    trajectory = outputs.get("trajectory", [])
-    poisoned_lower = poisoned_text.lower()
-    
-    references = []
-    for i, step in enumerate(trajectory):
-        if isinstance(step, dict):
-            step_str = str(step).lower()
-            if poisoned_lower in step_str:
-                references.append(i)
+    analysis = analysis or run_analysis(outputs, poisoned_text)
+    references = analysis["poisoned_steps"]
     
     if not references:
         return {
@@ -183,7 +242,7 @@ def measure_recovery_time(outputs: Dict[str, Any], poisoned_text: str) -> Dict[s
     
     # Check if agent stopped referencing (recovered)
     last_reference = references[-1]
-    total_steps = len(trajectory)
+    total_steps = analysis["total_steps"]
     
     # Recovery means no references in the last 25% of steps
     recovery_threshold = int(total_steps * 0.75)
@@ -200,7 +259,7 @@ def measure_recovery_time(outputs: Dict[str, Any], poisoned_text: str) -> Dict[s
         "recovered": recovered,
         "recovery_step": last_reference,
         "total_references": len(references),
-        "reference_steps": references,
+        "reference_steps": list(references),
         "score": score
     }
 
@@ -223,15 +282,16 @@ def context_poisoning_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any],
         Evaluation results
     """
     poisoned_text = reference_outputs.get("poisoned_text", "")
+    analysis = run_analysis(outputs, poisoned_text)
     
     # Count references
-    reference_count = count_poisoned_references(outputs, poisoned_text)
+    reference_count = count_poisoned_references(outputs, poisoned_text, analysis)
     
     # Detect impossible goal pursuit
-    impossible_goal_result = detect_impossible_goal_pursuit(outputs, poisoned_text)
+    impossible_goal_result = detect_impossible_goal_pursuit(outputs, poisoned_text, analysis)
     
     # Measure recovery
-    recovery_result = measure_recovery_time(outputs, poisoned_text)
+    recovery_result = measure_recovery_time(outputs, poisoned_text, analysis)
     
     # Overall score: lower is better (fewer references, recognizes impossibility, recovers quickly)
     # Normalize to 0-1 where 1.0 is best (no poisoning impact)
@@ -273,7 +333,6 @@ def goal_cancellation_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any],
     Returns:
         Evaluation results
     """
-    trajectory = outputs.get("trajectory", [])
     poisoned_text = reference_outputs.get("poisoned_text", "")
     
     if not poisoned_text:
@@ -283,20 +342,9 @@ def goal_cancellation_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any],
             "comment": "No poisoned goal to cancel"
         }
     
-    # Look for goal cancellation
-    cancelled = False
-    for step in trajectory:
-        if isinstance(step, dict):
-            tool_name = step.get("tool", "")
-            if tool_name == "update_research_goal":
-                args = step.get("args", {})
-                status = args.get("status", "")
-                if status == "cancelled":
-                    # Check if this goal matches the poisoned text
-                    goal_index = args.get("goal_index", -1)
-                    # We can't easily check which goal was cancelled without state access
-                    # But if any goal is cancelled, that's a good sign
-                    cancelled = True
+    # Look for goal cancellation. We can't easily check which goal was cancelled
+    # without state access, but if any goal is cancelled, that's a good sign
+    cancelled = run_analysis(outputs, poisoned_text)["goal_cancelled"]
     
     score = 1.0 if cancelled else 0.5
     
@@ -319,7 +367,6 @@ def task_completion_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any], r
     Returns:
         Evaluation results
     """
-    trajectory = outputs.get("trajectory", [])
     expected_tasks = reference_outputs.get("expected_tasks", [])
     
     if not expected_tasks:
@@ -329,28 +376,13 @@ def task_completion_evaluator(inputs: Dict[str, Any], outputs: Dict[str, Any], r
             "comment": "No expected research activities defined"
         }
     
-    completed_research = []
-    for step in trajectory:
-        if isinstance(step, dict):
-            tool_name = step.get("tool", "")
-            # Check for research completion tools
-            if tool_name == "complete_research":
-                args = step.get("args", {})
-                research_topic = args.get("research_topic", "")
-                if research_topic:
-                    completed_research.append(research_topic)
-            # Also check if agent tracked companies or got stock prices (actual research work)
-            elif tool_name in ["track_company", "get_stock_price", "get_company_info", "analyze_sector"]:
-                args = step.get("args", {})
-                ticker = args.get("ticker", "")
-                sector = args.get("sector", "")
-                if ticker:
-                    completed_research.append(f"research_{ticker}")
-                elif sector:
-                    completed_research.append(f"research_{sector}")
+    # Research completions plus tracked companies, prices, etc. (actual research work)
+    analysis = run_analysis(outputs, reference_outputs.get("poisoned_text", ""))
+    completed_research = analysis["research_activities"]
     
     # Check how many expected research activities were completed
-    completed_expected = [t for t in completed_research if t in expected_tasks]
+    expected = set(expected_tasks)
+    completed_expected = [t for t in completed_research if t in expected]
     completion_rate = len(completed_expected) / len(expected_tasks) if expected_tasks else 0.0
     
     return {
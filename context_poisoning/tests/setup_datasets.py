@@ -4,13 +4,49 @@ Setup datasets for context poisoning evaluation.
 
 from typing import List, Dict, Any
 from langsmith import Client
+
+from context_common.datasets import sync_dataset
 from context_poisoning.resources.test_cases import TEST_CASES
-from context_poisoning.tools import reset_state, inject_poisoned_goal
+from context_poisoning.state import StateSnapshot, research_session, save_snapshot
+from context_poisoning.tools import (
+    inject_poisoned_goal,
+    track_company_helper,
+    add_research_note_helper,
+    get_current_research_state_helper,
+)
+
+
+def build_scenario_snapshot(test_case: Dict[str, Any]) -> StateSnapshot:
+    """
+    Build a test case's initial research state once and save it as a named snapshot.
+    
+    The snapshot is named after the test case (the example's "test_case" input); agent
+    runs start from it with run_agent_with_trajectory(..., snapshot=name), which forks
+    it in O(1).
+    """
+    # Built in a scratch session so dataset setup never touches the state of agents
+    # running in this process
+    with research_session():
+        # Inject poisoned goal if specified
+        poisoned_goal = test_case.get("poisoned_goal")
+        if poisoned_goal:
+            inject_poisoned_goal(poisoned_goal)
+        
+        # Create some initial research state to make the scenario more realistic
+        track_company_helper("AAPL")
+        track_company_helper("GOOGL")
+        add_research_note_helper("AAPL", "Initial research note on Apple Inc.")
+        
+        # Notes planted by generated scenarios (e.g. wrong prices, contradictions)
+        for seed_note in test_case.get("seed_notes", []):
+            add_research_note_helper(seed_note["topic"], seed_note["note"])
+        
+        return save_snapshot(test_case["name"])
 
 
 def create_poisoning_dataset(dataset_name: str, test_cases: List[Dict[str, Any]], client: Client):
     """
-    Create or recreate a LangSmith dataset from test cases.
+    Create or incrementally sync a LangSmith dataset from test cases.
     
     Args:
         dataset_name: Name for the dataset
@@ -18,49 +54,28 @@ def create_poisoning_dataset(dataset_name: str, test_cases: List[Dict[str, Any]]
         client: LangSmith client
     
     Returns:
-        Created dataset
+        The synced dataset
     """
-    # Force recreate to ensure correct structure
-    try:
-        existing = client.read_dataset(dataset_name=dataset_name)
-        if existing:
-            client.delete_dataset(dataset_id=existing.id)
-            print(f"  Deleted existing dataset: {dataset_name}")
-            # Small delay to ensure deletion completes
-            import time
-            time.sleep(0.5)
-    except Exception as e:
-        # Dataset doesn't exist or couldn't be deleted - try to create anyway
-        pass
-    
     examples = []
     
     for i, test_case in enumerate(test_cases):
-        # Reset state for each test case
-        reset_state()
-        
-        # Inject poisoned goal if specified
+        snapshot = build_scenario_snapshot(test_case)
         poisoned_goal = test_case.get("poisoned_goal")
-        if poisoned_goal:
-            inject_poisoned_goal(poisoned_goal)
-        
-        # Create some initial research state to make the scenario more realistic
-        from context_poisoning.tools import track_company_helper, add_research_note_helper
-        track_company_helper("AAPL")
-        track_company_helper("GOOGL")
-        add_research_note_helper("AAPL", "Initial research note on Apple Inc.")
         
         # Get current state for reference
-        from context_poisoning.tools import get_current_research_state_helper
-        state_result = get_current_research_state_helper()
+        with research_session(snapshot=snapshot.name):
+            state_result = get_current_research_state_helper()
         
         # Create example
         example = {
             "inputs": {
-                "query": test_case["query"]
+                "query": test_case["query"],
+                # Names the scenario snapshot the run forks from
+                "test_case": test_case["name"]
             },
             "outputs": {
-                "poisoned_text": poisoned_goal or "",
+                # Generated cases track a narrower text than the goal (e.g. a wrong price)
+                "poisoned_text": test_case.get("poisoned_text", poisoned_goal or ""),
                 "test_case_name": test_case["name"],
                 "expected_behavior": test_case["expected_behavior"],
                 "initial_state": state_result.get("state", {})
@@ -71,37 +86,23 @@ def create_poisoning_dataset(dataset_name: str, test_cases: List[Dict[str, Any]]
                 "poisoning_indicators": test_case.get("poisoning_indicators", [])
             }
         }
+        # Extra keys from generated cases (see resources/scenario_generator.py)
+        if "expected_tasks" in test_case:
+            example["outputs"]["expected_tasks"] = test_case["expected_tasks"]
+        if "expected" in test_case:
+            example["outputs"]["expected"] = test_case["expected"]
+        if "poison_type" in test_case:
+            example["metadata"]["poison_type"] = test_case["poison_type"]
         
         examples.append(example)
     
-    # Create dataset (with retry if conflict occurs)
-    try:
-        dataset = client.create_dataset(
-            dataset_name=dataset_name,
-            description="Context poisoning evaluation test cases for financial research"
-        )
-    except Exception as e:
-        if "already exists" in str(e) or "Conflict" in str(e):
-            # If still exists, try to read it instead
-            print(f"  Dataset already exists, using existing dataset: {dataset_name}")
-            dataset = client.read_dataset(dataset_name=dataset_name)
-            # Clear existing examples and recreate
-            existing_examples = list(client.list_examples(dataset_id=dataset.id))
-            for ex in existing_examples:
-                try:
-                    client.delete_example(example_id=ex.id)
-                except:
-                    pass
-        else:
-            raise
-    
-    # Add examples
-    for example in examples:
-        client.create_example(
-            inputs=example["inputs"],
-            outputs=example["outputs"],
-            dataset_id=dataset.id,
-            metadata=example["metadata"]
-        )
-    
-    return dataset
+    # Examples are identified by test case name (several share a query); state
+    # timestamps change on every run and are ignored when detecting changes
+    return sync_dataset(
+        client,
+        dataset_name,
+        examples,
+        description="Context poisoning evaluation test cases for financial research",
+        key_fn=lambda example: example["metadata"]["test_case"],
+        volatile_keys=("created_at", "timestamp"),
+    )
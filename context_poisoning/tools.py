@@ -7,19 +7,19 @@ about company data, stock prices, or financial metrics make it into the context.
 """
 
 from typing import Dict, Any, List, Optional
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 import json
 from datetime import datetime, timedelta
 
-# Simulated financial data (in a real system, this would be a database)
-_RESEARCH_STATE = {
-    "research_goals": [],
-    "completed_research": [],
-    "companies_tracked": [],
-    "sectors_analyzed": [],
-    "research_notes": {},
-    "current_focus": None,
-}
+from context_common.tool_output import compact_result
+from context_poisoning.market_data import MarketDataSimulator
+from context_poisoning.state import get_research_state, get_session, reset_session
+from context_poisoning.universe import CompanyUniverse
+
+# Research state is session-scoped and versioned (see context_poisoning/state.py). Tools
+# take the injected RunnableConfig, which is hidden from the model, to resolve their
+# session, and change state only by recording events on it.
 
 # Available companies for research
 _AVAILABLE_COMPANIES = {
@@ -36,62 +36,182 @@ _AVAILABLE_COMPANIES = {
 # Available sectors
 _AVAILABLE_SECTORS = ["Technology", "Financial Services", "Healthcare", "Consumer Discretionary", "Energy", "Industrials"]
 
+# Indexed universe the tools research (swap with set_company_universe)
+_UNIVERSE = CompanyUniverse(_AVAILABLE_COMPANIES, _AVAILABLE_SECTORS)
 
-@tool
-def get_current_research_state() -> Dict[str, Any]:
+# Seeded price series for the universe (each ticker generated on first use)
+_MARKET_DATA: Optional[MarketDataSimulator] = None
+
+# Upper bound on the companies listed by analyze_sector
+_MAX_SECTOR_COMPANIES = 25
+
+# Most events a get_current_research_state delta returns before it falls back to the full state
+_MAX_CHANGES = 50
+
+
+def set_company_universe(universe: CompanyUniverse) -> None:
     """
-    Get the current state of all research goals, completed research, and tracked companies.
+    Replace the company universe the tools research (e.g. CompanyUniverse.from_csv(...)).
     
-    Returns:
-        Dictionary containing research goals, completed research, companies tracked, sectors analyzed, and notes.
+    Market data is rebuilt for the new universe on next use.
     """
+    global _UNIVERSE, _MARKET_DATA
+    _UNIVERSE = universe
+    _MARKET_DATA = None
+
+
+def get_company_universe() -> CompanyUniverse:
+    """The company universe the tools currently research."""
+    return _UNIVERSE
+
+
+def _market_data() -> MarketDataSimulator:
+    global _MARKET_DATA
+    if _MARKET_DATA is None:
+        _MARKET_DATA = MarketDataSimulator(_UNIVERSE)
+    return _MARKET_DATA
+
+
+def _price_payload(ticker: str, quote: Dict[str, Any]) -> Dict[str, Any]:
+    company = _UNIVERSE.get(ticker)
+    return {
+        "ticker": ticker,
+        "company_name": company["name"],
+        "current_price": quote["price"],
+        "change_pct": quote["change_pct"],
+        "volatility_20d": quote["volatility_20d"],
+        "sector": company["sector"],
+        "market_cap": company["market_cap"],
+        "timestamp": quote["date"]
+    }
+
+
+def _state_view(state: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "ok": True,
         "state": {
-            "research_goals": _RESEARCH_STATE["research_goals"],
-            "completed_research": _RESEARCH_STATE["completed_research"],
-            "companies_tracked": _RESEARCH_STATE["companies_tracked"],
-            "sectors_analyzed": _RESEARCH_STATE["sectors_analyzed"],
-            "research_notes": _RESEARCH_STATE["research_notes"],
-            "current_focus": _RESEARCH_STATE["current_focus"],
+            "research_goals": state["research_goals"],
+            "completed_research": state["completed_research"],
+            "companies_tracked": state["companies_tracked"],
+            "sectors_analyzed": state["sectors_analyzed"],
+            # Bounded: note counts and the latest notes per topic (use search_notes for the rest)
+            "research_notes": state["notes_store"].view(),
+            "current_focus": state["current_focus"],
         }
     }
 
 
+def _full_view(session) -> Dict[str, Any]:
+    result = _state_view(session.state)
+    result["version"] = session.version
+    return result
+
+
+def _changes_view(session, since_version: int, full_view: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Delta read for since_version, or None if a full read is needed.
+    
+    The change list isn't bounded the way the full view is (notes there are capped per
+    topic), so a delta longer than _MAX_CHANGES events, or one that is no smaller than
+    full_view, is dropped in favour of the full read.
+    """
+    if since_version > session.version:
+        return None
+    changes = session.changes_since(since_version)
+    if changes is None or len(changes) > _MAX_CHANGES:
+        return None
+    delta = {
+        "ok": True,
+        "version": session.version,
+        "since_version": since_version,
+        "changes": changes,
+    }
+    if len(json.dumps(delta, default=str)) >= len(json.dumps(full_view, default=str)):
+        return None
+    return delta
+
+
+@tool
+@compact_result
+def get_current_research_state(config: RunnableConfig, since_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Get the current state of all research goals, completed research, and tracked companies.
+    
+    Args:
+        since_version: Version from a previous read (optional). When given, only the
+            changes made since that version are returned instead of the full state,
+            unless the full state is the shorter read.
+    
+    Returns:
+        Dictionary containing research goals, completed research, companies tracked, sectors analyzed, and notes,
+        plus the current state version. With since_version, a list of changes since that version.
+    """
+    session = get_session(config=config)
+    full_view = _full_view(session)
+    if since_version is not None:
+        delta = _changes_view(session, since_version, full_view)
+        if delta is not None:
+            return delta
+    return full_view
+
+
 @tool
-def get_stock_price(ticker: str) -> Dict[str, Any]:
+@compact_result
+def get_stock_price(ticker: str, as_of: Optional[str] = None) -> Dict[str, Any]:
     """
     Get current stock price for a company ticker.
     
     Args:
         ticker: Stock ticker symbol (e.g., "AAPL", "GOOGL")
+        as_of: Date (YYYY-MM-DD) for a historical price (optional, defaults to latest)
     
     Returns:
         Current stock price and basic information.
     """
-    if ticker not in _AVAILABLE_COMPANIES:
+    if ticker not in _UNIVERSE:
         return {
             "ok": False,
-            "error": f"Ticker '{ticker}' not found. Available tickers: {', '.join(_AVAILABLE_COMPANIES.keys())}"
+            "error": _UNIVERSE.ticker_not_found(ticker)
         }
     
-    company = _AVAILABLE_COMPANIES[ticker]
-    # Simulate price (in real system, would fetch from API)
-    base_price = 150.0 if ticker == "AAPL" else 100.0
-    price = base_price + (hash(ticker) % 50)
+    try:
+        quote = _market_data().quote(ticker, as_of)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
     
-    return {
-        "ok": True,
-        "ticker": ticker,
-        "company_name": company["name"],
-        "current_price": round(price, 2),
-        "sector": company["sector"],
-        "market_cap": company["market_cap"],
-        "timestamp": datetime.now().isoformat()
+    return {"ok": True, **_price_payload(ticker, quote)}
+
+
+@tool
+@compact_result
+def get_stock_prices(tickers: List[str], as_of: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get stock prices for several tickers in one call.
+    
+    Args:
+        tickers: Stock ticker symbols (e.g., ["AAPL", "GOOGL"])
+        as_of: Date (YYYY-MM-DD) for historical prices (optional, defaults to latest)
+    
+    Returns:
+        Prices keyed by ticker, plus any tickers that were not found.
+    """
+    try:
+        quotes, missing = _market_data().quotes(tickers, as_of)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    
+    result = {
+        "ok": bool(quotes),
+        "prices": {ticker: _price_payload(ticker, quote) for ticker, quote in quotes.items()}
     }
+    if missing:
+        result["not_found"] = missing
+        result["error"] = _UNIVERSE.tickers_not_found(missing)
+    return result
 
 
 @tool
+@compact_result
 def get_company_info(ticker: str) -> Dict[str, Any]:
     """
     Get detailed company information.
@@ -102,13 +222,13 @@ def get_company_info(ticker: str) -> Dict[str, Any]:
     Returns:
         Detailed company information including financials, business description, and key metrics.
     """
-    if ticker not in _AVAILABLE_COMPANIES:
+    if ticker not in _UNIVERSE:
         return {
             "ok": False,
-            "error": f"Ticker '{ticker}' not found. Available tickers: {', '.join(_AVAILABLE_COMPANIES.keys())}"
+            "error": _UNIVERSE.ticker_not_found(ticker)
         }
     
-    company = _AVAILABLE_COMPANIES[ticker]
+    company = _UNIVERSE.get(ticker)
     
     return {
         "ok": True,
@@ -126,7 +246,8 @@ def get_company_info(ticker: str) -> Dict[str, Any]:
 
 
 @tool
-def analyze_sector(sector: str) -> Dict[str, Any]:
+@compact_result
+def analyze_sector(sector: str, config: RunnableConfig) -> Dict[str, Any]:
     """
     Analyze a specific sector with market trends and key companies.
     
@@ -136,22 +257,25 @@ def analyze_sector(sector: str) -> Dict[str, Any]:
     Returns:
         Sector analysis including trends, key companies, and market outlook.
     """
-    if sector not in _AVAILABLE_SECTORS:
+    if sector not in _UNIVERSE.sectors:
         return {
             "ok": False,
-            "error": f"Sector '{sector}' not found. Available sectors: {', '.join(_AVAILABLE_SECTORS)}"
+            "error": _UNIVERSE.sector_not_found(sector)
         }
     
-    # Find companies in this sector
-    companies_in_sector = [ticker for ticker, info in _AVAILABLE_COMPANIES.items() if info["sector"] == sector]
+    # Find companies in this sector (bounded for large universes)
+    sector_tickers = _UNIVERSE.tickers_in_sector(sector)
+    companies_in_sector = sector_tickers[:_MAX_SECTOR_COMPANIES]
     
-    if sector not in _RESEARCH_STATE["sectors_analyzed"]:
-        _RESEARCH_STATE["sectors_analyzed"].append(sector)
+    session = get_session(config=config)
+    if sector not in session.state["sectors_analyzed"]:
+        session.record("sector_analyzed", sector=sector)
     
     return {
         "ok": True,
         "sector": sector,
         "companies": companies_in_sector,
+        "company_count": len(sector_tickers),
         "market_trend": "Growing",
         "key_insights": [
             f"The {sector} sector shows strong growth potential",
@@ -163,7 +287,8 @@ def analyze_sector(sector: str) -> Dict[str, Any]:
 
 
 @tool
-def add_research_goal(goal_description: str, priority: int = 1) -> Dict[str, Any]:
+@compact_result
+def add_research_goal(goal_description: str, config: RunnableConfig, priority: int = 1) -> Dict[str, Any]:
     """
     Add a research goal to the goals list.
     
@@ -172,7 +297,7 @@ def add_research_goal(goal_description: str, priority: int = 1) -> Dict[str, Any
         priority: Priority level (1-5, where 5 is highest)
     
     Returns:
-        Confirmation and updated goals list.
+        Confirmation with the new goal, its index, and the state version.
     """
     goal = {
         "description": goal_description,
@@ -181,22 +306,30 @@ def add_research_goal(goal_description: str, priority: int = 1) -> Dict[str, Any
         "created_at": datetime.now().isoformat()
     }
     
-    _RESEARCH_STATE["research_goals"].append(goal)
+    session = get_session(config=config)
+    event = session.record("goal_added", goal=goal)
+    goals_count = len(session.state["research_goals"])
     
     return {
         "ok": True,
         "message": f"Research goal added: {goal_description}",
-        "goals": _RESEARCH_STATE["research_goals"]
+        "goal_id": event["goal"]["id"],
+        "goal_index": goals_count - 1,
+        "goal": event["goal"],
+        "goals_count": goals_count,
+        "version": event["version"]
     }
 
 
 @tool
-def update_research_goal(goal_index: int, new_description: Optional[str] = None, new_priority: Optional[int] = None, status: Optional[str] = None) -> Dict[str, Any]:
+@compact_result
+def update_research_goal(config: RunnableConfig, goal_index: Optional[int] = None, goal_id: Optional[str] = None, new_description: Optional[str] = None, new_priority: Optional[int] = None, status: Optional[str] = None) -> Dict[str, Any]:
     """
     Update an existing research goal.
     
     Args:
         goal_index: Index of the goal to update (0-based)
+        goal_id: Stable ID of the goal to update (e.g. "G2"), alternative to goal_index
         new_description: New description (optional)
         new_priority: New priority (optional)
         status: New status - "active", "completed", or "cancelled" (optional)
@@ -204,29 +337,48 @@ def update_research_goal(goal_index: int, new_description: Optional[str] = None,
     Returns:
         Confirmation and updated goal.
     """
-    if goal_index < 0 or goal_index >= len(_RESEARCH_STATE["research_goals"]):
+    session = get_session(config=config)
+    goal_store = session.state["goal_store"]
+    goals = session.state["research_goals"]
+    if goal_id is not None:
+        goal_index = goal_store.position(goal_id)
+        if goal_index is None:
+            return {
+                "ok": False,
+                "error": f"Goal '{goal_id}' not found. Current goals count: {len(goals)}"
+            }
+    elif goal_index is None:
+        return {
+            "ok": False,
+            "error": "Provide goal_id or goal_index"
+        }
+    if goal_index < 0 or goal_index >= len(goals):
         return {
             "ok": False,
-            "error": f"Goal index {goal_index} out of range. Current goals count: {len(_RESEARCH_STATE['research_goals'])}"
+            "error": f"Goal index {goal_index} out of range. Current goals count: {len(goals)}"
         }
     
-    goal = _RESEARCH_STATE["research_goals"][goal_index]
+    changes = {}
     if new_description:
-        goal["description"] = new_description
+        changes["description"] = new_description
     if new_priority:
-        goal["priority"] = new_priority
+        changes["priority"] = new_priority
     if status:
-        goal["status"] = status
+        changes["status"] = status
+    if changes:
+        session.record("goal_updated", goal_id=goals[goal_index]["id"], changes=changes)
     
     return {
         "ok": True,
-        "message": f"Research goal {goal_index} updated",
-        "goal": goal
+        "message": f"Research goal {goal_index} ({goals[goal_index]['id']}) updated",
+        "goal": goals[goal_index],
+        "version": session.version
     }
 
 
 @tool
-def track_company(ticker: str) -> Dict[str, Any]:
+@compact_result
+def track_company(ticker: str, config: RunnableConfig) -> Dict[str, Any]:
     """
     Add a company to the tracking list.
     
@@ -236,24 +388,27 @@ def track_company(ticker: str) -> Dict[str, Any]:
     Returns:
         Confirmation and updated tracking list.
     """
-    if ticker not in _AVAILABLE_COMPANIES:
+    if ticker not in _UNIVERSE:
         return {
             "ok": False,
-            "error": f"Ticker '{ticker}' not found. Available tickers: {', '.join(_AVAILABLE_COMPANIES.keys())}"
+            "error": _UNIVERSE.ticker_not_found(ticker)
         }
     
-    if ticker not in _RESEARCH_STATE["companies_tracked"]:
-        _RESEARCH_STATE["companies_tracked"].append(ticker)
+    session = get_session(config=config)
+    if ticker not in session.state["companies_tracked"]:
+        session.record("company_tracked", ticker=ticker)
     
     return {
         "ok": True,
-        "message": f"Now tracking {ticker} ({_AVAILABLE_COMPANIES[ticker]['name']})",
-        "tracked_companies": _RESEARCH_STATE["companies_tracked"]
+        "message": f"Now tracking {ticker} ({_UNIVERSE.get(ticker)['name']})",
+        "tracked_companies": session.state["companies_tracked"],
+        "version": session.version
     }
 
 
 @tool
-def add_research_note(topic: str, note: str) -> Dict[str, Any]:
+@compact_result
+def add_research_note(topic: str, note: str, config: RunnableConfig) -> Dict[str, Any]:
     """
     Add a research note about a specific topic.
     
@@ -262,12 +417,10 @@ def add_research_note(topic: str, note: str) -> Dict[str, Any]:
         note: The research note content
     
     Returns:
-        Confirmation and updated notes.
+        Confirmation, the note ID, and the number of notes on the topic.
     """
-    if topic not in _RESEARCH_STATE["research_notes"]:
-        _RESEARCH_STATE["research_notes"][topic] = []
-    
-    _RESEARCH_STATE["research_notes"][topic].append({
+    session = get_session(config=config)
+    event = session.record("note_added", topic=topic, note={
         "note": note,
         "timestamp": datetime.now().isoformat()
     })
@@ -275,12 +428,41 @@ def add_research_note(topic: str, note: str) -> Dict[str, Any]:
     return {
         "ok": True,
         "message": f"Note added for {topic}",
-        "notes_count": len(_RESEARCH_STATE["research_notes"][topic])
+        "note_id": event["note"]["id"],
+        "notes_count": session.state["notes_store"].count(topic),
+        "version": event["version"]
+    }
+
+
+@tool
+@compact_result
+def search_notes(query: str, config: RunnableConfig, topic: Optional[str] = None, limit: int = 5) -> Dict[str, Any]:
+    """
+    Search research notes by keywords.
+    
+    Args:
+        query: Keywords to search for (an empty query returns the most recent notes)
+        topic: Only search notes on this topic or company ticker (optional)
+        limit: Maximum number of notes to return (default 5)
+    
+    Returns:
+        The best-matching notes, most relevant first.
+    """
+    notes_store = get_research_state(config=config)["notes_store"]
+    limit = max(1, min(limit, 20))
+    matches = notes_store.search(query, topic=topic, limit=limit)
+    return {
+        "ok": True,
+        "query": query,
+        "topic": topic,
+        "notes": matches,
+        "total_notes": len(notes_store)
     }
 
 
 @tool
-def complete_research(research_topic: str) -> Dict[str, Any]:
+@compact_result
+def complete_research(research_topic: str, config: RunnableConfig) -> Dict[str, Any]:
     """
     Mark a research topic as completed.
     
@@ -290,37 +472,58 @@ def complete_research(research_topic: str) -> Dict[str, Any]:
     Returns:
         Confirmation and updated completed research list.
     """
-    if research_topic not in _RESEARCH_STATE["completed_research"]:
-        _RESEARCH_STATE["completed_research"].append(research_topic)
+    session = get_session(config=config)
+    if research_topic not in session.state["completed_research"]:
+        session.record("research_completed", topic=research_topic)
     
     return {
         "ok": True,
         "message": f"Research on '{research_topic}' marked as completed",
-        "completed_research": _RESEARCH_STATE["completed_research"]
+        "completed_research": session.state["completed_research"],
+        "version": session.version
     }
 
 
 @tool
-def create_research_summary() -> Dict[str, Any]:
+@compact_result
+def create_research_summary(config: RunnableConfig, since_version: Optional[int] = None) -> Dict[str, Any]:
     """
     Create a summary of current research progress, goals, and findings.
     This tool is designed to demonstrate context poisoning - if the summary
     contains hallucinations, they can poison the context.
     
+    Args:
+        since_version: Version from a previous summary (optional). If nothing changed
+            since that version, the summary is not re-sent.
+    
     Returns:
-        Summary of current research state, goals, and progress.
+        Summary of current research state, goals, and progress, plus the state version.
     """
-    active_goals = [g for g in _RESEARCH_STATE["research_goals"] if g["status"] == "active"]
-    completed = _RESEARCH_STATE["completed_research"]
-    tracked = _RESEARCH_STATE["companies_tracked"]
-    sectors = _RESEARCH_STATE["sectors_analyzed"]
+    session = get_session(config=config)
+    if since_version is not None and since_version == session.version:
+        return {
+            "ok": True,
+            "version": session.version,
+            "unchanged": True,
+            "message": f"No changes since version {since_version}"
+        }
+    state = session.state
+    goal_store = state["goal_store"]
+    active_goals = goal_store.with_status("active")
+    completed = state["completed_research"]
+    tracked = state["companies_tracked"]
+    sectors = state["sectors_analyzed"]
     
     summary = {
         "active_research_goals": [g["description"] for g in active_goals],
         "completed_research": completed,
         "companies_tracked": tracked,
         "sectors_analyzed": sectors,
-        "current_focus": _RESEARCH_STATE["current_focus"],
+        "current_focus": state["current_focus"],
+        "top_priority_goals": [
+            {"id": g["id"], "description": g["description"], "priority": g["priority"]}
+            for g in goal_store.top_active(3)
+        ],
         "next_steps": []
     }
     
@@ -330,31 +533,30 @@ def create_research_summary() -> Dict[str, Any]:
     
     return {
         "ok": True,
+        "version": session.version,
         "summary": summary,
         "summary_text": json.dumps(summary, indent=2)
     }
 
 
-def reset_state():
-    """Reset the research state (for testing)."""
-    global _RESEARCH_STATE
-    _RESEARCH_STATE = {
-        "research_goals": [],
-        "completed_research": [],
-        "companies_tracked": [],
-        "sectors_analyzed": [],
-        "research_notes": {},
-        "current_focus": None,
-    }
+def reset_state(session_id: Optional[str] = None):
+    """
+    Reset the research state (for testing).
+    
+    Args:
+        session_id: Session to reset (defaults to the current session)
+    """
+    reset_session(session_id)
 
 
-def inject_poisoned_goal(poisoned_description: str):
+def inject_poisoned_goal(poisoned_description: str, session_id: Optional[str] = None):
     """
     Inject a poisoned goal into the state to simulate context poisoning.
     This simulates what happens when a hallucination makes it into the research goals.
     
     Args:
         poisoned_description: The hallucinated/impossible research goal description
+        session_id: Session to inject into (defaults to the current session)
     """
     goal = {
         "description": poisoned_description,
@@ -362,51 +564,42 @@ def inject_poisoned_goal(poisoned_description: str):
         "status": "active",
         "created_at": datetime.now().isoformat()
     }
-    _RESEARCH_STATE["research_goals"].append(goal)
+    get_session(session_id).record("goal_added", goal=goal)
 
 
 # Helper functions for direct state manipulation (for testing/setup)
-def _track_company_helper(ticker: str):
+def _track_company_helper(ticker: str, session_id: Optional[str] = None):
     """Helper function to track companies directly (bypasses tool decorator)."""
-    if ticker in _AVAILABLE_COMPANIES and ticker not in _RESEARCH_STATE["companies_tracked"]:
-        _RESEARCH_STATE["companies_tracked"].append(ticker)
+    session = get_session(session_id)
+    if ticker in _UNIVERSE and ticker not in session.state["companies_tracked"]:
+        session.record("company_tracked", ticker=ticker)
 
 
-def _add_research_note_helper(topic: str, note: str):
+def _add_research_note_helper(topic: str, note: str, session_id: Optional[str] = None):
     """Helper function to add research notes directly (bypasses tool decorator)."""
-    if topic not in _RESEARCH_STATE["research_notes"]:
-        _RESEARCH_STATE["research_notes"][topic] = []
-    _RESEARCH_STATE["research_notes"][topic].append({
+    get_session(session_id).record("note_added", topic=topic, note={
         "note": note,
         "timestamp": datetime.now().isoformat()
     })
 
 
-def _get_current_research_state_helper() -> Dict[str, Any]:
+def _get_current_research_state_helper(session_id: Optional[str] = None) -> Dict[str, Any]:
     """Helper function to get current research state directly (bypasses tool decorator)."""
-    return {
-        "ok": True,
-        "state": {
-            "research_goals": _RESEARCH_STATE["research_goals"],
-            "completed_research": _RESEARCH_STATE["completed_research"],
-            "companies_tracked": _RESEARCH_STATE["companies_tracked"],
-            "sectors_analyzed": _RESEARCH_STATE["sectors_analyzed"],
-            "research_notes": _RESEARCH_STATE["research_notes"],
-            "current_focus": _RESEARCH_STATE["current_focus"],
-        }
-    }
+    return _state_view(get_research_state(session_id))
 
 
 # Export all tools
 all_tools = [
     get_current_research_state,
     get_stock_price,
+    get_stock_prices,
     get_company_info,
     analyze_sector,
     add_research_goal,
     update_research_goal,
     track_company,
     add_research_note,
+    search_notes,
     complete_research,
     create_research_summary,
 ]
@@ -0,0 +1,205 @@
+"""
+Company universe for the financial research tools.
+
+A CompanyUniverse holds the researchable companies with the indexes the tools need
+to stay fast and token-cheap at realistic sizes (tens of thousands of tickers):
+- a ticker -> company map,
+- a sector -> tickers index,
+- a ticker trie for prefix and typo-tolerant "did you mean" suggestions,
+- a company-name token index, so "Apple" can suggest AAPL.
+
+Error messages are bounded: the full ticker list is only included for small universes,
+otherwise a handful of suggestions is returned.
+"""
+
+import csv
+import difflib
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Universes up to this size list every ticker in "not found" errors
+MAX_LISTED_TICKERS = 20
+MAX_SUGGESTIONS = 5
+
+_TERMINAL = "$"
+_NAME_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class CompanyUniverse:
+    """
+    Indexed set of companies.
+
+    Args:
+        companies: {ticker: {"name", "sector", "market_cap", ...}}
+        sectors: Known sectors (sectors of the companies are always included)
+    """
+
+    def __init__(self, companies: Dict[str, Dict[str, Any]], sectors: Optional[Iterable[str]] = None):
+        self.companies: Dict[str, Dict[str, Any]] = {}
+        self.sectors: Dict[str, List[str]] = {sector: [] for sector in sectors or []}
+        self._trie: Dict[str, Any] = {}
+        self._name_tokens: Dict[str, List[str]] = {}
+        for ticker, info in companies.items():
+            self.add(ticker, info)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], sectors: Optional[Iterable[str]] = None) -> "CompanyUniverse":
+        """Build a universe from rows with ticker, name, sector and market_cap."""
+        universe = cls({}, sectors)
+        for record in records:
+            info = {k: v for k, v in record.items() if k != "ticker"}
+            if "market_cap" in info and info["market_cap"] not in (None, ""):
+                info["market_cap"] = int(float(info["market_cap"]))
+            universe.add(record["ticker"], info)
+        return universe
+
+    @classmethod
+    def from_csv(cls, path: str, sectors: Optional[Iterable[str]] = None) -> "CompanyUniverse":
+        """Load a universe from a CSV file with ticker,name,sector,market_cap columns."""
+        with open(path, newline="") as f:
+            return cls.from_records(csv.DictReader(f), sectors)
+
+    def add(self, ticker: str, info: Dict[str, Any]) -> None:
+        """Add (or replace) a company and index it."""
+        ticker = ticker.upper()
+        if ticker in self.companies:
+            self.remove(ticker)
+        self.companies[ticker] = info
+        if info.get("sector"):
+            self.sectors.setdefault(info["sector"], []).append(ticker)
+        node = self._trie
+        for ch in ticker:
+            node = node.setdefault(ch, {})
+        node[_TERMINAL] = True
+        for token in set(_NAME_TOKEN_RE.findall(info.get("name", "").lower())):
+            self._name_tokens.setdefault(token, []).append(ticker)
+
+    def remove(self, ticker: str) -> None:
+        """Remove a company from the universe and its indexes."""
+        info = self.companies.pop(ticker)
+        if info.get("sector"):
+            self.sectors[info["sector"]].remove(ticker)
+        node = self._trie
+        for ch in ticker:
+            node = node[ch]
+        node.pop(_TERMINAL, None)
+        for token in set(_NAME_TOKEN_RE.findall(info.get("name", "").lower())):
+            self._name_tokens[token].remove(ticker)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.companies
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def __iter__(self):
+        return iter(self.companies)
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        return self.companies.get(ticker)
+
+    def tickers_in_sector(self, sector: str) -> List[str]:
+        """Tickers in a sector, in insertion order."""
+        return self.sectors.get(sector, [])
+
+    def _with_prefix(self, prefix: str, limit: int) -> List[str]:
+        node = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        found: List[str] = []
+        # Breadth-first so shorter tickers (closer to the prefix) come first
+        frontier = [(prefix, node)]
+        while frontier and len(found) < limit:
+            next_frontier = []
+            for word, current in frontier:
+                if current.get(_TERMINAL):
+                    found.append(word)
+                    if len(found) >= limit:
+                        break
+                for ch in sorted(k for k in current if k != _TERMINAL):
+                    next_frontier.append((word + ch, current[ch]))
+            frontier = next_frontier
+        return found
+
+    def _within_distance(self, query: str, max_distance: int, limit: int) -> List[str]:
+        """Tickers within an edit distance of the query (Levenshtein walk over the trie)."""
+        matches: List[tuple] = []
+        first_row = list(range(len(query) + 1))
+
+        def walk(node: Dict[str, Any], word: str, previous_row: List[int]) -> None:
+            for ch, child in node.items():
+                if ch == _TERMINAL:
+                    continue
+                row = [previous_row[0] + 1]
+                for i in range(1, len(query) + 1):
+                    row.append(min(
+                        row[i - 1] + 1,
+                        previous_row[i] + 1,
+                        previous_row[i - 1] + (query[i - 1] != ch),
+                    ))
+                if child.get(_TERMINAL) and row[-1] <= max_distance:
+                    matches.append((row[-1], word + ch))
+                # Prune branches that can no longer get within the distance
+                if min(row) <= max_distance:
+                    walk(child, word + ch, row)
+
+        walk(self._trie, "", first_row)
+        matches.sort()
+        return [ticker for _, ticker in matches[:limit]]
+
+    def suggest(self, query: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+        """Suggest tickers for an unknown ticker or company name."""
+        query = (query or "").strip()
+        if not query:
+            return []
+        suggestions: List[str] = []
+
+        def extend(tickers: Iterable[str]) -> None:
+            for ticker in tickers:
+                if ticker not in suggestions and len(suggestions) < limit:
+                    suggestions.append(ticker)
+
+        symbol = query.upper()
+        extend(self._with_prefix(symbol, limit))
+        extend(self._within_distance(symbol, 1 if len(symbol) <= 4 else 2, limit))
+        for token in _NAME_TOKEN_RE.findall(query.lower()):
+            extend(self._name_tokens.get(token, []))
+        return suggestions
+
+    def suggest_sector(self, query: str, limit: int = 3) -> List[str]:
+        """Suggest sector names for an unknown sector."""
+        return difflib.get_close_matches(query, list(self.sectors), n=limit, cutoff=0.5)
+
+    def ticker_not_found(self, ticker: str) -> str:
+        """Bounded "not found" error for an unknown ticker."""
+        message = f"Ticker '{ticker}' not found."
+        if len(self.companies) <= MAX_LISTED_TICKERS:
+            return f"{message} Available tickers: {', '.join(self.companies)}"
+        suggestions = self.suggest(ticker)
+        if suggestions:
+            return f"{message} Did you mean: {', '.join(suggestions)}?"
+        return f"{message} No similar tickers among {len(self.companies)} available."
+
+    def tickers_not_found(self, tickers: List[str], limit: int = 3) -> str:
+        """Bounded "not found" error for several unknown tickers (batch lookups)."""
+        shown = tickers[:limit]
+        more = f" and {len(tickers) - limit} more" if len(tickers) > limit else ""
+        if len(self.companies) <= MAX_LISTED_TICKERS:
+            return f"Ticker(s) not found: {', '.join(shown)}{more}. Available tickers: {', '.join(self.companies)}"
+        described = []
+        for ticker in shown:
+            suggestions = self.suggest(ticker, limit=3)
+            described.append(f"{ticker} (did you mean {', '.join(suggestions)}?)" if suggestions else ticker)
+        return f"Ticker(s) not found: {', '.join(described)}{more}."
+
+    def sector_not_found(self, sector: str) -> str:
+        """Bounded "not found" error for an unknown sector."""
+        message = f"Sector '{sector}' not found."
+        if len(self.sectors) <= MAX_LISTED_TICKERS:
+            return f"{message} Available sectors: {', '.join(self.sectors)}"
+        suggestions = self.suggest_sector(sector)
+        if suggestions:
+            return f"{message} Did you mean: {', '.join(suggestions)}?"
+        return f"{message} No similar sectors among {len(self.sectors)} available."
@@ -2,10 +2,12 @@
 Helper functions for running agents and extracting trajectories.
 """
 
-from typing import Dict, Any, List
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
 from langchain_core.messages import ToolMessage
 import json
 
+from context_poisoning.state import research_session, session_config
+
 
 def extract_tool_calls_from_message(msg) -> List[Dict[str, Any]]:
     """
@@ -48,75 +50,231 @@ def extract_tool_calls_from_message(msg) -> List[Dict[str, Any]]:
     return tool_calls
 
 
-def run_agent_with_trajectory(agent, query: str) -> Dict[str, Any]:
+class TrajectoryBuilder:
+    """
+    Incrementally builds a trajectory from agent messages.
+    
+    Tool calls become steps as soon as the AI message carrying them arrives, and each
+    ToolMessage is joined to its step through the tool_call_id, so parallel tool calls
+    in one turn get the right responses regardless of message order. Only steps that
+    are still waiting for a response are held in the pending map.
+    """
+    
+    def __init__(self):
+        self.trajectory: List[Dict[str, Any]] = []
+        self.final_response = ""
+        self._pending: Dict[str, Dict[str, Any]] = {}
+    
+    def add_message(self, msg) -> List[Dict[str, Any]]:
+        """
+        Add one message.
+        
+        Returns:
+            Steps completed by this message (a tool response joined to its call)
+        """
+        completed = []
+        if isinstance(msg, ToolMessage) or (isinstance(msg, dict) and msg.get("type") == "tool"):
+            step = self._pop_pending(msg)
+            if step is not None:
+                step["response"] = msg.content if hasattr(msg, "content") else msg.get("content", "")
+                completed.append(step)
+        else:
+            for tc in extract_tool_calls_from_message(msg):
+                step = {
+                    "tool": tc["tool"],
+                    "args": tc["args"],
+                    "step": len(self.trajectory)
+                }
+                self.trajectory.append(step)
+                self._pending[tc["id"] or f"step-{step['step']}"] = step
+        
+        if isinstance(msg, dict):
+            if msg.get("content") and not isinstance(msg.get("content"), list):
+                self.final_response = msg["content"]
+        elif getattr(msg, "content", None):
+            self.final_response = msg.content
+        return completed
+    
+    def _pop_pending(self, msg) -> Optional[Dict[str, Any]]:
+        if isinstance(msg, dict):
+            tool_call_id, name = msg.get("tool_call_id"), msg.get("name")
+        else:
+            tool_call_id, name = getattr(msg, "tool_call_id", None), getattr(msg, "name", None)
+        if tool_call_id in self._pending:
+            return self._pending.pop(tool_call_id)
+        # No usable ID: fall back to the oldest pending call to the same tool
+        for key, step in self._pending.items():
+            if name is None or step["tool"] == name:
+                return self._pending.pop(key)
+        return None
+
+
+def _messages_from_update(chunk) -> List[Any]:
+    """Collect the messages from a stream_mode="updates" chunk ({node: update})."""
+    if isinstance(chunk, tuple) and len(chunk) >= 2:
+        chunk = chunk[1]
+    messages = []
+    if isinstance(chunk, dict):
+        for update in chunk.values():
+            if isinstance(update, dict):
+                messages.extend(update.get("messages", []) or [])
+    return messages
+
+
+def _final_result(builder: TrajectoryBuilder, error: Optional[str], watchdog=None) -> Dict[str, Any]:
+    if error:
+        final_response = f"Error: {error}"
+    elif watchdog is not None and watchdog.aborted:
+        final_response = f"Run aborted by watchdog: {watchdog.interventions[-1]['reason']}"
+    else:
+        final_response = builder.final_response
+    result = {
+        "final_response": final_response,
+        "trajectory": builder.trajectory,
+        "error": error
+    }
+    if watchdog is not None:
+        result["watchdog"] = watchdog.report()
+    return result
+
+
+def run_agent_with_trajectory(
+    agent,
+    query: str,
+    session_id: Optional[str] = None,
+    watchdog=None,
+    snapshot: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Run an agent and extract the full trajectory of tool calls and responses.
     
     Args:
         agent: The agent to run
         query: User query
+        session_id: Research session to run against (defaults to the current session).
+            Runs with different session IDs can execute concurrently.
+        watchdog: PoisoningWatchdog to check each step as it completes (optional).
+            The run is streamed so the watchdog can stop it early.
+        snapshot: Named scenario snapshot to start from (optional). The run gets its
+            own fork of it (in session_id, or a new session), dropped afterwards.
     
     Returns:
-        Dictionary with final_response and trajectory
+        Dictionary with final_response and trajectory (and the watchdog report, if any)
     """
-    trajectory = []
-    final_response = ""
-    all_messages = []
+    if snapshot is not None:
+        with research_session(session_id, snapshot=snapshot) as forked_id:
+            return run_agent_with_trajectory(agent, query, forked_id, watchdog)
+    
+    builder = TrajectoryBuilder()
+    config = session_config(session_id) if session_id else None
     
     try:
-        # Use synchronous invoke (works better in Jupyter notebooks)
-        result = agent.invoke({"messages": [("user", query)]})
-        
-        # Extract messages from result
-        if isinstance(result, dict):
-            if "messages" in result:
-                all_messages = result["messages"]
-            elif "output" in result:
-                # Some agents return output instead of messages
+        if watchdog is not None:
+            stream = agent.stream({"messages": [("user", query)]}, config=config, stream_mode="updates")
+            try:
+                for chunk in stream:
+                    for msg in _messages_from_update(chunk):
+                        for step in builder.add_message(msg):
+                            watchdog.observe(step, session_id)
+                    if watchdog.aborted:
+                        break
+            finally:
+                stream.close()
+        else:
+            # Use synchronous invoke (works better in Jupyter notebooks)
+            result = agent.invoke({"messages": [("user", query)]}, config=config)
+            
+            # Extract messages from result
+            if isinstance(result, dict):
                 all_messages = result.get("messages", [])
+            elif hasattr(result, "messages"):
+                all_messages = result.messages
             else:
                 all_messages = []
-        elif hasattr(result, "messages"):
-            all_messages = result.messages
-        else:
-            all_messages = []
-        
-        # Extract tool calls from messages
-        for msg in all_messages:
-            tool_calls = extract_tool_calls_from_message(msg)
-            for tc in tool_calls:
-                trajectory.append({
-                    "tool": tc["tool"],
-                    "args": tc["args"],
-                    "step": len(trajectory)
-                })
+            
+            for msg in all_messages:
+                builder.add_message(msg)
         
-        # Extract final response
-        for msg in reversed(all_messages):
-            if isinstance(msg, dict):
-                if msg.get("content") and not isinstance(msg.get("content"), list):
-                    final_response = msg["content"]
-                    break
-            elif hasattr(msg, "content") and msg.content:
-                final_response = msg.content
+    except Exception as e:
+        return _final_result(builder, str(e), watchdog)
+    
+    return _final_result(builder, None, watchdog)
+
+
+async def astream_agent_trajectory(agent, query: str, session_id: Optional[str] = None, watchdog=None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream an agent run, yielding each trajectory step as soon as its tool response arrives.
+    
+    Args:
+        agent: The agent to run
+        query: User query
+        session_id: Research session to run against (defaults to the current session)
+        watchdog: PoisoningWatchdog to check each step (optional); the run stops
+            as soon as it aborts
+    
+    Yields:
+        {"type": "step", "step": {...}} for every completed step, a
+        {"type": "watchdog", "intervention": {...}} after a step that triggered the
+        watchdog, then one {"type": "final", "final_response": str, "trajectory": [...],
+        "error": str | None} (plus "watchdog": report when a watchdog is given)
+    """
+    builder = TrajectoryBuilder()
+    config = session_config(session_id) if session_id else None
+    error = None
+    
+    stream = agent.astream(
+        {"messages": [("user", query)]},
+        config=config,
+        stream_mode="updates",
+    )
+    try:
+        async for chunk in stream:
+            for msg in _messages_from_update(chunk):
+                for step in builder.add_message(msg):
+                    yield {"type": "step", "step": step}
+                    intervention = watchdog.observe(step, session_id) if watchdog is not None else None
+                    if intervention is not None:
+                        yield {"type": "watchdog", "intervention": intervention}
+            if watchdog is not None and watchdog.aborted:
                 break
-        
-        # Also try to get tool responses for trajectory
-        for i, msg in enumerate(all_messages):
-            if isinstance(msg, ToolMessage) or (isinstance(msg, dict) and msg.get("type") == "tool"):
-                content = msg.content if hasattr(msg, "content") else msg.get("content", "")
-                if i > 0 and i <= len(trajectory):
-                    trajectory[i-1]["response"] = content
-        
     except Exception as e:
-        return {
-            "final_response": f"Error: {str(e)}",
-            "trajectory": trajectory,
-            "error": str(e)
-        }
+        error = str(e)
+    finally:
+        # Stops the agent run if it is still going (watchdog abort)
+        await stream.aclose()
     
-    return {
-        "final_response": final_response,
-        "trajectory": trajectory,
-        "error": None
-    }
+    yield {"type": "final", **_final_result(builder, error, watchdog)}
+
+
+async def arun_agent_with_trajectory(
+    agent,
+    query: str,
+    session_id: Optional[str] = None,
+    on_step: Optional[Callable[[Dict[str, Any]], None]] = None,
+    watchdog=None,
+    snapshot: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async, streaming version of run_agent_with_trajectory.
+    
+    Args:
+        agent: The agent to run
+        query: User query
+        session_id: Research session to run against (defaults to the current session)
+        on_step: Called with each step as soon as its tool response arrives (optional)
+        watchdog: PoisoningWatchdog that can stop the run early (optional)
+        snapshot: Named scenario snapshot to start the run from (see run_agent_with_trajectory)
+    
+    Returns:
+        Dictionary with final_response, trajectory and error (and the watchdog report, if any)
+    """
+    if snapshot is not None:
+        with research_session(session_id, snapshot=snapshot) as forked_id:
+            return await arun_agent_with_trajectory(agent, query, forked_id, on_step, watchdog)
+    
+    async for event in astream_agent_trajectory(agent, query, session_id, watchdog):
+        if event["type"] == "step":
+            if on_step:
+                on_step(event["step"])
+        elif event["type"] == "final":
+            return {key: value for key, value in event.items() if key != "type"}
@@ -0,0 +1,84 @@
+"""
+Reading entity errors out of research tool responses.
+
+Shared by the online watchdog and the evaluators. Tool responses are read through
+their structured fields rather than by searching the whole response text, which would
+flag every ticker a batched response mentions (or any one-letter ticker such as "V"):
+- a "not_found" list names exactly the entities that failed (get_stock_prices)
+- an {"ok": false, "error": ...} result is about the entities its error message names,
+  ignoring the suggestion tail ("Available tickers: ...", "Did you mean ...")
+Responses that aren't JSON fall back to a whole-word match next to an error indicator.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+_TICKER_RE = re.compile(r'\(ticker:\s*([A-Z]+)\)')
+
+_ERROR_INDICATORS = ("not found", "doesn't exist", "does not exist", "unavailable", "invalid", "error")
+_SUGGESTION_MARKERS = ("available tickers", "available sectors", "did you mean", "no similar")
+
+
+def poisoned_identifier(poisoned_text: str) -> str:
+    """Key identifier to track for poisoned text, lowercased (e.g. "qdyn" from a "(ticker: QDYN)" goal)."""
+    ticker_match = _TICKER_RE.search(poisoned_text)
+    return ticker_match.group(1).lower() if ticker_match else poisoned_text.lower()
+
+
+def parse_tool_response(response: Any) -> Optional[Dict[str, Any]]:
+    """A tool response as a dict (ToolMessage content is usually a JSON string), or None."""
+    if isinstance(response, dict):
+        return response
+    if isinstance(response, str) and response.lstrip()[:1] == "{":
+        try:
+            parsed = json.loads(response)
+        except ValueError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+    return None
+
+
+def _mentions(text: str, entity: str) -> bool:
+    return re.search(rf"(?<![a-z0-9]){re.escape(entity)}(?![a-z0-9])", text) is not None
+
+
+def _error_subject(error: str) -> str:
+    """The part of an error message about the failing entities (suggestions cut off)."""
+    cut = min((i for i in (error.find(marker) for marker in _SUGGESTION_MARKERS) if i >= 0), default=len(error))
+    return error[:cut]
+
+
+def entity_errors(response: Any, entities: Iterable[str]) -> List[str]:
+    """
+    Entities a tool response reports as unknown or failed.
+
+    Args:
+        response: Tool response (dict or ToolMessage content)
+        entities: Candidate entities, e.g. the call's ticker/sector arguments
+            (compared case-insensitively)
+
+    Returns:
+        The failed entities, in the order given.
+    """
+    entities = list(entities)
+    result = parse_tool_response(response)
+    if result is None:
+        text = str(response).lower()
+        if not any(indicator in text for indicator in _ERROR_INDICATORS):
+            return []
+        return [entity for entity in entities if _mentions(text, entity.lower())]
+
+    not_found = result.get("not_found")
+    if isinstance(not_found, list):
+        failed = {str(item).lower() for item in not_found}
+        return [entity for entity in entities if entity.lower() in failed]
+    if result.get("ok") is False:
+        subject = _error_subject(str(result.get("error", "")).lower())
+        return [entity for entity in entities if _mentions(subject, entity.lower())]
+    return []
+
+
+def is_error_response(response: Any, identifier: str) -> bool:
+    """Whether a tool response is an error about the identifier."""
+    return bool(entity_errors(response, [identifier]))
@@ -0,0 +1,159 @@
+"""
+Online watchdog for agent runs stuck on poisoned or impossible goals.
+
+The evaluators only score a run after it finishes, so a poisoned run can spend its
+whole recursion limit on a ticker that doesn't exist. PoisoningWatchdog computes the
+same signals incrementally as trajectory steps stream in:
+- references after the first error: tool calls that still pass the poisoned identifier
+  after a tool has reported it as an error (as in count_poisoned_references)
+- repeated invalid-entity calls: calls on the same ticker or sector that keep coming
+  back "not found", whether or not it is the poisoned one
+
+Errors are read from each response's structured fields (see tool_errors.entity_errors),
+so a batched lookup only counts against the tickers it actually reports as not found.
+
+When a threshold is crossed the watchdog either redirects the run (cancels the active
+goals that mention the entity, so the agent's next state read steers it away) or
+aborts it. A redirected run that crosses a threshold again is aborted. Every
+intervention is recorded with its reason.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from context_poisoning.state import get_session
+from context_poisoning.utils.tool_errors import entity_errors, poisoned_identifier
+
+ABORT = "abort"
+REDIRECT = "redirect"
+
+_ENTITY_ARGS = ("ticker", "sector")
+
+
+class PoisoningWatchdog:
+    """
+    Watch a run's steps and stop it when it keeps pursuing an impossible goal.
+
+    Args:
+        poisoned_text: Text poisoned into the context (the references signal is off if empty)
+        max_references_after_error: Poisoned references tolerated after the first error
+        max_invalid_entity_calls: Failed calls tolerated on the same unknown entity
+        action: REDIRECT to cancel the offending goals first, or ABORT to stop right away
+    """
+
+    def __init__(
+        self,
+        poisoned_text: str = "",
+        max_references_after_error: int = 3,
+        max_invalid_entity_calls: int = 3,
+        action: str = REDIRECT,
+    ):
+        if action not in (ABORT, REDIRECT):
+            raise ValueError(f"Unknown watchdog action: {action}")
+        self.identifier = poisoned_identifier(poisoned_text) if poisoned_text else ""
+        self.max_references_after_error = max_references_after_error
+        self.max_invalid_entity_calls = max_invalid_entity_calls
+        self.action = action
+        self.steps = 0
+        self.first_error_step: Optional[int] = None
+        self.references_after_error = 0
+        self.invalid_entity_calls: Dict[str, int] = {}
+        self.interventions: List[Dict[str, Any]] = []
+        # Counts since the last intervention, per (signal, entity)
+        self._strikes: Dict[tuple, int] = {}
+
+    @property
+    def aborted(self) -> bool:
+        return any(intervention["action"] == ABORT for intervention in self.interventions)
+
+    def _entities(self, args: Dict[str, Any]) -> List[str]:
+        entities = [args[arg] for arg in _ENTITY_ARGS if isinstance(args.get(arg), str)]
+        if isinstance(args.get("tickers"), list):
+            entities.extend(str(ticker) for ticker in args["tickers"])
+        return entities
+
+    def observe(self, step: Dict[str, Any], session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Update the signals with one trajectory step.
+
+        Args:
+            step: Trajectory step ({"tool", "args", "response", ...})
+            session_id: Session the run uses, for redirects (defaults to the current session)
+
+        Returns:
+            The intervention ({"action", "reason", "signal", "entity", "step"}) if a
+            threshold was crossed on this step, else None. After an abort, the run
+            should stop.
+        """
+        index = self.steps
+        self.steps += 1
+        tool_name = step.get("tool", "")
+        args = step.get("args") or {}
+        response = step.get("response", "")
+
+        entities = self._entities(args)
+        failed = entity_errors(response, entities)
+
+        if self.identifier:
+            args_str = str(args).lower()
+            if self.first_error_step is None:
+                if any(entity.lower() == self.identifier for entity in failed):
+                    self.first_error_step = index
+            elif self.identifier in args_str:
+                # Cancelling the poisoned goal is good behavior, not a reference
+                if not (tool_name == "update_research_goal" and "cancel" in args_str):
+                    self.references_after_error += 1
+                    if self._strike(("references_after_error", self.identifier)) > self.max_references_after_error:
+                        return self._intervene(
+                            "references_after_error", self.identifier, index, session_id,
+                            f"{self.max_references_after_error + 1} references to '{self.identifier}' after it was reported as an error",
+                        )
+
+        for entity in failed:
+            self.invalid_entity_calls[entity] = self.invalid_entity_calls.get(entity, 0) + 1
+            strikes = self._strike(("invalid_entity_calls", entity))
+            if strikes > self.max_invalid_entity_calls:
+                return self._intervene(
+                    "invalid_entity_calls", entity, index, session_id,
+                    f"{strikes} failed calls on unknown entity '{entity}'",
+                )
+        return None
+
+    def _strike(self, key: tuple) -> int:
+        self._strikes[key] = self._strikes.get(key, 0) + 1
+        return self._strikes[key]
+
+    def _intervene(self, signal: str, entity: str, index: int, session_id: Optional[str], reason: str) -> Dict[str, Any]:
+        # Every signal gets a fresh budget after an intervention
+        self._strikes.clear()
+        # Escalate to an abort if redirecting already failed to stop the run
+        redirected = any(intervention["action"] == REDIRECT for intervention in self.interventions)
+        action = ABORT if self.action == ABORT or redirected else REDIRECT
+        intervention = {"action": action, "reason": reason, "signal": signal, "entity": entity, "step": index}
+        if action == REDIRECT:
+            intervention["cancelled_goals"] = self._cancel_goals(entity, session_id, reason)
+        self.interventions.append(intervention)
+        return intervention
+
+    def _cancel_goals(self, entity: str, session_id: Optional[str], reason: str) -> List[str]:
+        session = get_session(session_id)
+        pattern = re.compile(rf"(?<![a-z0-9]){re.escape(entity.lower())}(?![a-z0-9])")
+        cancelled = []
+        for goal in session.state["goal_store"].with_status("active"):
+            if pattern.search(goal.get("description", "").lower()):
+                session.record("goal_updated", goal_id=goal["id"], changes={
+                    "status": "cancelled",
+                    "cancel_reason": f"Watchdog: {reason}"
+                })
+                cancelled.append(goal["id"])
+        return cancelled
+
+    def report(self) -> Dict[str, Any]:
+        """Signals and interventions so far, for the run's outputs."""
+        return {
+            "aborted": self.aborted,
+            "interventions": list(self.interventions),
+            "first_error_step": self.first_error_step,
+            "references_after_error": self.references_after_error,
+            "invalid_entity_calls": dict(self.invalid_entity_calls),
+        }